@@ -14,4 +14,19 @@ export const {
   DB_USER,
   DB_PASSWORD,
   DB_NAME,
+
+  // ML prediction workers (0 spawns one Python process per prediction)
+  ML_WORKERS = 1,
+  // Unix socket of a shared `nutrition_cli.py serve --socket` server (replaces ML_WORKERS)
+  ML_SOCKET_PATH,
+  ML_REQUEST_TIMEOUT_MS = 10000,
+  // Log per-stage ML timings and counters ("true" to enable)
+  ML_METRICS = "false",
+  // Concurrent Python calls, waiting requests before rejecting, items per batched call
+  // (with ML_SOCKET_PATH, allow about as many concurrent calls as the server has workers)
+  ML_MAX_CONCURRENCY = 2,
+  ML_MAX_QUEUE = 100,
+  ML_MAX_BATCH_SIZE = 32,
+  // Lowest food name match confidence whose ML prediction is used (weaker matches fall back to OpenAI)
+  ML_MIN_NAME_CONFIDENCE = 0.7,
 } = process.env;
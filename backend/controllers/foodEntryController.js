@@ -42,9 +42,13 @@ async function initializeMLModels() {
   if (!mlModelsInitialized) {
     try {
       console.log("🚀 Initializing ML nutrition models...");
-      await mlNutritionService.initializeModels();
+      const ready = await mlNutritionService.initializeModels();
       mlModelsInitialized = true;
-      console.log("✅ ML models initialized successfully");
+      if (ready) {
+        console.log("✅ ML models initialized successfully");
+      } else {
+        console.log("⚠️ Using OpenAI fallback until ML models are ready");
+      }
     } catch (error) {
       console.error("❌ Failed to initialize ML models:", error.message);
       console.log("⚠️ Will use OpenAI fallback for nutrition prediction");
@@ -106,6 +110,7 @@ export const addFoodEntry = async (req, res) => {
       servingSize: nutritionData.servingSize || portion_size,
       servingUnit: nutritionData.servingUnit || "g",
       portionSize: portion_size || "N/A",
+      nutritionSource: nutritionData.source || "usda",
     });
 
     res.json({
@@ -314,6 +319,8 @@ export const addFoodEntryFromImage = async (req, res) => {
             servingUnit: portionUnit,
             portionSize: item.portionsize || "N/A",
             imagePath: imagePath, // Store the image path
+            foodCategory: item.category || null,
+            nutritionSource: nutritionData.source || null,
           });
         })
       );
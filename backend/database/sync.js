@@ -2,12 +2,34 @@
 import sequelize from "./connection.js";
 import * as models from "../models/index.js";
 
+// Columns added to existing tables after they were first created
+const ADDED_COLUMNS = {
+  food_entries: ["nutritionSource", "foodCategory"],
+};
+
+// sync() only creates missing tables, so add newer nullable columns by hand
+const addMissingColumns = async () => {
+  const queryInterface = sequelize.getQueryInterface();
+  for (const model of Object.values(sequelize.models)) {
+    const columns = ADDED_COLUMNS[model.getTableName()] || [];
+    if (columns.length === 0) continue;
+    const existing = await queryInterface.describeTable(model.getTableName());
+    for (const column of columns) {
+      if (!existing[column]) {
+        await queryInterface.addColumn(model.getTableName(), column, model.rawAttributes[column]);
+        console.log(`Added column ${model.getTableName()}.${column}`);
+      }
+    }
+  }
+};
+
 const syncDatabase = async () => {
   try {
     // Use the default sync behavior to create tables only if they do not exist
     //drop all the tables now
 
     await sequelize.sync(); // This will create tables if they don't exist
+    await addMissingColumns();
     console.log("Database synced successfully!");
   } catch (error) {
     console.error("Error syncing database:", error);
@@ -0,0 +1,164 @@
+import fs from "fs";
+import path from "path";
+import { spawn } from "child_process";
+import { Op } from "sequelize";
+import { FoodEntry, sequelize } from "./models/index.js";
+
+/**
+ * Export food entries logged since the last export into the ML training
+ * format, for `nutrition_cli.py update` to fold into the models.
+ *
+ * Usage: node export_food_entries.js [--update] [--batch-size N]
+ *
+ * Only entries whose nutrients came from the OpenAI fallback are exported:
+ * they are the only ones known to be for the stored portion. ML predictions
+ * would train the models on their own output, USDA results are per 100 g
+ * and never scaled to the portion, and entries logged before sources were
+ * recorded could be either. Rows are read in id order in
+ * batches and streamed to ml/feedback/food_entries_<firstId>_<lastId>.csv;
+ * ml/feedback/export_state.json remembers the last id exported.
+ */
+
+const ML_PATH = path.join(process.cwd(), "ml");
+const FEEDBACK_DIR = path.join(ML_PATH, "feedback");
+const STATE_PATH = path.join(FEEDBACK_DIR, "export_state.json");
+const TRAINING_SOURCES = ["openai"];
+
+// Training CSV column -> FoodEntry attribute (nutrients the entries do not store are left out)
+const NUTRIENT_COLUMNS = {
+  calories: "calories",
+  protein: "protein",
+  fat: "fat",
+  carbohydrates: "carbohydrates",
+  vitamin_a: "vitaminA",
+  vitamin_c: "vitaminC",
+  calcium: "calcium",
+  iron: "iron",
+};
+const COLUMNS = ["food_name", "food_category", "portion_size", "portion_unit", ...Object.keys(NUTRIENT_COLUMNS)];
+
+const parseArgs = (argv) => {
+  const options = { update: false, batchSize: 5000 };
+  for (let i = 0; i < argv.length; i++) {
+    if (argv[i] === "--update") options.update = true;
+    else if (argv[i] === "--batch-size") options.batchSize = Number(argv[++i]) || options.batchSize;
+  }
+  return options;
+};
+
+const readState = () => {
+  try {
+    return JSON.parse(fs.readFileSync(STATE_PATH, "utf8"));
+  } catch {
+    return { lastId: 0 };
+  }
+};
+
+const csvField = (value) => {
+  const text = String(value ?? "");
+  return /[",\n]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+};
+
+/**
+ * The portion the OpenAI fallback was asked for, always in grams: typed
+ * entries parseFloat(portion) (100 when not numeric), image entries the
+ * number in their "150g"/"250ml"-style portion
+ */
+const parsePortion = (entry) => {
+  if (!entry.imagePath) {
+    return [parseFloat(entry.portionSize) || 100, "g"];
+  }
+  const match = String(entry.portionSize || "").match(/(\d+(?:\.\d+)?)(\w+)/);
+  return [match ? parseFloat(match[1]) : 100, "g"];
+};
+
+const toRow = (entry) => {
+  const [portionSize, portionUnit] = parsePortion(entry);
+  const nutrients = Object.values(NUTRIENT_COLUMNS).map((attribute) => parseFloat(entry[attribute]) || 0);
+  return [entry.foodName.trim().toLowerCase(), entry.foodCategory || "unknown", portionSize, portionUnit, ...nutrients];
+};
+
+const exportFoodEntries = async ({ batchSize }) => {
+  const state = readState();
+  // Export up to the newest id at start, so rows inserted meanwhile go in the next export
+  const maxId = (await FoodEntry.max("id")) || 0;
+  if (maxId <= state.lastId) {
+    console.log("No new food entries to export");
+    return null;
+  }
+
+  const file = path.join(FEEDBACK_DIR, `food_entries_${state.lastId + 1}_${maxId}.csv`);
+  const tmpFile = `${file}.tmp`;
+  fs.mkdirSync(FEEDBACK_DIR, { recursive: true });
+  const out = fs.createWriteStream(tmpFile);
+  out.write(COLUMNS.join(",") + "\n");
+
+  let lastId = state.lastId;
+  let exported = 0;
+  let skipped = 0;
+  for (;;) {
+    const entries = await FoodEntry.findAll({
+      attributes: ["id", "foodName", "foodCategory", "portionSize", "imagePath", ...Object.values(NUTRIENT_COLUMNS)],
+      where: { id: { [Op.gt]: lastId, [Op.lte]: maxId }, nutritionSource: TRAINING_SOURCES },
+      order: [["id", "ASC"]],
+      limit: batchSize,
+      raw: true,
+    });
+    if (entries.length === 0) break;
+    lastId = entries[entries.length - 1].id;
+
+    const lines = [];
+    for (const entry of entries) {
+      // Failed lookups are stored with zero calories
+      if (!entry.foodName || !(parseFloat(entry.calories) > 0)) {
+        skipped++;
+        continue;
+      }
+      lines.push(toRow(entry).map(csvField).join(","));
+    }
+    exported += lines.length;
+    if (lines.length > 0 && !out.write(lines.join("\n") + "\n")) {
+      await new Promise((resolve) => out.once("drain", resolve));
+    }
+  }
+  await new Promise((resolve, reject) => out.end((error) => (error ? reject(error) : resolve())));
+
+  if (exported === 0) {
+    fs.unlinkSync(tmpFile);
+  } else {
+    fs.renameSync(tmpFile, file);
+  }
+  fs.writeFileSync(STATE_PATH, JSON.stringify({ lastId: maxId, exportedAt: new Date().toISOString() }, null, 2));
+  console.log(`✅ Exported ${exported} food entries (${skipped} without nutrients skipped) up to id ${maxId}`);
+  return exported > 0 ? file : null;
+};
+
+const runUpdate = (file) =>
+  new Promise((resolve, reject) => {
+    const update = spawn("python", ["nutrition_cli.py", "update", "--dataset-path", path.relative(ML_PATH, file)], {
+      cwd: ML_PATH,
+      stdio: "inherit",
+    });
+    update.on("error", reject);
+    update.on("close", (code) => (code === 0 ? resolve() : reject(new Error(`ML update failed with code ${code}`))));
+  });
+
+const main = async () => {
+  const options = parseArgs(process.argv.slice(2));
+  try {
+    await sequelize.authenticate();
+    const file = await exportFoodEntries(options);
+    if (file && options.update) {
+      await runUpdate(file);
+    } else if (file) {
+      console.log(`💡 Apply it with: cd ml && python nutrition_cli.py update --dataset-path ${path.relative(ML_PATH, file)}`);
+    }
+  } catch (error) {
+    console.error("❌ Food entry export failed:", error.message);
+    process.exitCode = 1;
+  } finally {
+    await sequelize.close();
+  }
+};
+
+main();
@@ -0,0 +1,128 @@
+"""
+Columnar binary storage for nutrition datasets
+
+A dataset is a directory holding one .npy file per column plus schema.json.
+Text columns are dictionary-encoded: the .npy file holds integer codes and
+the schema holds the vocabulary. Columns are opened with mmap_mode='r', so
+loading a dataset of any size is close to zero-copy.
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import numpy as np
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+SCHEMA_FILE = "schema.json"
+FORMAT_VERSION = 1
+
+def columnar_path_for(csv_path: str) -> str:
+    """Directory used for the columnar copy of a CSV dataset"""
+    return os.path.splitext(csv_path)[0] + ".columns"
+
+def is_columnar_dataset(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, SCHEMA_FILE))
+
+def find_columnar_dataset(path: str) -> Optional[str]:
+    """Return the columnar dataset for path if one exists and is not older than the CSV"""
+    if is_columnar_dataset(path):
+        return path
+    
+    candidate = columnar_path_for(path)
+    if not is_columnar_dataset(candidate):
+        return None
+    if os.path.exists(path) and os.path.getmtime(os.path.join(candidate, SCHEMA_FILE)) < os.path.getmtime(path):
+        return None
+    return candidate
+
+def read_schema(path: str) -> Dict:
+    with open(os.path.join(path, SCHEMA_FILE), 'r') as f:
+        return json.load(f)
+
+def dataset_columns(path: str) -> List[str]:
+    return [column["name"] for column in read_schema(path)["columns"]]
+
+class ColumnarDatasetWriter:
+    """Write a columnar dataset of known length chunk by chunk
+    
+    schema.json is written last, so a partially written directory is never
+    picked up by find_columnar_dataset.
+    """
+    
+    def __init__(self, path: str, num_rows: int, columns: List[str],
+                 vocabularies: Dict[str, List[str]]):
+        self.path = path
+        self.num_rows = num_rows
+        self.columns = columns
+        self.vocabularies = vocabularies
+        
+        os.makedirs(path, exist_ok=True)
+        schema_path = os.path.join(path, SCHEMA_FILE)
+        if os.path.exists(schema_path):
+            os.remove(schema_path)
+        
+        self.arrays = {}
+        for name in columns:
+            if name in vocabularies:
+                dtype = np.int16 if len(vocabularies[name]) < 2 ** 15 else np.int32
+            else:
+                dtype = np.float32
+            self.arrays[name] = np.lib.format.open_memmap(
+                os.path.join(path, f"{name}.npy"), mode='w+', dtype=dtype, shape=(num_rows,)
+            )
+    
+    def write(self, start: int, values: Dict[str, np.ndarray]):
+        """Write rows [start, start + len) given codes for text columns and numbers otherwise"""
+        for name, array in values.items():
+            self.arrays[name][start:start + len(array)] = array
+    
+    def close(self):
+        for array in self.arrays.values():
+            array.flush()
+        self.arrays = {}
+        
+        schema = {
+            "format_version": FORMAT_VERSION,
+            "rows": self.num_rows,
+            "columns": [
+                {"name": name, "kind": "category", "vocabulary": self.vocabularies[name]}
+                if name in self.vocabularies else {"name": name, "kind": "numeric"}
+                for name in self.columns
+            ]
+        }
+        tmp_path = os.path.join(self.path, SCHEMA_FILE + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(schema, f)
+        os.replace(tmp_path, os.path.join(self.path, SCHEMA_FILE))
+
+def load_dataframe(path: str, columns: Optional[List[str]] = None,
+                   start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+    """Load rows [start, stop) of a columnar dataset as a DataFrame
+    
+    Numeric columns are views of the memory-mapped files and text columns
+    become pandas categoricals built from their codes.
+    """
+    import pandas as pd
+    
+    schema = read_schema(path)
+    data = {}
+    for column in schema["columns"]:
+        name = column["name"]
+        if columns is not None and name not in columns:
+            continue
+        values = np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')[start:stop]
+        if column["kind"] == "category":
+            data[name] = pd.Categorical.from_codes(values, categories=column["vocabulary"])
+        else:
+            data[name] = values
+    return pd.DataFrame(data, copy=False)
+
+def iter_dataframe_chunks(path: str, chunk_size: int, columns: Optional[List[str]] = None):
+    """Yield a columnar dataset as DataFrames of chunk_size rows"""
+    rows = read_schema(path)["rows"]
+    for start in range(0, rows, chunk_size):
+        yield load_dataframe(path, columns, start, min(start + chunk_size, rows))
@@ -1,15 +1,17 @@
 #!/usr/bin/env python3
 """
 Standalone Enhanced Nutrition Dataset Generator
-Creates 5000 accurate nutrition records using USDA-compliant data
+Creates accurate nutrition records (5000 by default) using USDA-compliant data
 No external dependencies - everything is self-contained
 """
 
 import pandas as pd
 import numpy as np
+import argparse
 import json
 import os
 from datetime import datetime
+from columnar_dataset import ColumnarDatasetWriter, columnar_path_for, is_columnar_dataset, iter_dataframe_chunks
 
 class NutritionDatasetGenerator:
     def __init__(self):
@@ -271,71 +273,96 @@ class NutritionDatasetGenerator:
             }
         }
     
-    def generate_dataset(self, output_path: str = "nutrition_dataset.csv", num_records: int = 5000):
-        """Generate nutrition dataset with accurate USDA data"""
+    def _base_nutrition_matrix(self):
+        """Stack base nutrition into a (foods x nutrients) matrix"""
+        food_names = list(self.food_database.keys())
+        nutrient_names = list(self.food_database[food_names[0]]["base_nutrition"].keys())
+        base = np.array([
+            [self.food_database[food]["base_nutrition"][nutrient] for nutrient in nutrient_names]
+            for food in food_names
+        ], dtype=np.float64)
+        return food_names, nutrient_names, base
+    
+    def generate_dataset(self, output_path: str = "nutrition_dataset.csv", num_records: int = 5000,
+                         seed: int = None, chunk_size: int = 1_000_000, output_format: str = "csv"):
+        """Generate nutrition dataset with accurate USDA data
+        
+        Rows are drawn and written in vectorized chunks of chunk_size, so
+        memory stays flat for any num_records. Pass a seed for reproducible output.
+        output_format is "csv", "columnar" (a directory of .npy columns next to
+        output_path) or "both".
+        """
         print(f"🎯 Generating {num_records} accurate nutrition records...")
         print("📊 Using USDA Standard Reference nutrition data...")
         
-        records = []
-        food_names = list(self.food_database.keys())
+        # Independent streams per column keep the output identical for any chunk_size
+        food_rng, portion_rng, variation_rng = [
+            np.random.default_rng(stream) for stream in np.random.SeedSequence(seed).spawn(3)
+        ]
+        food_names, nutrient_names, base = self._base_nutrition_matrix()
+        categories = sorted(set(food["category"] for food in self.food_database.values()))
+        category_codes = np.array([categories.index(self.food_database[food]["category"]) for food in food_names])
+        
+        write_csv = output_format in ("csv", "both")
+        columnar_writer = None
+        if output_format in ("columnar", "both"):
+            columnar_writer = ColumnarDatasetWriter(
+                columnar_path_for(output_path), num_records,
+                ['food_name', 'food_category', 'portion_size', 'portion_unit'] + nutrient_names,
+                {'food_name': food_names, 'food_category': categories, 'portion_unit': ['g']}
+            )
         
-        for i in range(num_records):
-            # Randomly select a food item
-            food_name = np.random.choice(food_names)
-            food_data = self.food_database[food_name]
+        for start in range(0, num_records, chunk_size):
+            size = min(chunk_size, num_records - start)
             
-            # Random portion size (25-500g for realistic range)
-            portion_size = np.random.uniform(25, 500)
+            # Randomly select food items, portion sizes (25-500g) and
+            # realistic variation (±5% for natural differences)
+            food_index = food_rng.integers(0, len(food_names), size)
+            portion_size = portion_rng.uniform(25, 500, size)
+            variation_factor = variation_rng.uniform(0.95, 1.05, size)
             
-            # Add realistic variation (±5% for natural differences)
-            variation_factor = np.random.uniform(0.95, 1.05)
+            # Scale every nutrient of every row in one broadcasted multiply
+            nutrition = base[food_index] * (portion_size / 100 * variation_factor)[:, None]
             
-            # Scale nutrition values based on portion size
-            scale_factor = portion_size / 100
+            portion_size = np.round(portion_size, 1)
+            nutrition = np.round(nutrition, 1)
             
-            # Get base nutrition values
-            base_nutrition = food_data["base_nutrition"]
+            if write_csv:
+                chunk = pd.DataFrame({
+                    'food_name': pd.Categorical.from_codes(food_index, categories=food_names),
+                    'food_category': pd.Categorical.from_codes(category_codes[food_index], categories=categories),
+                    'portion_size': portion_size,
+                    'portion_unit': 'g'
+                })
+                for j, nutrient in enumerate(nutrient_names):
+                    chunk[nutrient] = nutrition[:, j]
+                
+                chunk.to_csv(output_path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
             
-            # Create record with enhanced accuracy
-            record = {
-                'food_name': food_name,
-                'food_category': food_data["category"],
-                'portion_size': round(portion_size, 1),
-                'portion_unit': 'g',
-                'calories': round(base_nutrition["calories"] * scale_factor * variation_factor, 1),
-                'protein': round(base_nutrition["protein"] * scale_factor * variation_factor, 1),
-                'fat': round(base_nutrition["fat"] * scale_factor * variation_factor, 1),
-                'carbohydrates': round(base_nutrition["carbohydrates"] * scale_factor * variation_factor, 1),
-                'fiber': round(base_nutrition["fiber"] * scale_factor * variation_factor, 1),
-                'vitamin_a': round(base_nutrition["vitamin_a"] * scale_factor * variation_factor, 1),
-                'vitamin_c': round(base_nutrition["vitamin_c"] * scale_factor * variation_factor, 1),
-                'vitamin_d': round(base_nutrition["vitamin_d"] * scale_factor * variation_factor, 1),
-                'vitamin_e': round(base_nutrition["vitamin_e"] * scale_factor * variation_factor, 1),
-                'calcium': round(base_nutrition["calcium"] * scale_factor * variation_factor, 1),
-                'iron': round(base_nutrition["iron"] * scale_factor * variation_factor, 1),
-                'potassium': round(base_nutrition["potassium"] * scale_factor * variation_factor, 1),
-                'sodium': round(base_nutrition["sodium"] * scale_factor * variation_factor, 1)
-            }
-            records.append(record)
+            if columnar_writer:
+                columns = {
+                    'food_name': food_index,
+                    'food_category': category_codes[food_index],
+                    'portion_size': portion_size,
+                    'portion_unit': np.zeros(size, dtype=np.int16)
+                }
+                columns.update({nutrient: nutrition[:, j] for j, nutrient in enumerate(nutrient_names)})
+                columnar_writer.write(start, columns)
             
             # Progress indicator
-            if (i + 1) % 1000 == 0:
-                print(f"✅ Generated {i + 1} records...")
-        
-        # Create DataFrame and save
-        df = pd.DataFrame(records)
-        df.to_csv(output_path, index=False)
+            print(f"✅ Generated {start + size} records...")
         
         # Save metadata
         metadata = {
             "generated_at": datetime.now().isoformat(),
-            "total_records": len(records),
-            "food_categories": list(set([food["category"] for food in self.food_database.values()])),
+            "total_records": num_records,
+            "food_categories": categories,
             "total_foods": len(self.food_database),
             "portion_range": "25-500g",
             "variation_factor": "±5%",
             "data_source": "USDA Standard Reference",
-            "accuracy_level": "Enhanced"
+            "accuracy_level": "Enhanced",
+            "seed": seed
         }
         
         metadata_path = output_path.replace('.csv', '_metadata.json')
@@ -344,45 +371,84 @@ class NutritionDatasetGenerator:
         
         print(f"\n🎉 Dataset generation complete!")
         print(f"📁 Files created:")
-        print(f"   - {output_path}")
+        if write_csv:
+            print(f"   - {output_path}")
+        if columnar_writer:
+            columnar_writer.close()
+            print(f"   - {columnar_writer.path}/")
         print(f"   - {metadata_path}")
         print(f"\n📊 Dataset statistics:")
-        print(f"   - Total records: {len(records)}")
-        print(f"   - Food categories: {len(set([food['category'] for food in self.food_database.values()]))}")
+        print(f"   - Total records: {num_records}")
+        print(f"   - Food categories: {len(categories)}")
         print(f"   - Unique foods: {len(self.food_database)}")
         print(f"   - Portion range: 25-500g")
         print(f"   - Data accuracy: USDA-compliant")
         
-        return output_path
+        return output_path if write_csv else columnar_writer.path
     
-    def validate_dataset(self, dataset_path: str):
-        """Validate the generated dataset"""
+    def validate_dataset(self, dataset_path: str, chunk_size: int = 1_000_000):
+        """Validate the generated dataset (CSV or columnar), reading it in chunks"""
         print("🔍 Validating dataset...")
         
-        df = pd.read_csv(dataset_path)
+        total_records, missing_values = 0, 0
+        categories, foods = set(), set()
+        portion_min, portion_max = np.inf, -np.inf
+        row_hashes = []
+        
+        if is_columnar_dataset(dataset_path):
+            chunks = iter_dataframe_chunks(dataset_path, chunk_size)
+        else:
+            chunks = pd.read_csv(dataset_path, chunksize=chunk_size)
+        
+        for chunk in chunks:
+            total_records += len(chunk)
+            missing_values += int(chunk.isnull().sum().sum())
+            categories.update(chunk['food_category'].unique())
+            foods.update(chunk['food_name'].unique())
+            portion_min = min(portion_min, chunk['portion_size'].min())
+            portion_max = max(portion_max, chunk['portion_size'].max())
+            row_hashes.append(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+        
+        row_hashes = np.concatenate(row_hashes) if row_hashes else np.array([], dtype=np.uint64)
+        duplicates = len(row_hashes) - len(np.unique(row_hashes))
         
         print(f"✅ Validation complete!")
         print(f"📈 Results:")
-        print(f"   - Total records: {len(df)}")
-        print(f"   - Food categories: {df['food_category'].unique()}")
-        print(f"   - Unique foods: {df['food_name'].nunique()}")
-        print(f"   - Portion range: {df['portion_size'].min():.1f}g - {df['portion_size'].max():.1f}g")
-        print(f"   - Missing values: {df.isnull().sum().sum()}")
-        print(f"   - Duplicate records: {df.duplicated().sum()}")
+        print(f"   - Total records: {total_records}")
+        print(f"   - Food categories: {sorted(categories)}")
+        print(f"   - Unique foods: {len(foods)}")
+        print(f"   - Portion range: {portion_min:.1f}g - {portion_max:.1f}g")
+        print(f"   - Missing values: {missing_values}")
+        print(f"   - Duplicate records: {duplicates}")
         
         return True
 
 def main():
     """Main function to generate the dataset"""
+    parser = argparse.ArgumentParser(description="Generate the nutrition training dataset")
+    parser.add_argument("--records", type=int, default=5000, help="Number of records to generate")
+    parser.add_argument("--output", default="nutrition_dataset.csv", help="Output CSV path")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible output")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000,
+                        help="Records generated and written per chunk")
+    parser.add_argument("--format", choices=["csv", "columnar", "both"], default="csv",
+                        help="Write CSV, a directory of memory-mappable .npy columns, or both")
+    parser.add_argument("--skip-validation", action="store_true",
+                        help="Do not re-read the dataset to validate it")
+    args = parser.parse_args()
+    
     generator = NutritionDatasetGenerator()
     
-    # Generate 5000 accurate records
-    dataset_path = generator.generate_dataset("nutrition_dataset.csv", 5000)
+    # Generate the requested number of accurate records
+    dataset_path = generator.generate_dataset(args.output, args.records,
+                                              seed=args.seed, chunk_size=args.chunk_size,
+                                              output_format=args.format)
     
     # Validate the dataset
-    generator.validate_dataset(dataset_path)
+    if not args.skip_validation:
+        generator.validate_dataset(dataset_path, chunk_size=args.chunk_size)
     
     print("\n🚀 Ready for ML training!")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,196 @@
+"""
+Resolve raw food names (English or Somali, any spelling) to known foods
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Somali names and common English variants mapped to dataset food names
+FOOD_ALIASES = {
+    # Somali
+    "bariis": "rice",
+    "bariis cad": "rice",
+    "digaag": "chicken_breast",
+    "hilib digaag": "chicken_breast",
+    "laxaw digaag": "chicken_breast",
+    "ukun": "egg",
+    "beed": "egg",
+    "caano": "milk",
+    "caano fadhi": "yogurt",
+    "garoor": "yogurt",
+    "moos": "banana",
+    "tufaax": "apple",
+    "liin": "orange",
+    "liin macaan": "orange",
+    "canab": "grape",
+    "istaroberi": "strawberry",
+    "karoot": "carrot",
+    "yaanyo": "tomato",
+    "khiyaar": "cucumber",
+    "isbinaaj": "spinach",
+    "brokoli": "broccoli",
+    "kalluun": "salmon",
+    "hilib lo'aad": "beef",
+    "hilib loaad": "beef",
+    "hilib": "beef",
+    "rooti": "bread",
+    "roodhi": "bread",
+    "baasto": "pasta",
+    "baasta": "pasta",
+    "boorash": "oatmeal",
+    "subag": "butter",
+    "farmaajo": "cheese",
+    "looska": "peanut",
+    "loos": "peanut",
+    "yicib": "almond",
+    "lawska": "almond",
+    "kareem": "cream",
+    "kinwa": "quinoa",
+    "miro gabbal": "sunflower_seed",
+    # English variants
+    "chicken": "chicken_breast",
+    "eggs": "egg",
+    "oats": "oatmeal",
+    "porridge": "oatmeal",
+    "groundnut": "peanut",
+    "groundnuts": "peanut",
+    "spaghetti": "pasta",
+    "noodles": "pasta",
+    "steak": "beef",
+    "fish": "salmon",
+    "yoghurt": "yogurt",
+    "sunflower seeds": "sunflower_seed",
+    "chia": "chia_seed",
+}
+
+# Preparation words that leave a food's nutrients close to the plain food's;
+# they do not count against the coverage of a partial match
+PREPARATION_WORDS = {
+    "grilled", "roasted", "roast", "baked", "boiled", "steamed", "poached",
+    "raw", "fresh", "cooked", "plain", "sliced", "chopped", "diced", "whole",
+}
+
+def normalize_food_name(name: str) -> str:
+    """Lowercase, strip accents and punctuation, and join words with underscores"""
+    name = unicodedata.normalize("NFKD", str(name))
+    name = "".join(char for char in name if not unicodedata.combining(char)).lower()
+    name = name.replace("'", "")
+    return "_".join(re.findall(r"[a-z0-9]+", name))
+
+def _singular_forms(name: str) -> List[str]:
+    forms = []
+    if name.endswith("ies"):
+        forms.append(name[:-3] + "y")
+    if name.endswith("es"):
+        forms.append(name[:-2])
+    if name.endswith("s") and not name.endswith("ss"):
+        forms.append(name[:-1])
+    return forms
+
+def _coverage_confidence(phrase: str, name: str) -> float:
+    """Confidence of a match covering only phrase of name, by the share of
+    name's characters (less preparation words) the phrase covers"""
+    rest = "_".join(word for word in name.split("_") if word not in PREPARATION_WORDS) or name
+    return 0.9 * min(1.0, len(phrase) / len(rest))
+
+def _trigrams(name: str) -> Counter:
+    padded = f"  {name.replace('_', ' ')} "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+class FoodNameIndex:
+    """Normalized, alias and trigram index over the known food names
+    
+    resolve() returns (food, confidence, method) where method is 'exact',
+    'normalized', 'alias', 'partial' or 'fuzzy', or (None, best score, None)
+    when nothing scores at least min_confidence. Results are memoized.
+    
+    A partial match scores by how much of the name it covers, so a known
+    food inside a different dish ("orange juice", "chicken soup") stays
+    below the default threshold while "grilled chicken breast" does not.
+    """
+    
+    def __init__(self, vocabulary: Iterable[str], aliases: Optional[Dict[str, str]] = None,
+                 min_confidence: float = 0.6, max_memo: int = 10000):
+        self.foods = set(str(food) for food in vocabulary)
+        self.min_confidence = min_confidence
+        self.max_memo = max_memo
+        self._memo = {}
+        
+        # normalized form -> (food, method)
+        self.names = {}
+        for alias, food in (FOOD_ALIASES if aliases is None else aliases).items():
+            if food in self.foods:
+                self.names[normalize_food_name(alias)] = (food, "alias")
+        for food in self.foods:
+            self.names[normalize_food_name(food)] = (food, "normalized")
+        
+        # trigram -> normalized forms containing it
+        self.grams = {name: _trigrams(name) for name in self.names}
+        self.postings = {}
+        for name, grams in self.grams.items():
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(name)
+    
+    def resolve(self, name: str) -> Tuple[Optional[str], float, Optional[str]]:
+        if name in self.foods:
+            return name, 1.0, "exact"
+        result = self._memo.get(name)
+        if result is None:
+            result = self._resolve(name)
+            if len(self._memo) >= self.max_memo:
+                self._memo.clear()
+            self._memo[name] = result
+        return result
+    
+    def _resolve(self, name: str) -> Tuple[Optional[str], float, Optional[str]]:
+        normalized = normalize_food_name(name)
+        if not normalized:
+            return None, 0.0, None
+        
+        for candidate in [normalized] + _singular_forms(normalized):
+            if candidate in self.names:
+                food, method = self.names[candidate]
+                return food, 1.0 if candidate == normalized else 0.95, method
+        
+        # Longest run of words naming a known food, e.g. "grilled chicken breast".
+        # Runs naming different foods ("peanut butter") are ambiguous and rejected.
+        words = normalized.split("_")
+        for length in range(len(words) - 1, 0, -1):
+            matches = {}
+            for start in range(len(words) - length + 1):
+                phrase = "_".join(words[start:start + length])
+                for candidate in [phrase] + _singular_forms(phrase):
+                    if candidate in self.names:
+                        matches.setdefault(self.names[candidate][0], phrase)
+            if len(matches) > 1:
+                return None, 0.0, None
+            if matches:
+                food, phrase = matches.popitem()
+                confidence = _coverage_confidence(phrase, normalized)
+                if confidence >= self.min_confidence:
+                    return food, confidence, "partial"
+                return None, confidence, None
+        
+        # Trigram similarity (Dice coefficient) against every indexed form
+        grams = _trigrams(normalized)
+        shared = Counter()
+        for gram, count in grams.items():
+            for candidate in self.postings.get(gram, ()):
+                shared[candidate] += min(count, self.grams[candidate][gram])
+        if not shared:
+            return None, 0.0, None
+        
+        total = sum(grams.values())
+        candidate, score = max(
+            ((candidate, 2 * common / (total + sum(self.grams[candidate].values())))
+             for candidate, common in shared.items()),
+            key=lambda item: item[1]
+        )
+        # A known name inside a longer word ("cheeseburger") is a partial match, not a typo
+        if candidate in normalized:
+            score = min(score, _coverage_confidence(candidate, normalized))
+        if score < self.min_confidence:
+            return None, score, None
+        return self.names[candidate][0], score, "fuzzy"
@@ -0,0 +1,137 @@
+"""
+Export trained random forests to packed NumPy arrays and evaluate them
+without scikit-learn
+
+Every tree of every forest is concatenated into flat node arrays:
+feature, threshold, left, right and value, plus the root node of each tree.
+Leaves point to themselves with an infinite threshold, so evaluation is a
+fixed number of vectorized gather steps over all trees at once.
+"""
+
+import os
+import json
+import shutil
+import numpy as np
+from typing import Dict, List, Optional
+
+EXPORT_DIR = "export"
+META_FILE = "forests.json"
+FORMAT_VERSION = 1
+NODE_ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+def is_exported(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+def export_forests(path: str, groups: List[Dict], layout: str,
+                   target_mean: Optional[np.ndarray] = None,
+                   target_scale: Optional[np.ndarray] = None) -> Dict:
+    """Pack forests into .npy files under path
+    
+    groups is a list of {'name', 'forest', 'outputs'} where forest is a fitted
+    RandomForestRegressor and outputs names its output columns. target_mean
+    and target_scale undo a target standardization (multi-output layout).
+    """
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    meta_groups = []
+    offset, max_depth = 0, 0
+    for group in groups:
+        first_tree = len(roots)
+        for estimator in group['forest'].estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            roots.append(offset)
+            feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int16))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+            left.append((np.where(is_leaf, nodes, tree.children_left) + offset).astype(np.int32))
+            right.append((np.where(is_leaf, nodes, tree.children_right) + offset).astype(np.int32))
+            value.append(tree.value[:, :, 0])
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+        meta_groups.append({'name': group['name'], 'outputs': list(group['outputs']),
+                            'trees': [first_tree, len(roots)]})
+    
+    arrays = {
+        'feature': np.concatenate(feature),
+        'threshold': np.concatenate(threshold),
+        'left': np.concatenate(left),
+        'right': np.concatenate(right),
+        'value': np.concatenate(value),
+        'roots': np.array(roots, dtype=np.int32)
+    }
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'layout': layout,
+        'groups': meta_groups,
+        'max_depth': int(max_depth),
+        'nodes': int(offset),
+        'target_mean': target_mean.tolist() if target_mean is not None else None,
+        'target_scale': target_scale.tolist() if target_scale is not None else None
+    }
+    
+    # Write next to the destination and swap it in, metadata last
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+    with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+        json.dump(meta, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    
+    meta['bytes'] = sum(array.nbytes for array in arrays.values())
+    return meta
+
+class PackedForest:
+    """Evaluate exported forests with NumPy only, from memory-mapped arrays"""
+    
+    def __init__(self, path: str, mmap_mode: Optional[str] = 'r'):
+        with open(os.path.join(path, META_FILE), 'r') as f:
+            self.meta = json.load(f)
+        self.groups = {group['name']: group for group in self.meta['groups']}
+        self.arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+                       for name in NODE_ARRAYS}
+        self.target_mean = np.array(self.meta['target_mean']) if self.meta['target_mean'] else None
+        self.target_scale = np.array(self.meta['target_scale']) if self.meta['target_scale'] else None
+    
+    @property
+    def layout(self) -> str:
+        return self.meta['layout']
+    
+    def leaves(self, X: np.ndarray, roots: np.ndarray) -> np.ndarray:
+        """Leaf node reached by every row in every tree, shape (rows, trees)"""
+        feature, threshold = self.arrays['feature'], self.arrays['threshold']
+        left, right = self.arrays['left'], self.arrays['right']
+        # Trees split on float32 features, as scikit-learn does
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        flat_X = X.ravel()
+        row_offsets = (np.arange(len(X), dtype=np.int32) * X.shape[1])[:, None]
+        node = np.repeat(np.asarray(roots)[None, :], len(X), axis=0)
+        for _ in range(self.meta['max_depth']):
+            go_left = flat_X[row_offsets + feature[node]] <= threshold[node]
+            node = np.where(go_left, left[node], right[node])
+        return node
+    
+    def predict(self, name: str, X: np.ndarray) -> np.ndarray:
+        """Mean leaf value over a group's trees, shape (rows, outputs)"""
+        start, stop = self.groups[name]['trees']
+        node = self.leaves(X, self.arrays['roots'][start:stop])
+        y = self.arrays['value'][node].mean(axis=1)
+        if self.target_mean is not None:
+            y = y * self.target_scale + self.target_mean
+        return y
+    
+    def estimator(self, name: str) -> "PackedEstimator":
+        return PackedEstimator(self, name)
+
+class PackedEstimator:
+    """One exported forest with the predict() interface of the original model"""
+    
+    def __init__(self, forest: PackedForest, name: str):
+        self.forest = forest
+        self.name = name
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        y = self.forest.predict(self.name, X)
+        return y[:, 0] if y.shape[1] == 1 else y
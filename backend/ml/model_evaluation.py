@@ -0,0 +1,82 @@
+"""
+K-fold cross-validation summaries for the per-target forests
+
+Every row is assigned to one test fold up front (assign_folds), so all
+(fold, target) fits can run independently against the same encoded and
+scaled matrix. Each fit returns its out-of-fold predictions; once all are
+back, the predictions for every row come from a model that never saw it,
+and the per-target and per-food error tables are computed from them.
+"""
+
+import numpy as np
+from typing import Dict, List, Optional
+
+def assign_folds(n_rows: int, folds: int, groups: Optional[np.ndarray] = None,
+                 random_state: int = 42) -> np.ndarray:
+    """Test fold of every row; with groups, all rows of a group share a fold"""
+    from sklearn.model_selection import GroupKFold, KFold
+    
+    if groups is not None:
+        splitter = GroupKFold(n_splits=folds)
+    else:
+        splitter = KFold(n_splits=folds, shuffle=True, random_state=random_state)
+    fold_ids = np.empty(n_rows, dtype=np.int16)
+    for fold, (_, test_index) in enumerate(splitter.split(np.zeros((n_rows, 1)), groups=groups)):
+        fold_ids[test_index] = fold
+    return fold_ids
+
+def summarize_targets(Y: np.ndarray, predictions: np.ndarray, fold_ids: np.ndarray,
+                      targets: List[str], fit_seconds: np.ndarray) -> Dict[str, Dict]:
+    """Mean and spread over folds of MAE, RMSE and R², plus the pooled scores
+    
+    fit_seconds holds the fit time of each (fold, target) task.
+    """
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+    
+    folds = fit_seconds.shape[0]
+    masks = [fold_ids == fold for fold in range(folds)]
+    summary = {}
+    for column, target in enumerate(targets):
+        y_true, y_pred = Y[:, column], predictions[:, column]
+        mae = np.array([mean_absolute_error(y_true[mask], y_pred[mask]) for mask in masks])
+        rmse = np.sqrt([mean_squared_error(y_true[mask], y_pred[mask]) for mask in masks])
+        r2 = np.array([r2_score(y_true[mask], y_pred[mask]) for mask in masks])
+        summary[target] = {
+            'mae': float(mae.mean()),
+            'mae_std': float(mae.std()),
+            'rmse': float(rmse.mean()),
+            'r2': float(r2.mean()),
+            'r2_std': float(r2.std()),
+            'pooled_mae': float(mean_absolute_error(y_true, y_pred)),
+            'pooled_r2': float(r2_score(y_true, y_pred)),
+            'fold_mae': [float(value) for value in mae],
+            'fit_seconds': float(fit_seconds[:, column].sum())
+        }
+    return summary
+
+def food_error_table(food_codes: np.ndarray, food_names: np.ndarray, Y: np.ndarray,
+                     predictions: np.ndarray, targets: List[str], sort_target: str,
+                     top: Optional[int] = 20) -> List[Dict]:
+    """Out-of-fold MAE of every target per food, worst foods for sort_target first"""
+    import pandas as pd
+    
+    errors = pd.DataFrame(np.abs(predictions - Y), columns=targets)
+    errors['rows'] = 1
+    errors['mean_' + sort_target] = Y[:, targets.index(sort_target)]
+    grouped = errors.groupby(food_codes, sort=False).agg(
+        {**{target: 'mean' for target in targets}, 'rows': 'sum', 'mean_' + sort_target: 'mean'})
+    grouped = grouped.sort_values(sort_target, ascending=False)
+    if top is not None:
+        grouped = grouped.head(top)
+    
+    table = []
+    for code, row in grouped.iterrows():
+        mean_value = row['mean_' + sort_target]
+        table.append({
+            'food': str(food_names[code]),
+            'rows': int(row['rows']),
+            'mean_' + sort_target: float(mean_value),
+            'relative_mae': float(row[sort_target] / mean_value) if mean_value else None,
+            'mae': {target: float(row[target]) for target in targets}
+        })
+    return table
@@ -0,0 +1,226 @@
+"""
+Model manifest and versioned model directories
+
+A saved model set lives in model_dir/versions/<version>/ together with its
+manifest.json, and model_dir/CURRENT names the active version. save_models
+writes a new set into a staging directory, renames it into versions/ and
+then replaces CURRENT atomically, so a reader always sees one complete set.
+A model_dir without CURRENT is a flat (pre-versioning) model directory.
+A process that reads a version's files after loading (lazy loading) pins
+it in versions/.pins/<pid>, and pruning keeps the versions of live pins.
+"""
+
+import os
+import json
+import atexit
+import time
+import shutil
+import hashlib
+from typing import Dict, List, Optional, Set
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_FORMAT_VERSION = 1
+VERSIONS_DIR = "versions"
+CURRENT_FILE = "CURRENT"
+PINS_DIR = ".pins"
+
+_pin_paths = set()
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def build_manifest(model_dir: str, files: List[str], targets: List[str], layout: str,
+                   feature_names: List[str], metrics: Optional[Dict] = None) -> Dict:
+    """Hash files (relative to model_dir) and describe the model set
+    
+    The model version is derived from the file hashes, so saving identical
+    models twice yields the same version.
+    """
+    hashes = {}
+    for name in sorted(files):
+        path = os.path.join(model_dir, name)
+        hashes[name] = {'sha256': file_sha256(path), 'bytes': os.path.getsize(path)}
+    version = hashlib.sha1(
+        json.dumps({name: entry['sha256'] for name, entry in hashes.items()}, sort_keys=True).encode()
+    ).hexdigest()[:16]
+    return {
+        'format_version': MANIFEST_FORMAT_VERSION,
+        'model_version': version,
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'layout': layout,
+        'targets': list(targets),
+        'feature_names': list(feature_names),
+        'files': hashes,
+        'metrics': {target: {name: float(value) for name, value in values.items()}
+                    for target, values in (metrics or {}).items()}
+    }
+
+def _write_atomic(path: str, text: str):
+    """Write a file through a temporary file and an atomic rename"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def write_manifest(model_dir: str, manifest: Dict):
+    _write_atomic(os.path.join(model_dir, MANIFEST_FILE), json.dumps(manifest, indent=2))
+
+def read_manifest(model_dir: str) -> Optional[Dict]:
+    """The manifest in model_dir, or None when there is none (or it is unreadable)"""
+    try:
+        with open(os.path.join(model_dir, MANIFEST_FILE), 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if isinstance(manifest, dict) and 'model_version' in manifest else None
+
+def verify_manifest(model_dir: str, manifest: Dict, check_hashes: bool = False) -> List[str]:
+    """Problems with the files listed in the manifest (empty when they all match)
+    
+    Sizes are always compared; check_hashes also re-hashes every file.
+    """
+    problems = []
+    for name, entry in manifest.get('files', {}).items():
+        path = os.path.join(model_dir, name)
+        if not os.path.isfile(path):
+            problems.append(f"{name}: missing")
+        elif os.path.getsize(path) != entry['bytes']:
+            problems.append(f"{name}: size {os.path.getsize(path)} != {entry['bytes']}")
+        elif check_hashes and file_sha256(path) != entry['sha256']:
+            problems.append(f"{name}: sha256 mismatch")
+    return problems
+
+def current_version(model_dir: str) -> Optional[str]:
+    """Version named by model_dir/CURRENT, or None for a flat model directory"""
+    try:
+        with open(os.path.join(model_dir, CURRENT_FILE), 'r') as f:
+            version = f.read().strip()
+    except OSError:
+        return None
+    return version or None
+
+def resolve_model_dir(model_dir: str) -> str:
+    """Directory holding the active model set"""
+    version = current_version(model_dir)
+    return os.path.join(model_dir, VERSIONS_DIR, version) if version else model_dir
+
+def create_staging_dir(model_dir: str) -> str:
+    """Empty directory, private to this process, to save a new model set into"""
+    path = os.path.join(model_dir, VERSIONS_DIR, f".staging-{os.getpid()}")
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    return path
+
+def activate_version(model_dir: str, version: str):
+    """Atomically point CURRENT at an existing version"""
+    if read_manifest(os.path.join(model_dir, VERSIONS_DIR, version)) is None:
+        raise ValueError(f"No complete model version {version} in {model_dir}")
+    _write_atomic(os.path.join(model_dir, CURRENT_FILE), version + "\n")
+
+def publish_version(model_dir: str, staging_path: str, version: str, keep: int = 3) -> str:
+    """Move a staged model set to versions/<version>, activate it and prune old versions"""
+    version_path = os.path.join(model_dir, VERSIONS_DIR, version)
+    if os.path.isdir(version_path):
+        # The same models were published before
+        shutil.rmtree(staging_path)
+    else:
+        os.replace(staging_path, version_path)
+    activate_version(model_dir, version)
+    prune_versions(model_dir, keep)
+    return version_path
+
+def list_versions(model_dir: str) -> List[Dict]:
+    """Every complete version, newest first"""
+    versions_path = os.path.join(model_dir, VERSIONS_DIR)
+    current = current_version(model_dir)
+    try:
+        names = os.listdir(versions_path)
+    except FileNotFoundError:
+        return []
+    versions = []
+    for name in names:
+        manifest_path = os.path.join(versions_path, name, MANIFEST_FILE)
+        if name.startswith(".") or not os.path.isfile(manifest_path):
+            continue
+        manifest = read_manifest(os.path.join(versions_path, name))
+        versions.append({
+            'version': name,
+            'current': name == current,
+            'created_at': manifest['created_at'] if manifest else None,
+            'layout': manifest['layout'] if manifest else None,
+            'saved_at': os.path.getmtime(manifest_path)
+        })
+    return sorted(versions, key=lambda entry: entry['saved_at'], reverse=True)
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _remove_pin(path: str, pid: int):
+    # Forked children inherit atexit handlers; only the pinning process removes its pin
+    if os.getpid() == pid:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def pin_version(model_dir: str, version: str):
+    """Record that this process still reads files of version, until it exits"""
+    pins_path = os.path.join(model_dir, VERSIONS_DIR, PINS_DIR)
+    os.makedirs(pins_path, exist_ok=True)
+    pid = os.getpid()
+    path = os.path.join(pins_path, str(pid))
+    if path not in _pin_paths:
+        _pin_paths.add(path)
+        atexit.register(_remove_pin, path, pid)
+    # No fsync: after a crash the pin is stale anyway
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(version)
+    os.replace(tmp_path, path)
+
+def pinned_versions(model_dir: str) -> Set[str]:
+    """Versions pinned by live processes; pins of exited processes are removed"""
+    pins_path = os.path.join(model_dir, VERSIONS_DIR, PINS_DIR)
+    try:
+        names = os.listdir(pins_path)
+    except FileNotFoundError:
+        return set()
+    pinned = set()
+    for name in names:
+        path = os.path.join(pins_path, name)
+        if not name.isdigit():
+            continue
+        if not _pid_alive(int(name)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            continue
+        try:
+            with open(path, 'r') as f:
+                pinned.add(f.read().strip())
+        except FileNotFoundError:
+            continue
+    return pinned
+
+def prune_versions(model_dir: str, keep: int = 3) -> List[str]:
+    """Delete all but the keep newest versions, never the current one or a pinned one"""
+    pinned = pinned_versions(model_dir)
+    removed = []
+    for index, entry in enumerate(list_versions(model_dir)):
+        if index >= max(keep, 1) and not entry['current'] and entry['version'] not in pinned:
+            shutil.rmtree(os.path.join(model_dir, VERSIONS_DIR, entry['version']), ignore_errors=True)
+            removed.append(entry['version'])
+    return removed
@@ -0,0 +1,101 @@
+"""
+Forest size and depth tuning under an accuracy tolerance
+
+For each target a sweep fits one forest per max_depth with the largest tree
+count; smaller tree counts are evaluated on the first n trees of that forest,
+which are exactly the trees a smaller forest with the same random_state
+would grow. Every candidate gets held-out MAE/R², the measured latency of a
+single-row predict and its pickled size, and the cheapest candidate whose MAE
+is within the tolerance of the best one is selected.
+"""
+
+import os
+import json
+import copy
+import time
+import pickle
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+TUNING_FILE = "tuning.json"
+DEFAULT_N_ESTIMATORS = (10, 25, 50, 100)
+DEFAULT_MAX_DEPTHS = (4, 6, 8, 10, None)
+DEFAULT_PARAMS = {'n_estimators': 100, 'max_depth': 10}
+
+def _sub_forest(forest, n_estimators: int):
+    """The forest restricted to its first n_estimators trees"""
+    sub = copy.copy(forest)
+    sub.estimators_ = forest.estimators_[:n_estimators]
+    sub.n_estimators = n_estimators
+    return sub
+
+def _predict_latency_ms(model, row: np.ndarray, runs: int) -> float:
+    """Median single-row predict time"""
+    model.predict(row)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model.predict(row)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def sweep_forest(X_train: np.ndarray, y_train: np.ndarray, X_test: np.ndarray, y_test: np.ndarray,
+                 n_estimators: Sequence[int] = DEFAULT_N_ESTIMATORS,
+                 max_depths: Sequence[Optional[int]] = DEFAULT_MAX_DEPTHS,
+                 n_jobs: int = -1, latency_runs: int = 20, random_state: int = 42) -> List[Dict]:
+    """Score every (n_estimators, max_depth) pair on the held-out split
+    
+    y may hold several (standardized) outputs, whose MAE and R² are averaged.
+    """
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.metrics import mean_absolute_error, r2_score
+    
+    n_estimators = sorted(set(n_estimators))
+    row = X_test[:1]
+    candidates = []
+    for max_depth in max_depths:
+        forest = RandomForestRegressor(n_estimators=n_estimators[-1], max_depth=max_depth,
+                                       random_state=random_state, n_jobs=n_jobs)
+        forest.fit(X_train, y_train)
+        
+        # Cumulative tree predictions give every smaller forest's prediction
+        tree_sum = np.zeros(np.shape(y_test))
+        built = 0
+        for count in n_estimators:
+            for tree in forest.estimators_[built:count]:
+                tree_sum += tree.predict(X_test)
+            built = count
+            y_pred = tree_sum / count
+            sub = _sub_forest(forest, count)
+            candidates.append({
+                'n_estimators': count,
+                'max_depth': max_depth,
+                'mae': float(mean_absolute_error(y_test, y_pred)),
+                'r2': float(r2_score(y_test, y_pred)),
+                'predict_ms': _predict_latency_ms(sub, row, latency_runs),
+                'bytes': len(pickle.dumps(sub, protocol=pickle.HIGHEST_PROTOCOL))
+            })
+    return candidates
+
+def select_candidate(candidates: List[Dict], tolerance: float = 0.02) -> Dict:
+    """Cheapest candidate (latency, then size) with MAE within tolerance of the best"""
+    best_mae = min(candidate['mae'] for candidate in candidates)
+    acceptable = [candidate for candidate in candidates if candidate['mae'] <= best_mae * (1 + tolerance)]
+    return min(acceptable, key=lambda candidate: (candidate['predict_ms'], candidate['bytes']))
+
+def read_tuning(model_dir: str) -> Optional[Dict]:
+    """tuning.json from model_dir, or None"""
+    try:
+        with open(os.path.join(model_dir, TUNING_FILE), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_tuning(model_dir: str, tuning: Dict) -> str:
+    os.makedirs(model_dir, exist_ok=True)
+    path = os.path.join(model_dir, TUNING_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(tuning, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,380 @@
+"""
+Benchmarks for the nutrition prediction pipeline
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+from typing import Dict, List
+
+import numpy as np
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules whose import cost the prediction path tries to avoid
+HEAVY_MODULES = ["pandas", "sklearn", "scipy", "joblib"]
+
+# Flags mlNutritionService.predictNutritionOnce passes to `nutrition_cli.py predict`
+# (plus --metrics when ML_METRICS is set); keep both in sync so that cold predict
+# timings measure the command the backend runs
+NODE_PREDICT_FLAGS = ["--strict", "--disk-cache", "--lazy"]
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+def measure_import_time(module: str = "nutrition_model") -> Dict:
+    """Import module in a fresh interpreter under `python -X importtime`
+    
+    Returns the total import time, the slowest top-level imports and which
+    heavy modules were pulled in.
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ML_DIR, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    
+    imports = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append({
+                "name": name,
+                "depth": len(indent) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000
+            })
+    
+    top_level = [entry for entry in imports if entry["depth"] == 0]
+    loaded = {entry["name"].split(".")[0] for entry in imports}
+    return {
+        "module": module,
+        "wall_ms": wall_ms,
+        "import_ms": sum(entry["cumulative_ms"] for entry in top_level),
+        "slowest": sorted(top_level, key=lambda entry: entry["cumulative_ms"], reverse=True)[:10],
+        "heavy_modules": [name for name in HEAVY_MODULES if name in loaded]
+    }
+
+def measure_cold_predict(args: List[str], runs: int = 3) -> Dict:
+    """Time `nutrition_cli.py predict` end to end in fresh processes
+    
+    With --strict and --metrics, runs answered from the persistent
+    prediction cache are counted in disk_cache_hits.
+    """
+    timings, hits = [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "nutrition_cli.py", "predict", *args],
+            cwd=ML_DIR, capture_output=True, text=True
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or result.stdout.strip())
+        if "--strict" in args and "--metrics" in args:
+            metrics = json.loads(result.stdout.strip().splitlines()[-1]).get("metrics") or {}
+            hits += metrics.get("counters", {}).get("disk_cache_hit", 0)
+    
+    timings.sort()
+    return {"command": ["predict", *args], "runs": runs, "min_ms": timings[0],
+            "median_ms": timings[len(timings) // 2], "disk_cache_hits": hits}
+
+def node_predict_args(food_name: str = "apple", portion_size: float = 150,
+                      food_category: str = "fruit", portion_unit: str = "g") -> List[str]:
+    """`predict` arguments of the one-off prediction the Node backend spawns, with --metrics"""
+    return ["--food-name", food_name, "--portion-size", str(portion_size),
+            "--food-category", food_category, "--portion-unit", portion_unit,
+            *NODE_PREDICT_FLAGS, "--metrics"]
+
+def _percentiles(timings_ms: List[float]) -> Dict:
+    values = np.sort(np.asarray(timings_ms))
+    return {
+        "runs": len(values),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "mean_ms": float(values.mean()),
+        "max_ms": float(values[-1])
+    }
+
+def current_rss_mb() -> float:
+    """Resident set size of this process (Linux), falling back to the peak"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def process_memory_mb(pid: int) -> Dict:
+    """RSS, PSS and private memory of a process (Linux smaps_rollup)
+    
+    PSS splits shared pages between the processes sharing them, so summing
+    it over a parent and its forked workers gives their real footprint.
+    """
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss_mb": round(fields.get("Rss", 0.0), 1),
+        "pss_mb": round(fields.get("Pss", 0.0), 1),
+        "private_mb": round(fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0), 1)
+    }
+
+def _quiet():
+    """Silence the pipeline's progress prints while timing"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+def benchmark_load(model_dir: str = "models", runs: int = 3) -> Dict:
+    """Time load_models (eager and lazy) and the memory it adds"""
+    from nutrition_model import NutritionPredictor
+    
+    results = {}
+    for mode, lazy in (("eager", False), ("lazy", True)):
+        timings = []
+        for _ in range(runs):
+            rss_before = current_rss_mb()
+            predictor = NutritionPredictor(model_dir)
+            start = time.perf_counter()
+            with _quiet():
+                loaded = predictor.load_models(lazy=lazy)
+            timings.append((time.perf_counter() - start) * 1000)
+            rss_added = current_rss_mb() - rss_before
+            del predictor
+        if not loaded:
+            raise RuntimeError(f"No trained models found in {model_dir}")
+        results[mode] = {**_percentiles(timings), "rss_added_mb": rss_added}
+    return results
+
+def benchmark_predict(model_dir: str = "models", runs: int = 200,
+                      batch_sizes: List[int] = (10, 100, 1000)) -> Dict:
+    """p50/p99 latency of single and batched predictions, via the lookup table and the forests"""
+    from nutrition_model import NutritionPredictor
+    
+    predictor = NutritionPredictor(model_dir)
+    with _quiet():
+        if not predictor.load_models():
+            raise RuntimeError(f"No trained models found in {model_dir}")
+    foods = [str(food) for food in predictor.vocabularies["food_name"]]
+    rng = np.random.default_rng(0)
+    
+    def items(n):
+        return [{"food_name": foods[i % len(foods)], "portion_size": float(size)}
+                for i, size in enumerate(rng.uniform(10, 500, n).round(1))]
+    
+    results = {}
+    for path, use_lookup in (("lookup", True), ("forest", False)):
+        predictor.use_lookup = use_lookup
+        path_runs = runs if use_lookup else max(runs // 10, 5)
+        timings = []
+        with _quiet():
+            for item in items(path_runs):
+                start = time.perf_counter()
+                predictor.predict_nutrition(item["food_name"], item["portion_size"])
+                timings.append((time.perf_counter() - start) * 1000)
+        results[path] = {"single": _percentiles(timings)}
+        
+        for size in batch_sizes:
+            batch = items(size)
+            timings = []
+            for _ in range(max(path_runs // 20, 3)):
+                start = time.perf_counter()
+                predictor.predict_nutrition_batch(batch)
+                timings.append((time.perf_counter() - start) * 1000)
+            stats = _percentiles(timings)
+            stats["items_per_second"] = size / (stats["p50_ms"] / 1000)
+            results[path][f"batch_{size}"] = stats
+    results["rss_mb"] = current_rss_mb()
+    return results
+
+def benchmark_generate(sizes: List[int] = (1000, 10000, 100000)) -> Dict:
+    """Time dataset generation (CSV) at several sizes"""
+    from dataset_generator import NutritionDatasetGenerator
+    
+    generator = NutritionDatasetGenerator()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f"bench_{size}.csv")
+            start = time.perf_counter()
+            with _quiet():
+                generator.generate_dataset(path, size, seed=42)
+            seconds = time.perf_counter() - start
+            results[str(size)] = {"seconds": seconds, "rows_per_second": size / seconds,
+                                  "bytes": os.path.getsize(path)}
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+def benchmark_train(records: int = 5000, workers: int = 1) -> Dict:
+    """Train every per-target model on a generated dataset in a scratch model directory"""
+    from dataset_generator import NutritionDatasetGenerator
+    from nutrition_model import NutritionPredictor
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset_path = os.path.join(tmp, "bench_dataset.csv")
+        with _quiet():
+            NutritionDatasetGenerator().generate_dataset(dataset_path, records, seed=42)
+        predictor = NutritionPredictor(os.path.join(tmp, "models"))
+        predictor.train_workers = workers
+        start = time.perf_counter()
+        with _quiet():
+            results = predictor.train_models(dataset_path)
+        total = time.perf_counter() - start
+    
+    return {
+        "records": records,
+        "workers": workers,
+        "total_seconds": total,
+        "targets": {target: {"fit_seconds": metrics.get("fit_seconds"), "r2": metrics["r2"]}
+                    for target, metrics in results.items()},
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+def environment() -> Dict:
+    import numpy
+    info = {"python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "numpy": numpy.__version__}
+    try:
+        import sklearn
+        info["scikit_learn"] = sklearn.__version__
+    except ImportError:
+        pass
+    return info
+
+BENCHMARKS = ("import", "load", "predict", "train", "generate")
+
+def run_benchmarks(sections: List[str] = BENCHMARKS, model_dir: str = "models", quick: bool = False) -> Dict:
+    """Run the selected benchmarks and return one JSON-serializable report"""
+    report = {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "quick": quick, "environment": environment()}
+    if "import" in sections:
+        report["import"] = {module: measure_import_time(module)
+                            for module in ("nutrition_model", "nutrition_cli")}
+        for entry in report["import"].values():
+            entry["slowest"] = entry["slowest"][:5]
+        try:
+            report["cold_predict"] = measure_cold_predict(node_predict_args(), runs=2 if quick else 5)
+        except RuntimeError as e:
+            report["cold_predict"] = {"error": str(e)}
+    if "load" in sections:
+        report["load"] = benchmark_load(model_dir, runs=2 if quick else 5)
+    if "predict" in sections:
+        report["predict"] = benchmark_predict(model_dir, runs=50 if quick else 500,
+                                              batch_sizes=(10, 100) if quick else (10, 100, 1000))
+    if "train" in sections:
+        report["train"] = benchmark_train(records=2000 if quick else 5000)
+    if "generate" in sections:
+        report["generate"] = benchmark_generate((1000, 10000) if quick else (1000, 10000, 100000))
+    return report
+
+def _socket_request(path: str, payload: bytes) -> bytes:
+    """Send one request line on a new connection and return the response line"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path)
+        client.sendall(payload)
+        response = b""
+        while not response.endswith(b"\n"):
+            chunk = client.recv(1 << 16)
+            if not chunk:
+                raise ConnectionError("Connection closed before the response")
+            response += chunk
+    return response
+
+def _loadtest_client(job) -> List[float]:
+    """Latencies of a list of requests sent one after the other"""
+    path, payloads = job
+    timings = []
+    for payload in payloads:
+        start = time.perf_counter()
+        response = json.loads(_socket_request(path, payload))
+        if not response.get("ok"):
+            raise RuntimeError(f"Request failed: {response.get('error')}")
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def run_loadtest(worker_counts: List[int] = (1, 2, 4), requests: int = 500, clients: int = 0,
+                 use_lookup: bool = False, model_dir: str = "models") -> Dict:
+    """Throughput and memory of `serve --socket` for each number of workers
+    
+    clients processes (default: twice the largest worker count) send
+    requests for random vocabulary foods, one connection per request, so
+    every run sees the same offered load. The in-process cache is off, and
+    by default known foods go through the forests rather than the per-100g
+    table, so each request does real model work.
+    """
+    from nutrition_model import NutritionPredictor
+    
+    predictor = NutritionPredictor(model_dir)
+    with _quiet():
+        if not predictor.load_models(lazy=True):
+            raise RuntimeError(f"No trained models found in {model_dir}")
+    foods = [str(food) for food in predictor.vocabularies["food_name"]]
+    del predictor
+    
+    rng = np.random.default_rng(0)
+    payloads = [(json.dumps({"op": "predict", "id": i, "food_name": foods[rng.integers(len(foods))],
+                             "portion_size": float(size)}) + "\n").encode()
+                for i, size in enumerate(rng.uniform(10, 500, requests).round(1))]
+    clients = clients or 2 * max(worker_counts)
+    
+    results = {"requests": requests, "clients": clients, "use_lookup": use_lookup,
+               "environment": environment(), "runs": {}}
+    for workers in worker_counts:
+        path = os.path.join(tempfile.mkdtemp(prefix="nutrition-loadtest-"), "serve.sock")
+        command = [sys.executable, "nutrition_cli.py", "serve", "--socket", path, "--workers", str(workers),
+                   "--cache-size", "0", "--reload-interval", "0"]
+        if not use_lookup:
+            command.append("--no-lookup")
+        server = subprocess.Popen(command, cwd=ML_DIR, stdout=subprocess.PIPE,
+                                  stderr=subprocess.DEVNULL, text=True)
+        try:
+            ready = json.loads(server.stdout.readline() or "{}")
+            if not ready.get("ok"):
+                raise RuntimeError(f"Server did not start: {ready.get('error')}")
+            idle = {pid: process_memory_mb(pid) for pid in [ready["pid"], *ready["workers"]]}
+            
+            jobs = [(path, payloads[i::clients]) for i in range(clients)]
+            with Pool(clients) as pool:
+                pool.map(_loadtest_client, [(path, payloads[:1])] * clients)
+                start = time.perf_counter()
+                timings = [t for chunk in pool.map(_loadtest_client, jobs) for t in chunk]
+                elapsed = time.perf_counter() - start
+            
+            loaded = {pid: process_memory_mb(pid) for pid in idle}
+            worker_memory = [loaded[pid] for pid in ready["workers"]]
+            results["runs"][str(workers)] = {
+                **_percentiles(timings),
+                "requests_per_second": round(len(timings) / elapsed, 1),
+                "parent": loaded[ready["pid"]],
+                "workers": worker_memory,
+                "worker_private_mb_mean": round(float(np.mean([m["private_mb"] for m in worker_memory])), 1),
+                "total_pss_mb": round(sum(m["pss_mb"] for m in loaded.values()), 1),
+                "idle_total_pss_mb": round(sum(m["pss_mb"] for m in idle.values()), 1)
+            }
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+    
+    # Throughput relative to one worker (extrapolated from the first run)
+    baseline = results["runs"][str(worker_counts[0])]["requests_per_second"] / worker_counts[0]
+    for workers in worker_counts:
+        run = results["runs"][str(workers)]
+        run["speedup"] = round(run["requests_per_second"] / baseline, 2)
+    return results
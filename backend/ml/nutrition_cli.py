@@ -4,52 +4,466 @@ CLI interface for the Nutrition Predictor model
 Usage: python nutrition_cli.py [command] [options]
 """
 
+import io
 import sys
 import json
+import math
+import time
+import select
 import argparse
-from nutrition_model import NutritionPredictor
+import threading
+import contextlib
+from nutrition_model import NutritionPredictor, UNKNOWN_STRATEGIES
+from prediction_cache import DiskPredictionCache, PredictionCache
+from prediction_metrics import PredictionMetrics
+from model_tuning import DEFAULT_MAX_DEPTHS, DEFAULT_N_ESTIMATORS, read_tuning, write_tuning
+from model_manifest import activate_version, current_version, list_versions, read_manifest, resolve_model_dir, verify_manifest
+from columnar_dataset import find_columnar_dataset
 import os
 
+# Version of the JSON envelope written by predict --strict, predict-batch and serve
+PROTOCOL_VERSION = 1
+
+# error.code values of failed responses
+INVALID_REQUEST = "invalid_request"
+UNKNOWN_OP = "unknown_op"
+NO_PREDICTION = "no_prediction"
+MODELS_UNAVAILABLE = "models_unavailable"
+INTERNAL_ERROR = "internal_error"
+
+def _prediction_options(args):
+    """Predictor settings that change predictions, which keep persistent cache entries apart"""
+    return {
+        "unknown_strategy": args.unknown_strategy,
+        "use_lookup": not args.no_lookup,
+        "min_name_confidence": args.min_name_confidence
+    }
+
+def _load_predictor(args, metrics=None, cache=None):
+    """Create a predictor and load its models as selected on the command line
+    
+    cache, when given, is reused instead of creating the caches selected by args.
+    """
+    predictor = NutritionPredictor()
+    predictor.metrics = metrics or PredictionMetrics(enabled=args.metrics)
+    predictor.unknown_strategy = args.unknown_strategy
+    predictor.min_name_confidence = args.min_name_confidence
+    predictor.use_lookup = not args.no_lookup
+    targets = args.targets.split(",") if args.targets else None
+    mmap_mode = "r" if args.mmap else None
+    if cache is not None:
+        predictor.cache = cache
+    else:
+        disk_cache = (DiskPredictionCache(predictor.model_dir, options=_prediction_options(args))
+                      if getattr(args, "disk_cache", False) else None)
+        if getattr(args, "cache_size", 0) > 0:
+            predictor.cache = PredictionCache(predictor.model_dir, max_entries=args.cache_size,
+                                              ttl_seconds=args.cache_ttl, next_level=disk_cache)
+        else:
+            predictor.cache = disk_cache
+    if not predictor.load_models(targets=targets, lazy=args.lazy, mmap_mode=mmap_mode):
+        return None
+    return predictor
+
+class PredictorReloader:
+    """Hot-swap a long-lived predictor when a new model version is published
+    
+    get() looks at models/CURRENT at most every check_interval seconds. A new
+    version is loaded in a background thread while the current predictor
+    keeps answering, and replaces it on the first get() after loading, so
+    requests are never dropped or held up by the load. The new predictor
+    shares the cache and metrics of the old one. check_interval <= 0
+    disables reloading.
+    """
+    
+    def __init__(self, args, predictor, check_interval=1.0):
+        self.args = args
+        self.predictor = predictor
+        self.check_interval = check_interval
+        self._checked_at = time.monotonic()
+        self._loading = False
+        self._loaded = None
+        self._failed_version = None
+    
+    def get(self):
+        loaded, self._loaded = self._loaded, None
+        if loaded is not None:
+            previous = self.predictor.model_version
+            self.predictor = loaded
+            if loaded.cache is not None:
+                loaded.cache.invalidate()
+            loaded.metrics.count("model_swaps")
+            print(f"🔄 Swapped models {previous} -> {loaded.model_version}")
+        
+        now = time.monotonic()
+        if self.check_interval > 0 and not self._loading and now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            version = current_version(self.predictor.model_dir)
+            if version not in (None, self.predictor.model_version, self._failed_version):
+                self._loading = True
+                threading.Thread(target=self._load, args=(version,), daemon=True).start()
+        return self.predictor
+    
+    def _load(self, version):
+        try:
+            predictor = _load_predictor(self.args, self.predictor.metrics, cache=self.predictor.cache)
+        except Exception as e:
+            print(f"Error loading model version {version}: {e}")
+            predictor = None
+        if predictor is None:
+            self._failed_version = version
+        else:
+            self._loaded = predictor
+        self._loading = False
+
+def _add_loading_arguments(parser):
+    """Model loading options shared by the prediction commands"""
+    parser.add_argument("--targets", default=None,
+                        help="Comma-separated nutrients to load and predict (default: all)")
+    parser.add_argument("--lazy", action="store_true",
+                        help="Load each model on first use instead of at startup")
+    parser.add_argument("--mmap", action="store_true",
+                        help="Memory-map model arrays when loading")
+    parser.add_argument("--unknown-strategy", choices=UNKNOWN_STRATEGIES, default="category",
+                        help="How unseen foods, categories and units are handled")
+    parser.add_argument("--min-name-confidence", type=float, default=0.6,
+                        help="Lowest fuzzy match score accepted when resolving food names (above 1 disables matching)")
+    parser.add_argument("--no-lookup", action="store_true",
+                        help="Predict known foods with the forests instead of the per-100g table")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Record stage timings and counters and include them in the output")
+
+def _add_reload_arguments(parser):
+    """Hot-swap option for the long-running prediction commands"""
+    parser.add_argument("--reload-interval", type=float, default=1.0,
+                        help="Seconds between checks for a newly published model version (0 disables)")
+
+def _add_cache_arguments(parser):
+    """In-process prediction cache options for long-running commands"""
+    parser.add_argument("--cache-size", type=int, default=10000,
+                        help="Predictions kept in the in-process LRU cache (0 disables it)")
+    parser.add_argument("--cache-ttl", type=float, default=3600,
+                        help="Seconds a cached prediction stays valid")
+    parser.add_argument("--disk-cache", action="store_true",
+                        help="Also use the persistent prediction cache shared by all processes")
+
 def train_model(args):
     """Train the nutrition prediction model"""
     predictor = NutritionPredictor()
+    predictor.train_workers = args.workers
+    predictor.threads_per_model = args.threads_per_model
+    predictor.keep_versions = args.keep_versions
+    predictor.use_tuning = not args.no_tuning
     
     # Use existing dataset
     dataset_path = args.dataset_path
     
-    # Check if dataset exists
-    if not os.path.exists(dataset_path):
+    # Check if dataset exists (as CSV or columnar files)
+    if not os.path.exists(dataset_path) and not find_columnar_dataset(dataset_path):
         print(f"❌ Dataset not found: {dataset_path}")
         print("💡 Please run dataset_generator.py first to create the dataset.")
         return {}
     
     # Train models
     print("Training nutrition prediction models...")
-    results = predictor.train_models(dataset_path)
+    if args.streaming:
+        results = predictor.train_models_streaming(
+            dataset_path,
+            chunk_size=args.chunk_size,
+            sample_size=args.sample_size,
+            multi_output=args.multi_output
+        )
+    else:
+        results = predictor.train_models(dataset_path, multi_output=args.multi_output)
     
     # Print results
     print("\nTraining Results:")
     for target, metrics in results.items():
-        print(f"{target}: MAE={metrics['mae']:.2f}, R²={metrics['r2']:.3f}")
+        print(f"{target}: MAE={metrics['mae']:.2f}, R²={metrics['r2']:.3f}"
+              + (f", fit={metrics['fit_seconds']:.2f}s" if 'fit_seconds' in metrics else ""))
     
     return results
 
-def predict_nutrition(args):
-    """Make nutrition predictions"""
+def update_model(args):
+    """Fold new rows (e.g. exported food entries) into the current models"""
+    if not os.path.exists(args.dataset_path):
+        print(f"❌ Update dataset not found: {args.dataset_path}")
+        print("💡 Run `node export_food_entries.js` in the backend to export logged food entries.")
+        return 1
+    
     predictor = NutritionPredictor()
+    predictor.threads_per_model = args.threads_per_model
+    predictor.keep_versions = args.keep_versions
+    results = predictor.update_models(args.dataset_path, new_trees=args.new_trees,
+                                      min_rows=args.min_rows, force=args.force)
+    if results is None:
+        return 1
+    print(f"✅ Model version {predictor.model_version} "
+          f"({len(predictor.update_history)} updates since the last full training)")
     
-    # Load trained models
-    if not predictor.load_models():
-        print("Error: No trained models found. Please train models first.")
-        return None
+    if args.json_output:
+        print(json.dumps({"model_version": predictor.model_version, "targets": results}, indent=2))
+    return 0
+
+def _parse_int_list(value, allow_none=False):
+    """Comma-separated integers; with allow_none, "none" means unlimited"""
+    items = []
+    for item in value.split(","):
+        item = item.strip().lower()
+        items.append(None if allow_none and item == "none" else int(item))
+    return items
+
+def tune_models(args):
+    """Sweep forest size and depth and save the cheapest accurate settings for train"""
+    predictor = NutritionPredictor()
+    predictor.threads_per_model = args.threads_per_model
+    
+    if not os.path.exists(args.dataset_path) and not find_columnar_dataset(args.dataset_path):
+        print(f"❌ Dataset not found: {args.dataset_path}")
+        print("💡 Please run dataset_generator.py first to create the dataset.")
+        return {}
     
-    # Make prediction
-    prediction = predictor.predict_nutrition(
-        food_name=args.food_name,
-        portion_size=args.portion_size,
-        food_category=args.food_category,
-        portion_unit=args.portion_unit
+    tuning = predictor.tune_models(
+        args.dataset_path,
+        n_estimators=_parse_int_list(args.n_estimators),
+        max_depths=_parse_int_list(args.max_depths, allow_none=True),
+        tolerance=args.tolerance,
+        multi_output=args.multi_output
     )
+    if not tuning:
+        return {}
+    
+    # Keep settings tuned earlier for the other layout
+    previous = read_tuning(predictor.model_dir) or {}
+    tuning['targets'] = {**previous.get('targets', {}), **tuning['targets']}
+    path = write_tuning(predictor.model_dir, tuning)
+    
+    print("\nTuned forests (chosen vs. default 100 trees, max_depth=10):")
+    for name, chosen in tuning['targets'].items():
+        baseline = chosen.get('baseline')
+        line = (f"  {name}: {chosen['n_estimators']} trees, max_depth={chosen['max_depth']}, "
+                f"MAE={chosen['mae']:.3f}, {chosen['predict_ms']:.2f}ms, {chosen['bytes'] / 1e6:.2f}MB")
+        if baseline:
+            line += (f" (default: MAE={baseline['mae']:.3f}, {baseline['predict_ms']:.2f}ms, "
+                     f"{baseline['bytes'] / 1e6:.2f}MB)")
+        print(line)
+    print(f"✅ Saved {path}; train will use these settings")
+    
+    if args.json_output:
+        print(json.dumps(tuning, indent=2))
+    return tuning
+
+def evaluate_models(args):
+    """Cross-validate the per-target forests and print per-target and per-food errors"""
+    if not os.path.exists(args.dataset_path) and not find_columnar_dataset(args.dataset_path):
+        print(f"❌ Dataset not found: {args.dataset_path}")
+        print("💡 Please run dataset_generator.py first to create the dataset.")
+        return 1
+    if args.folds < 2:
+        print("❌ --folds must be at least 2")
+        return 1
+    
+    if args.workers is None:
+        # A pool on a single CPU only adds process start-up and copying
+        cpus = os.cpu_count() or 1
+        args.workers = min(args.folds, cpus) if cpus > 1 else 1
+    
+    predictor = NutritionPredictor()
+    predictor.train_workers = args.workers
+    predictor.threads_per_model = args.threads_per_model
+    predictor.use_tuning = not args.no_tuning
+    try:
+        evaluation = predictor.evaluate_models(args.dataset_path, folds=args.folds,
+                                               group_by_food=args.group_by_food,
+                                               top_foods=args.top_foods or None,
+                                               sort_target=args.sort_target)
+    except ValueError as e:
+        # e.g. fewer foods than folds with --group-by-food
+        print(f"❌ Evaluation failed: {e}")
+        return 1
+    if not evaluation:
+        return 1
+    
+    print(f"\nCross-validation ({evaluation['folds']} folds"
+          + (", grouped by food" if evaluation['group_by_food'] else "") + f", {evaluation['rows']} rows):")
+    print(f"{'target':16}{'MAE':>10}{'± std':>9}{'RMSE':>10}{'R²':>8}{'± std':>8}{'fit (s)':>9}")
+    for target, metrics in evaluation['targets'].items():
+        print(f"{target:16}{metrics['mae']:>10.3f}{metrics['mae_std']:>9.3f}{metrics['rmse']:>10.3f}"
+              f"{metrics['r2']:>8.3f}{metrics['r2_std']:>8.3f}{metrics['fit_seconds']:>9.2f}")
+    
+    sort_target = evaluation['sort_target']
+    columns = [sort_target] + [target for target in ('protein', 'fat', 'carbohydrates')
+                               if target in evaluation['targets'] and target != sort_target]
+    print(f"\nFoods with the largest {sort_target} MAE:")
+    print(f"{'food':28}{'rows':>7}{'mean':>10}{'rel':>7}" + "".join(f"{target[:13]:>14}" for target in columns))
+    for food in evaluation['foods']:
+        relative = f"{food['relative_mae']:.0%}" if food['relative_mae'] is not None else "-"
+        print(f"{food['food'][:27]:28}{food['rows']:>7}{food['mean_' + sort_target]:>10.1f}{relative:>7}"
+              + "".join(f"{food['mae'][target]:>14.2f}" for target in columns))
+    
+    timings = evaluation['timings']
+    print(f"\n✅ Evaluated in {timings['wall_seconds']:.2f}s (prepare {timings['prepare_seconds']:.2f}s, "
+          f"fits {timings['fit_wall_seconds']:.2f}s wall for {timings['fit_task_seconds']:.2f}s of fitting)")
+    
+    if args.json_output:
+        print(json.dumps(evaluation, indent=2))
+    return 0
+
+def compare_models(args):
+    """Compare per-target and multi-output model layouts"""
+    if not os.path.exists(args.dataset_path) and not find_columnar_dataset(args.dataset_path):
+        print(f"❌ Dataset not found: {args.dataset_path}")
+        return {}
+    
+    predictor = NutritionPredictor()
+    comparison = predictor.compare_training_modes(args.dataset_path)
+    
+    print("\nModel layout comparison:")
+    print(f"{'':24}{'per_target':>14}{'multi_output':>14}")
+    rows = [
+        ("Fit time (s)", "fit_seconds", "{:.2f}"),
+        ("Single predict (ms)", "predict_single_ms", "{:.2f}"),
+        ("Batch predict (ms)", "predict_batch_ms", "{:.2f}"),
+        ("Model files", "model_files", "{}"),
+        ("Model size (MB)", "model_bytes", "{:.2f}"),
+        ("Tree nodes", "tree_nodes", "{}"),
+        ("Mean R²", "mean_r2", "{:.4f}")
+    ]
+    for label, key, fmt in rows:
+        values = [comparison[mode][key] for mode in ("per_target", "multi_output")]
+        if key == "model_bytes":
+            values = [value / 1e6 for value in values]
+        print(f"{label:24}" + "".join(f"{fmt.format(value):>14}" for value in values))
+    
+    print("\nPer-target MAE (per_target / multi_output):")
+    for target, metrics in comparison["per_target"]["targets"].items():
+        other = comparison["multi_output"]["targets"][target]
+        print(f"  {target}: {metrics['mae']:.2f} / {other['mae']:.2f}")
+    
+    if args.json_output:
+        print(json.dumps(comparison, indent=2))
+    
+    return comparison
+
+class ProtocolError(Exception):
+    """A request failure reported to the client with one of the error codes"""
+    
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+def _response(ok=True, **fields):
+    """Protocol envelope shared by predict --strict, predict-batch and serve"""
+    return {"protocol": PROTOCOL_VERSION, "ok": ok, **fields}
+
+def _error_response(error, **fields):
+    code = error.code if isinstance(error, ProtocolError) else INTERNAL_ERROR
+    return _response(False, error={"code": code, "message": str(error)}, **fields)
+
+def _write_message(out, message):
+    out.write(json.dumps(message, allow_nan=False) + "\n")
+    out.flush()
+
+def _parse_item(raw):
+    """Validate a prediction request and return it as a predictor item"""
+    if not isinstance(raw, dict):
+        raise ProtocolError(INVALID_REQUEST, "Request must be a JSON object")
+    for field in ("food_name", "portion_size"):
+        if field not in raw:
+            raise ProtocolError(INVALID_REQUEST, f"Missing field: {field}")
+    if not isinstance(raw["food_name"], str) or not raw["food_name"].strip():
+        raise ProtocolError(INVALID_REQUEST, "food_name must be a non-empty string")
+    try:
+        portion_size = float(raw["portion_size"])
+    except (TypeError, ValueError):
+        raise ProtocolError(INVALID_REQUEST, f"Invalid portion_size: {raw['portion_size']!r}")
+    if not math.isfinite(portion_size):
+        raise ProtocolError(INVALID_REQUEST, f"Invalid portion_size: {raw['portion_size']!r}")
+    if portion_size <= 0:
+        raise ProtocolError(INVALID_REQUEST, f"portion_size must be positive: {raw['portion_size']!r}")
+    return {
+        "food_name": raw["food_name"],
+        "portion_size": portion_size,
+        "food_category": str(raw.get("food_category") or "unknown"),
+        "portion_unit": str(raw.get("portion_unit") or "g")
+    }
+
+def _parse_targets(predictor, request):
+    """The request's list of nutrients to predict, or None for all of them"""
+    targets = request.get("targets")
+    if targets is None:
+        return None
+    if not isinstance(targets, list) or not all(isinstance(target, str) for target in targets):
+        raise ProtocolError(INVALID_REQUEST, "targets must be a list of nutrient names")
+    unknown = [target for target in targets if target not in predictor.nutrition_targets]
+    if unknown:
+        raise ProtocolError(INVALID_REQUEST, f"Unknown targets: {', '.join(map(repr, unknown))}")
+    return targets
+
+def _prediction_response(prediction, detail, version, **fields):
+    if not prediction:
+        raise ProtocolError(NO_PREDICTION, "No prediction available")
+    return _response(prediction=prediction, resolution=detail, model_version=version, **fields)
+
+def _predict_each(predictor, items, targets=None):
+    """(prediction, detail) or the raised exception for every item
+    
+    Items are predicted in one batch; if the batch raises, each item is
+    predicted on its own so that one failing item does not fail the others.
+    """
+    try:
+        predictions, details = predictor.predict_nutrition_batch(items, targets=targets, with_details=True)
+        return list(zip(predictions, details))
+    except Exception as e:
+        if len(items) <= 1:
+            predictor.metrics.error(e)
+            return [e] * len(items)
+    results = []
+    for item in items:
+        try:
+            predictions, details = predictor.predict_nutrition_batch([item], targets=targets, with_details=True)
+            results.append((predictions[0], details[0]))
+        except Exception as e:
+            predictor.metrics.error(e)
+            results.append(e)
+    return results
+
+def _disk_cache_lookup(args, metrics):
+    """(prediction, detail, model_version) from the persistent cache, or None"""
+    targets = tuple(args.targets.split(",")) if args.targets else None
+    cache = DiskPredictionCache(NutritionPredictor.DEFAULT_MODEL_DIR, options=_prediction_options(args))
+    with metrics.stage("disk_cache"):
+        cached = cache.get(args.food_name, args.food_category, args.portion_unit, args.portion_size, targets)
+    if cached is None:
+        return None
+    metrics.count("disk_cache_hit")
+    return cached[0], cached[1], cache.version
+
+def predict_nutrition(args):
+    """Make nutrition predictions"""
+    prediction, predictor = None, None
+    metrics = PredictionMetrics(enabled=args.metrics)
+    
+    # A persistent cache hit answers without loading any model
+    if args.disk_cache:
+        cached = _disk_cache_lookup(args, metrics)
+        if cached is not None:
+            prediction = cached[0]
+    
+    if prediction is None:
+        # Load trained models
+        predictor = _load_predictor(args, metrics)
+        if predictor is None:
+            print("Error: No trained models found. Please train models first.")
+            return None
+        
+        # Make prediction
+        prediction = predictor.predict_nutrition(
+            food_name=args.food_name,
+            portion_size=args.portion_size,
+            food_category=args.food_category,
+            portion_unit=args.portion_unit
+        )
     
     if prediction:
         print(f"Nutrition prediction for {args.portion_size}{args.portion_unit} of {args.food_name}:")
@@ -58,16 +472,425 @@ def predict_nutrition(args):
         
         # Return JSON for API integration
         if args.json_output:
-            print(json.dumps(prediction, indent=2))
+            output = dict(prediction)
+            if args.metrics:
+                snapshot = predictor.metrics_snapshot() if predictor else metrics.snapshot()
+                output["_metrics"] = {"timings_ms": metrics.request_timings(), **snapshot}
+            print(json.dumps(output, indent=2))
     
     return prediction
 
-def test_model(args):
-    """Test the model with sample predictions"""
+def predict_strict(args):
+    """Write exactly one protocol response line on stdout, with every log line on stderr"""
+    out = sys.stdout
+    start = time.perf_counter()
+    metrics = PredictionMetrics(enabled=args.metrics)
+    predictor = None
+    
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            item = _parse_item(vars(args))
+            cached = _disk_cache_lookup(args, metrics) if args.disk_cache else None
+            if cached is None:
+                predictor = _load_predictor(args, metrics)
+                if predictor is None:
+                    raise ProtocolError(MODELS_UNAVAILABLE, "No trained models found")
+                predictions, details = predictor.predict_nutrition_batch([item], with_details=True)
+                cached = predictions[0], details[0], predictor.model_version
+            response = _prediction_response(*cached)
+        except Exception as e:
+            metrics.error(e)
+            response = _error_response(e)
+    
+    response["timings_ms"] = {**metrics.request_timings(),
+                              "total": round((time.perf_counter() - start) * 1000, 3)}
+    if args.metrics:
+        response["metrics"] = predictor.metrics_snapshot() if predictor else metrics.snapshot()
+    _write_message(out, response)
+    return 0 if response["ok"] else 1
+
+def _read_batches(stream, batch_size):
+    """Yield lists of non-empty input lines, at most batch_size long
+    
+    A partial batch is yielded as soon as no more input is immediately
+    available, so a client writing one line at a time gets each answer
+    without waiting for batch_size lines or the end of input.
+    """
+    try:
+        fd = stream.fileno()
+        select.select([fd], [], [], 0)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        fd = None
+    
+    if fd is None:
+        lines = []
+        for line in stream:
+            if line.strip():
+                lines.append(line)
+            if len(lines) >= batch_size:
+                yield lines
+                lines = []
+        if lines:
+            yield lines
+        return
+    
+    lines, pending = [], b""
+    while True:
+        if lines and not select.select([fd], [], [], 0)[0]:
+            yield lines
+            lines = []
+        chunk = os.read(fd, 1 << 16)
+        if not chunk:
+            break
+        *complete, pending = (pending + chunk).split(b"\n")
+        lines.extend(line for line in complete if line.strip())
+        while len(lines) >= batch_size:
+            yield lines[:batch_size]
+            lines = lines[batch_size:]
+    if pending.strip():
+        lines.append(pending)
+    if lines:
+        yield lines
+
+def predict_batch(args):
+    """Make nutrition predictions for JSONL items read from stdin
+    
+    Writes one protocol response per input line, in input order, echoing
+    each item's id.
+    """
+    out = sys.stdout
+    
+    with contextlib.redirect_stdout(sys.stderr):
+        predictor = _load_predictor(args)
+        if predictor is None:
+            _write_message(out, _error_response(
+                ProtocolError(MODELS_UNAVAILABLE, "No trained models found")))
+            return 1
+        reloader = PredictorReloader(args, predictor, check_interval=args.reload_interval)
+        
+        for lines in _read_batches(sys.stdin, args.batch_size):
+            predictor = reloader.get()
+            start = time.perf_counter()
+            items, responses = [], []
+            for line in lines:
+                request_id = None
+                try:
+                    try:
+                        raw = json.loads(line)
+                    except ValueError as e:
+                        raise ProtocolError(INVALID_REQUEST, f"Invalid JSON: {e}")
+                    if isinstance(raw, dict):
+                        request_id = raw.get("id")
+                    items.append(_parse_item(raw))
+                    responses.append(request_id)
+                except ProtocolError as e:
+                    responses.append(_error_response(e, id=request_id))
+            
+            results = iter(_predict_each(predictor, items))
+            elapsed = round((time.perf_counter() - start) * 1000, 3)
+            for response in responses:
+                if not isinstance(response, dict):
+                    result = next(results)
+                    try:
+                        if isinstance(result, Exception):
+                            raise result
+                        response = _prediction_response(*result, predictor.model_version, id=response)
+                    except Exception as e:
+                        response = _error_response(e, id=response)
+                response["timings_ms"] = {"batch": elapsed}
+                _write_message(out, response)
+        
+        if args.metrics:
+            print(json.dumps({"metrics": predictor.metrics_snapshot()}))
+    
+    return 0
+
+def _predict_batch_response(predictor, request):
+    """Answer predict_batch with an entry per item, failing only the invalid items
+    
+    predictions[i] is {} and resolutions[i] None when item i failed;
+    errors[i] then holds its error, and ids[i] echoes the item's id.
+    """
+    if not isinstance(request.get("items"), list):
+        raise ProtocolError(INVALID_REQUEST, "items must be a list")
+    targets = _parse_targets(predictor, request)
+    ids, errors, items = [], [], []
+    for raw in request["items"]:
+        ids.append(raw.get("id") if isinstance(raw, dict) else None)
+        try:
+            items.append(_parse_item(raw))
+            errors.append(None)
+        except ProtocolError as e:
+            errors.append(e)
+    
+    results = iter(_predict_each(predictor, items, targets=targets))
+    predictions, resolutions = [], []
+    for index, error in enumerate(errors):
+        prediction, detail = {}, None
+        if error is None:
+            result = next(results)
+            if isinstance(result, Exception):
+                errors[index] = result
+            else:
+                prediction, detail = result
+                if not prediction:
+                    errors[index] = ProtocolError(NO_PREDICTION, "No prediction available")
+        predictions.append(prediction)
+        resolutions.append(detail)
+    errors = [None if error is None else _error_response(error)["error"] for error in errors]
+    return _response(predictions=predictions, resolutions=resolutions, errors=errors, ids=ids,
+                     model_version=predictor.model_version)
+
+def _handle_request(predictor, request):
+    """Answer a single serve-mode request"""
+    op = request.get("op", "predict")
+    if op == "ping":
+        return _response(model_version=predictor.model_version, pid=os.getpid())
+    if op == "cache_stats":
+        return _response(cache=predictor.cache.info() if predictor.cache else None)
+    if op == "metrics":
+        return _response(metrics=predictor.metrics_snapshot())
+    if op == "predict_batch":
+        return _predict_batch_response(predictor, request)
+    if op != "predict":
+        raise ProtocolError(UNKNOWN_OP, f"Unknown op: {op}")
+    
+    predictions, details = predictor.predict_nutrition_batch(
+        [_parse_item(request)], targets=_parse_targets(predictor, request), with_details=True
+    )
+    return _prediction_response(predictions[0], details[0], predictor.model_version)
+
+def _serve_line(predictor, line):
+    """(response, shutdown) for one serve request line"""
+    start = time.perf_counter()
+    predictor.metrics.start_request()
+    request_id = None
+    try:
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            raise ProtocolError(INVALID_REQUEST, f"Invalid JSON: {e}")
+        if not isinstance(request, dict):
+            raise ProtocolError(INVALID_REQUEST, "Request must be a JSON object")
+        request_id = request.get("id")
+        if request.get("op") == "shutdown":
+            return _response(id=request_id), True
+        response = _handle_request(predictor, request)
+    except Exception as e:
+        predictor.metrics.error(e)
+        response = _error_response(e)
+    
+    response["timings_ms"] = {**predictor.metrics.request_timings(),
+                              "total": round((time.perf_counter() - start) * 1000, 3)}
+    response["id"] = request_id
+    return response, False
+
+def serve(args):
+    """Serve predictions over line-delimited JSON on stdin/stdout"""
+    if args.socket:
+        return serve_socket(args)
+    out = sys.stdout
+    
+    # stdout carries the protocol only, so route every log line to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        predictor = _load_predictor(args)
+        if predictor is None:
+            _write_message(out, _error_response(
+                ProtocolError(MODELS_UNAVAILABLE, "No trained models found"), event="error"))
+            return 1
+        
+        _write_message(out, _response(event="ready", targets=predictor.available_targets(),
+                                      model_version=predictor.model_version))
+        reloader = PredictorReloader(args, predictor, check_interval=args.reload_interval)
+        
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            
+            response, shutdown = _serve_line(reloader.get(), line)
+            _write_message(out, response)
+            if shutdown:
+                break
+    
+    return 0
+
+def serve_socket(args):
+    """Serve the serve protocol on a Unix socket from pre-forked workers
+    
+    The models are loaded once here and shared copy-on-write by the
+    workers; a newly published model version is loaded here as well and
+    rolled out by replacing the workers. "shutdown" closes the connection;
+    the server stops on SIGTERM or Ctrl+C.
+    """
+    from prefork_server import PreforkServer
+    
+    out = sys.stdout
+    if args.lazy:
+        # Lazily loaded forests would be unpickled again in every worker
+        print("⚠️ --lazy is ignored with --socket so that the workers share the loaded models",
+              file=sys.stderr)
+        args.lazy = False
+    
+    failed_versions = set()
+    
+    def load():
+        version = current_version(NutritionPredictor.DEFAULT_MODEL_DIR)
+        predictor = _load_predictor(args)
+        if predictor is None:
+            failed_versions.add(version)
+        else:
+            # Parallelism comes from the workers; threads per forest would oversubscribe the cores
+            predictor.set_predict_threads(1)
+        return predictor
+    
+    def handle(predictor, line):
+        response, shutdown = _serve_line(predictor, line)
+        return (json.dumps(response, allow_nan=False) + "\n").encode(), shutdown
+    
+    def changed(predictor):
+        version = current_version(predictor.model_dir)
+        return version not in (None, predictor.model_version) and version not in failed_versions
+    
+    with contextlib.redirect_stdout(sys.stderr):
+        server = PreforkServer(args.socket, args.workers, load, handle, changed,
+                               check_interval=args.reload_interval)
+        if not server.start():
+            _write_message(out, _error_response(
+                ProtocolError(MODELS_UNAVAILABLE, "No trained models found"), event="error"))
+            return 1
+        
+        _write_message(out, _response(event="ready", targets=server.state.available_targets(),
+                                      model_version=server.state.model_version, socket=args.socket,
+                                      workers=server.worker_pids(), pid=os.getpid()))
+        print(f"✅ Serving on {args.socket} with {args.workers} workers")
+        server.serve_forever()
+    
+    return 0
+
+def export_models(args):
+    """Export the trained forests to packed NumPy arrays, as a new model version"""
+    import numpy as np
+    
     predictor = NutritionPredictor()
+    predictor.prefer_export = False
+    if not predictor.load_models():
+        print("Error: No trained models found. Please train models first.")
+        return {}
+    
+    start = time.perf_counter()
+    summary = predictor.publish_export()
+    print(f"✅ Exported {summary['nodes']} nodes ({summary['bytes'] / 1e6:.1f} MB) "
+          f"in {time.perf_counter() - start:.1f}s")
+    
+    # Check the NumPy evaluator against scikit-learn on random inputs
+    exported = NutritionPredictor()
+    exported.load_models()
+    rng = np.random.default_rng(0)
+    X_scaled = rng.standard_normal((args.check_rows, len(predictor.feature_names)))
+    if predictor.multi_output:
+        max_diff = np.abs(predictor._predict_multi_output(X_scaled) - exported._predict_multi_output(X_scaled)).max()
+    else:
+        max_diff = max(
+            np.abs(predictor._get_model(target).predict(X_scaled) - exported._get_model(target).predict(X_scaled)).max()
+            for target in predictor.available_targets()
+        )
+    summary['max_abs_diff'] = float(max_diff)
+    print(f"Max difference from scikit-learn on {args.check_rows} rows: {max_diff:.3g}")
+    
+    if args.json_output:
+        print(json.dumps(summary, indent=2))
+    return summary
+
+def manifest_command(args):
+    """Show, verify or (re)write the manifest of the current model version"""
+    model_dir = NutritionPredictor.DEFAULT_MODEL_DIR
+    if args.write:
+        # Describe an existing model set saved before manifests existed
+        predictor = NutritionPredictor()
+        predictor.prefer_export = False
+        with contextlib.redirect_stdout(sys.stderr):
+            loaded = predictor.load_models(lazy=True)
+        if not loaded:
+            print("Error: No trained models found. Please train models first.")
+            return 1
+        missing = [target for target in predictor.nutrition_targets
+                   if target not in predictor.available_targets()]
+        if missing:
+            print(f"Error: No model for {', '.join(missing)}; train the full set instead of describing a partial one")
+            return 1
+        predictor.write_manifest(predictor.loaded_dir)
+    
+    load_dir = resolve_model_dir(model_dir)
+    manifest = read_manifest(load_dir)
+    if manifest is None:
+        print(f"Error: No manifest found in {load_dir}")
+        return 1
+    problems = verify_manifest(load_dir, manifest, check_hashes=args.verify) if args.verify else []
+    
+    if args.json_output:
+        print(json.dumps({**manifest, "problems": problems} if args.verify else manifest, indent=2))
+    else:
+        print(f"Model version: {manifest['model_version']} ({manifest['layout']}, {manifest['created_at']})")
+        print(f"  Targets: {', '.join(manifest['targets'])}")
+        print(f"  Files: {len(manifest['files'])} "
+              f"({sum(entry['bytes'] for entry in manifest['files'].values()) / 1e6:.1f} MB)")
+        for target, scores in manifest['metrics'].items():
+            print(f"  {target}: MAE={scores['mae']:.2f}, R²={scores['r2']:.3f}")
+        if args.verify:
+            for problem in problems:
+                print(f"❌ {problem}")
+            if not problems:
+                print("✅ Every file matches the manifest")
+    return 1 if problems else 0
+
+def versions_command(args):
+    """List the saved model versions or switch the current one"""
+    model_dir = NutritionPredictor.DEFAULT_MODEL_DIR
+    if args.activate:
+        try:
+            activate_version(model_dir, args.activate)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        print(f"✅ Current model version: {args.activate}")
+        return 0
+    
+    versions = list_versions(model_dir)
+    if args.json_output:
+        print(json.dumps(versions, indent=2))
+    elif not versions:
+        print(f"No model versions in {model_dir}")
+    else:
+        for entry in versions:
+            marker = "*" if entry["current"] else " "
+            print(f"{marker} {entry['version']}  {entry['created_at']}  {entry['layout']}")
+    return 0
+
+def cache_command(args):
+    """Inspect or clear the persistent prediction cache"""
+    cache = DiskPredictionCache(NutritionPredictor.DEFAULT_MODEL_DIR)
+    if args.action == "clear":
+        cache.clear()
+        print(f"✅ Cleared prediction cache: {cache.path}")
+        return {}
     
+    stats = cache.info()
+    if args.json_output:
+        print(json.dumps(stats, indent=2))
+    else:
+        print(f"Prediction cache: {stats['path']}")
+        print(f"  Model version: {stats['model_version']}")
+        print(f"  Entries: {stats['entries']} / {stats['max_entries']} ({stats['stale_entries']} stale)")
+        print(f"  Hits: {stats['hits']}")
+        print(f"  Size: {stats['bytes'] / 1e6:.2f} MB")
+    return stats
+
+def test_model(args):
+    """Test the model with sample predictions"""
     # Load trained models
-    if not predictor.load_models():
+    predictor = _load_predictor(args)
+    if predictor is None:
         print("Error: No trained models found. Please train models first.")
         return
     
@@ -90,6 +913,93 @@ def test_model(args):
             for nutrient, value in prediction.items():
                 print(f"  {nutrient}: {value:.1f}")
 
+def import_time(args):
+    """Report import and cold-start costs of the prediction path"""
+    from nutrition_benchmark import measure_cold_predict, measure_import_time, node_predict_args
+    
+    results = {"imports": [measure_import_time(module) for module in args.modules]}
+    
+    print("Import time (python -X importtime):")
+    for report in results["imports"]:
+        heavy = ", ".join(report["heavy_modules"]) or "none"
+        print(f"\n{report['module']}: {report['import_ms']:.1f}ms imports, "
+              f"{report['wall_ms']:.1f}ms interpreter wall time (heavy modules: {heavy})")
+        for entry in report["slowest"]:
+            print(f"  {entry['name']:32}{entry['cumulative_ms']:>10.1f}ms")
+    
+    if args.food_name:
+        # The exact command the Node backend spawns for a one-off prediction
+        predict_args = node_predict_args(args.food_name, args.portion_size, args.food_category)
+        cold = results["cold_predict"] = measure_cold_predict(predict_args, runs=args.runs)
+        print(f"\nCold predict (nutrition_cli.py {' '.join(cold['command'])}):")
+        print(f"  {cold['median_ms']:.1f}ms median, {cold['min_ms']:.1f}ms min over {args.runs} runs "
+              f"({cold['disk_cache_hits']} answered from the disk cache)")
+    
+    if args.json_output:
+        print(json.dumps(results, indent=2))
+    
+    return results
+
+def bench(args):
+    """Run the benchmark suite and write a JSON report"""
+    from nutrition_benchmark import BENCHMARKS, run_benchmarks
+    
+    sections = args.sections.split(",") if args.sections else list(BENCHMARKS)
+    print(f"Running benchmarks: {', '.join(sections)}{' (quick)' if args.quick else ''}")
+    report = run_benchmarks(sections, quick=args.quick)
+    
+    if "import" in report:
+        for module, entry in report["import"].items():
+            print(f"\nImport {module}: {entry['import_ms']:.0f}ms (heavy: {', '.join(entry['heavy_modules']) or 'none'})")
+        cold = report["cold_predict"]
+        if "error" in cold:
+            print(f"Cold predict (Node command): {cold['error']}")
+        else:
+            print(f"Cold predict (Node command): p50 {cold['median_ms']:.0f}ms, "
+                  f"{cold['disk_cache_hits']}/{cold['runs']} from the disk cache")
+    if "load" in report:
+        for mode, stats in report["load"].items():
+            print(f"load_models ({mode}): p50 {stats['p50_ms']:.1f}ms, +{stats['rss_added_mb']:.0f} MB RSS")
+    if "predict" in report:
+        for path in ("lookup", "forest"):
+            for name, stats in report["predict"][path].items():
+                print(f"predict {path} {name}: p50 {stats['p50_ms']:.2f}ms, p99 {stats['p99_ms']:.2f}ms")
+    if "train" in report:
+        train = report["train"]
+        print(f"train {train['records']} records: {train['total_seconds']:.1f}s, "
+              f"peak RSS {train['peak_rss_mb']:.0f} MB")
+        for target, stats in train["targets"].items():
+            print(f"  {target}: {stats['fit_seconds']:.2f}s")
+    if "generate" in report:
+        for size, stats in report["generate"].items():
+            if isinstance(stats, dict):
+                print(f"generate {size} records: {stats['seconds']:.2f}s ({stats['rows_per_second']:,.0f} rows/s)")
+    
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Benchmark report written to {args.output}")
+    return report
+
+def loadtest(args):
+    """Load-test serve --socket with increasing numbers of workers"""
+    from nutrition_benchmark import run_loadtest
+    
+    worker_counts = _parse_int_list(args.workers)
+    print(f"Load test: {args.requests} requests per run, workers {', '.join(map(str, worker_counts))}")
+    results = run_loadtest(worker_counts, requests=args.requests, clients=args.clients,
+                           use_lookup=args.lookup)
+    
+    print(f"\n{'workers':>8}{'req/s':>10}{'speedup':>9}{'p50 ms':>9}{'p99 ms':>9}"
+          f"{'parent RSS':>12}{'worker private':>16}{'total PSS':>11}")
+    for workers, run in results["runs"].items():
+        print(f"{workers:>8}{run['requests_per_second']:>10.0f}{run['speedup']:>8.2f}x"
+              f"{run['p50_ms']:>9.2f}{run['p99_ms']:>9.2f}{run['parent']['rss_mb']:>9.0f} MB"
+              f"{run['worker_private_mb_mean']:>13.1f} MB{run['total_pss_mb']:>8.0f} MB")
+    
+    if args.json_output:
+        print(json.dumps(results, indent=2))
+    return results
+
 def main():
     parser = argparse.ArgumentParser(description="Nutrition Prediction Model CLI")
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
@@ -98,6 +1008,86 @@ def main():
     train_parser = subparsers.add_parser("train", help="Train the nutrition prediction model")
     train_parser.add_argument("--dataset-path", default="nutrition_dataset.csv", 
                              help="Path to the training dataset")
+    train_parser.add_argument("--multi-output", action="store_true",
+                             help="Train one model that predicts every nutrient together")
+    train_parser.add_argument("--workers", type=int, default=1,
+                             help="Processes fitting per-target models concurrently")
+    train_parser.add_argument("--threads-per-model", type=int, default=-1,
+                             help="Threads used inside each forest (-1 = all cores)")
+    train_parser.add_argument("--streaming", action="store_true",
+                             help="Read the dataset in chunks for datasets larger than memory")
+    train_parser.add_argument("--chunk-size", type=int, default=1_000_000,
+                             help="Rows per chunk in streaming mode")
+    train_parser.add_argument("--sample-size", type=int, default=500_000,
+                             help="Rows sampled for the forests in streaming mode")
+    train_parser.add_argument("--keep-versions", type=int, default=3,
+                             help="Model versions kept in models/versions (the current one is always kept)")
+    train_parser.add_argument("--no-tuning", action="store_true",
+                             help="Ignore models/tuning.json and use the default forest settings")
+    
+    # Update command
+    update_parser = subparsers.add_parser("update", help="Fold new rows into the current models without a full retrain")
+    update_parser.add_argument("--dataset-path", required=True,
+                              help="CSV of new rows in the training format (missing nutrients are skipped)")
+    update_parser.add_argument("--new-trees", type=int, default=10,
+                              help="Trees added to each forest, fitted on the new rows")
+    update_parser.add_argument("--min-rows", type=int, default=20,
+                              help="New values a target needs before its forest grows")
+    update_parser.add_argument("--force", action="store_true",
+                              help="Apply the file even if it was already applied to the current version")
+    update_parser.add_argument("--threads-per-model", type=int, default=-1,
+                              help="Threads used inside each forest (-1 = all cores)")
+    update_parser.add_argument("--keep-versions", type=int, default=3,
+                              help="Model versions kept in models/versions (the current one is always kept)")
+    update_parser.add_argument("--json-output", action="store_true",
+                              help="Output results in JSON format")
+    
+    # Tune command
+    tune_parser = subparsers.add_parser("tune", help="Pick forest size and depth per target for train")
+    tune_parser.add_argument("--dataset-path", default="nutrition_dataset.csv",
+                            help="Path to the training dataset")
+    tune_parser.add_argument("--n-estimators", default=",".join(map(str, DEFAULT_N_ESTIMATORS)),
+                            help="Comma-separated tree counts to try")
+    tune_parser.add_argument("--max-depths", default=",".join(str(depth).lower() for depth in DEFAULT_MAX_DEPTHS),
+                            help="Comma-separated maximum depths to try (none = unlimited)")
+    tune_parser.add_argument("--tolerance", type=float, default=0.02,
+                            help="Accepted relative MAE increase over the most accurate setting")
+    tune_parser.add_argument("--multi-output", action="store_true",
+                            help="Tune the single multi-output forest instead of per-target forests")
+    tune_parser.add_argument("--threads-per-model", type=int, default=-1,
+                            help="Threads used inside each forest (-1 = all cores)")
+    tune_parser.add_argument("--json-output", action="store_true",
+                            help="Output results in JSON format")
+    
+    # Evaluate command
+    evaluate_parser = subparsers.add_parser("evaluate", help="K-fold cross-validation of the per-target models")
+    evaluate_parser.add_argument("--dataset-path", default="nutrition_dataset.csv",
+                                help="Path to the training dataset")
+    evaluate_parser.add_argument("--folds", type=int, default=5,
+                                help="Number of cross-validation folds")
+    evaluate_parser.add_argument("--group-by-food", action="store_true",
+                                help="Hold out all rows of a food together to score unseen foods")
+    evaluate_parser.add_argument("--workers", type=int, default=None,
+                                help="Processes running (fold, target) fits concurrently "
+                                     "(default: 1 on a single CPU, else min(folds, CPUs))")
+    evaluate_parser.add_argument("--threads-per-model", type=int, default=1,
+                                help="Threads used inside each forest (-1 = all cores)")
+    evaluate_parser.add_argument("--no-tuning", action="store_true",
+                                help="Ignore models/tuning.json and use the default forest settings")
+    evaluate_parser.add_argument("--top-foods", type=int, default=20,
+                                help="Foods listed in the per-food table (0 = all)")
+    evaluate_parser.add_argument("--sort-target", default="calories",
+                                help="Target whose MAE orders the per-food table")
+    evaluate_parser.add_argument("--json-output", action="store_true",
+                                help="Output results in JSON format")
+    
+    # Compare command
+    compare_parser = subparsers.add_parser("compare",
+                                           help="Compare per-target and multi-output models")
+    compare_parser.add_argument("--dataset-path", default="nutrition_dataset.csv",
+                               help="Path to the training dataset")
+    compare_parser.add_argument("--json-output", action="store_true",
+                               help="Output results in JSON format")
     
     # Predict command
     predict_parser = subparsers.add_parser("predict", help="Make nutrition predictions")
@@ -109,18 +1099,138 @@ def main():
     predict_parser.add_argument("--portion-unit", default="g", help="Portion unit")
     predict_parser.add_argument("--json-output", action="store_true",
                                help="Output results in JSON format")
+    predict_parser.add_argument("--disk-cache", action="store_true",
+                               help="Answer from and store in the persistent prediction cache")
+    predict_parser.add_argument("--strict", action="store_true",
+                               help="Write one protocol JSON line on stdout and every log line on stderr")
+    _add_loading_arguments(predict_parser)
+    
+    # Predict batch command
+    batch_parser = subparsers.add_parser("predict-batch",
+                                         help="Predict JSONL items from stdin, writing JSONL to stdout")
+    batch_parser.add_argument("--batch-size", type=int, default=1000,
+                             help="Number of input lines predicted together")
+    _add_loading_arguments(batch_parser)
+    _add_cache_arguments(batch_parser)
+    _add_reload_arguments(batch_parser)
+    
+    # Serve command
+    serve_parser = subparsers.add_parser("serve", help="Keep models loaded and answer JSON requests on stdin")
+    serve_parser.add_argument("--socket", default=None, metavar="PATH",
+                             help="Listen on a Unix socket with pre-forked workers instead of stdin")
+    serve_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                             help="Worker processes forked with --socket (default: one per core)")
+    _add_loading_arguments(serve_parser)
+    _add_cache_arguments(serve_parser)
+    _add_reload_arguments(serve_parser)
+    
+    # Export command
+    export_parser = subparsers.add_parser("export", help="Export forests to NumPy arrays for fast loading")
+    export_parser.add_argument("--check-rows", type=int, default=1000,
+                              help="Random rows used to check the export against scikit-learn")
+    export_parser.add_argument("--json-output", action="store_true",
+                              help="Output results in JSON format")
+    
+    # Versions command
+    versions_parser = subparsers.add_parser("versions", help="List model versions or switch the current one")
+    versions_parser.add_argument("--activate", default=None, metavar="VERSION",
+                                help="Make VERSION current (running servers swap to it)")
+    versions_parser.add_argument("--json-output", action="store_true",
+                                help="Output results in JSON format")
+    
+    # Cache command
+    cache_parser = subparsers.add_parser("cache", help="Inspect or clear the persistent prediction cache")
+    cache_parser.add_argument("action", choices=["stats", "clear"], help="What to do with the cache")
+    cache_parser.add_argument("--json-output", action="store_true",
+                             help="Output results in JSON format")
+    
+    # Manifest command
+    manifest_parser = subparsers.add_parser("manifest", help="Show or verify the saved model manifest")
+    manifest_parser.add_argument("--verify", action="store_true",
+                                help="Re-hash every model file and compare it with the manifest")
+    manifest_parser.add_argument("--write", action="store_true",
+                                help="Write a manifest for the models currently saved")
+    manifest_parser.add_argument("--json-output", action="store_true",
+                                help="Output results in JSON format")
     
     # Test command
     test_parser = subparsers.add_parser("test", help="Test the model with sample predictions")
+    _add_loading_arguments(test_parser)
+    
+    # Bench command
+    bench_parser = subparsers.add_parser("bench", help="Benchmark import, load, predict, train and generate")
+    bench_parser.add_argument("--sections", default=None,
+                             help="Comma-separated subset of import,load,predict,train,generate")
+    bench_parser.add_argument("--quick", action="store_true",
+                             help="Fewer runs and smaller sizes")
+    bench_parser.add_argument("--output", default="benchmark_results.json",
+                             help="Where to write the JSON report")
+    
+    # Load test command
+    loadtest_parser = subparsers.add_parser("loadtest", help="Measure serve --socket throughput and memory per worker count")
+    loadtest_parser.add_argument("--workers", default=",".join(str(n) for n in (1, 2, 4, 8) if n <= (os.cpu_count() or 1)),
+                                help="Comma-separated worker counts to run")
+    loadtest_parser.add_argument("--requests", type=int, default=500,
+                                help="Requests per run")
+    loadtest_parser.add_argument("--clients", type=int, default=0,
+                                help="Concurrent client processes (default: twice the largest worker count)")
+    loadtest_parser.add_argument("--lookup", action="store_true",
+                                help="Answer known foods from the per-100g table instead of the forests")
+    loadtest_parser.add_argument("--json-output", action="store_true",
+                                help="Output results in JSON format")
+    
+    # Import time command
+    importtime_parser = subparsers.add_parser("importtime",
+                                              help="Measure import time and cold predict latency")
+    importtime_parser.add_argument("--modules", nargs="+", default=["nutrition_model", "nutrition_cli"],
+                                   help="Modules to import in a fresh interpreter")
+    importtime_parser.add_argument("--food-name", default="apple",
+                                   help="Food used for the cold predict timing (empty to skip)")
+    importtime_parser.add_argument("--portion-size", type=float, default=150,
+                                   help="Portion size used for the cold predict timing")
+    importtime_parser.add_argument("--food-category", default="fruit",
+                                   help="Food category used for the cold predict timing")
+    importtime_parser.add_argument("--runs", type=int, default=3,
+                                   help="Cold predict runs")
+    importtime_parser.add_argument("--json-output", action="store_true",
+                                   help="Output results in JSON format")
     
     args = parser.parse_args()
     
     if args.command == "train":
         train_model(args)
+    elif args.command == "update":
+        sys.exit(update_model(args))
+    elif args.command == "tune":
+        tune_models(args)
+    elif args.command == "evaluate":
+        sys.exit(evaluate_models(args))
+    elif args.command == "compare":
+        compare_models(args)
     elif args.command == "predict":
+        if args.strict:
+            sys.exit(predict_strict(args))
         predict_nutrition(args)
+    elif args.command == "predict-batch":
+        sys.exit(predict_batch(args))
+    elif args.command == "serve":
+        sys.exit(serve(args))
+    elif args.command == "export":
+        export_models(args)
+    elif args.command == "manifest":
+        sys.exit(manifest_command(args))
+    elif args.command == "versions":
+        sys.exit(versions_command(args))
+    elif args.command == "cache":
+        cache_command(args)
     elif args.command == "test":
         test_model(args)
+    elif args.command == "bench":
+        bench(args)
+    elif args.command == "loadtest":
+        loadtest(args)
+    elif args.command == "importtime":
+        import_time(args)
     else:
         parser.print_help()
 
@@ -1,23 +1,171 @@
-import pandas as pd
+from __future__ import annotations
+
+# Only NumPy is imported eagerly. pandas, scikit-learn and joblib are imported
+# where they are used, so a prediction answered from the lookup table starts
+# without paying for them (see `nutrition_cli.py importtime`).
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-import joblib
 import os
+import io
 import json
-from typing import Dict, List, Optional, Tuple
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from food_name_index import FoodNameIndex
+from prediction_metrics import PredictionMetrics
+from prediction_cache import model_version
+from model_tuning import (DEFAULT_MAX_DEPTHS, DEFAULT_N_ESTIMATORS, DEFAULT_PARAMS, read_tuning,
+                          select_candidate, sweep_forest)
+from model_manifest import (build_manifest, create_staging_dir, file_sha256, pin_version, publish_version,
+                            read_manifest, resolve_model_dir, verify_manifest, write_manifest)
+from forest_export import EXPORT_DIR, PackedForest, export_forests, is_exported
+from columnar_dataset import dataset_columns, find_columnar_dataset, iter_dataframe_chunks, load_dataframe
+from model_evaluation import assign_folds, food_error_table, summarize_targets
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# A food/unit is answered from the lookup table when it has enough rows and a
+# straight line through the origin explains its nutrients to within tolerance
+LOOKUP_MIN_ROWS = 3
+LOOKUP_REL_TOLERANCE = 0.1
+LOOKUP_ABS_TOLERANCE = 0.1
+
+# Trees added by update_models also fit this many replayed portions of every
+# food/unit the update leaves alone, labelled by the current forest, so that
+# they vote for the other foods as the existing trees do
+UPDATE_REPLAY_PORTIONS = 32
+
+CATEGORICAL_COLUMNS = ['food_name', 'food_category', 'portion_unit']
+
+# How labels missing from the vocabularies are handled at prediction time:
+# 'category' substitutes a known food's own category and 'g' for an unknown
+# unit, and answers unseen foods from their category's average per-100g
+# profile; 'none' rejects any unseen label
+UNKNOWN_STRATEGIES = ('category', 'none')
+DEFAULT_PORTION_UNIT = 'g'
+FEATURE_COLUMNS = [
+    'portion_size', 'food_name_encoded', 'food_category_encoded',
+    'portion_unit_encoded'
+]
+
+def _fill_missing_labels(series: pd.Series) -> pd.Series:
+    """Fill missing categorical labels with '0', as fillna(0) does for text columns"""
+    if not series.isna().any():
+        return series
+    if '0' not in series.cat.categories:
+        series = series.cat.add_categories(['0'])
+    return series.fillna('0')
+
+def _share_array(array: np.ndarray):
+    """Copy an array into a new shared memory block"""
+    from multiprocessing import shared_memory
+    
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+def _attach_array(spec):
+    """Attach to an array shared by _share_array; the creating process unlinks it"""
+    from multiprocessing import shared_memory
+    
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+def _fit_target_in_worker(target: str, column: int, params: Dict, n_jobs: int,
+                          X_train_spec, X_test_spec, Y_train_spec):
+    """Fit one target's forest in a pool worker from shared-memory inputs"""
+    from sklearn.ensemble import RandomForestRegressor
+    
+    blocks = []
+    try:
+        arrays = []
+        for spec in (X_train_spec, X_test_spec, Y_train_spec):
+            block, array = _attach_array(spec)
+            blocks.append(block)
+            arrays.append(array)
+        X_train_scaled, X_test_scaled, Y_train = arrays
+        
+        start = time.perf_counter()
+        model = RandomForestRegressor(**params, n_jobs=n_jobs)
+        model.fit(X_train_scaled, Y_train[:, column])
+        y_pred = model.predict(X_test_scaled)
+        return target, model, y_pred, time.perf_counter() - start
+    finally:
+        # Drop the views before closing the mappings
+        arrays = X_train_scaled = X_test_scaled = Y_train = None
+        for block in blocks:
+            block.close()
+
+def _evaluate_fold(X: np.ndarray, Y: np.ndarray, fold_ids: np.ndarray, fold: int, column: int,
+                   params: Dict, n_jobs: int):
+    """Fit one target's forest without a fold's rows and predict them"""
+    from sklearn.ensemble import RandomForestRegressor
+    
+    start = time.perf_counter()
+    test = fold_ids == fold
+    model = RandomForestRegressor(**params, n_jobs=n_jobs)
+    model.fit(X[~test], Y[~test, column])
+    return model.predict(X[test]), time.perf_counter() - start
+
+def _evaluate_fold_in_worker(fold: int, column: int, params: Dict, n_jobs: int, X_spec, Y_spec, folds_spec):
+    """_evaluate_fold in a pool worker from shared-memory inputs"""
+    blocks = []
+    try:
+        arrays = []
+        for spec in (X_spec, Y_spec, folds_spec):
+            block, array = _attach_array(spec)
+            blocks.append(block)
+            arrays.append(array)
+        y_pred, seconds = _evaluate_fold(*arrays, fold, column, params, n_jobs)
+        return fold, column, y_pred, seconds
+    finally:
+        # Drop the views before closing the mappings
+        arrays = None
+        for block in blocks:
+            block.close()
 
 class NutritionPredictor:
-    def __init__(self, model_dir: str = "models"):
+    DEFAULT_MODEL_DIR = "models"
+    
+    def __init__(self, model_dir: str = DEFAULT_MODEL_DIR):
         self.model_dir = model_dir
         self.models = {}
+        self.multi_output = None
         self.label_encoders = {}
-        self.scaler = StandardScaler()
+        self.scaler = None
+        self.vocabularies = {}
+        self.encoding_index = {}
+        self.unknown_strategy = 'category'
+        self.name_index = None
+        self.min_name_confidence = 0.6
+        self.cache = None
+        self.metrics = PredictionMetrics()
+        self.scaler_mean = None
+        self.scaler_scale = None
         self.feature_names = []
+        self.lookup_stats = None
+        self.lookup = None
+        self.use_lookup = True
+        self.selected_targets = None
+        self.prefer_export = True
+        self.model_version = None
+        self.loaded_dir = None
+        self.keep_versions = 3
+        self.update_history = []
+        self._model_paths = {}
+        self._mmap_mode = None
         self.is_trained = False
         
+        # Training parallelism: worker processes fitting targets concurrently,
+        # and threads used inside each forest (-1 = all cores)
+        self.train_workers = 1
+        self.threads_per_model = -1
+        
+        # Forest sizes chosen by `tune` (model_dir/tuning.json), loaded on first use
+        self.use_tuning = True
+        self.tuning = None
+        
         # Nutrition targets to predict
         self.nutrition_targets = [
             'calories', 'protein', 'fat', 'carbohydrates', 'fiber',
@@ -29,9 +177,19 @@ class NutritionPredictor:
         os.makedirs(model_dir, exist_ok=True)
     
     def load_dataset(self, csv_path: str) -> pd.DataFrame:
-        """Load and preprocess the nutrition dataset"""
+        """Load and preprocess the nutrition dataset
+        
+        A columnar copy of the dataset (see columnar_dataset.py) is preferred
+        over the CSV when one exists and is up to date.
+        """
         try:
-            df = pd.read_csv(csv_path)
+            columnar_path = find_columnar_dataset(csv_path)
+            if columnar_path:
+                df = load_dataframe(columnar_path)
+                print(f"Using columnar dataset: {columnar_path}")
+            else:
+                import pandas as pd
+                df = pd.read_csv(csv_path)
             print(f"Dataset loaded: {len(df)} records")
             print(f"Columns: {list(df.columns)}")
             return df
@@ -41,29 +199,37 @@ class NutritionPredictor:
     
     def preprocess_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """Preprocess the data for training"""
-        # Handle missing values
-        df = df.fillna(0)
+        import pandas as pd
+        from sklearn.preprocessing import LabelEncoder
+        
+        # Handle missing values (only copying the data when there are any)
+        for col in CATEGORICAL_COLUMNS:
+            if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = _fill_missing_labels(df[col])
+        if df.isna().any().any():
+            df = df.fillna(0)
         
         # Convert portion_size to numeric, handling text descriptions
-        if 'portion_size' in df.columns:
+        if 'portion_size' in df.columns and not pd.api.types.is_numeric_dtype(df['portion_size']):
             df['portion_size'] = pd.to_numeric(df['portion_size'], errors='coerce').fillna(100)
         
         # Encode categorical variables
-        categorical_columns = ['food_name', 'food_category', 'portion_unit']
-        for col in categorical_columns:
+        for col in CATEGORICAL_COLUMNS:
             if col in df.columns:
                 le = LabelEncoder()
-                df[f'{col}_encoded'] = le.fit_transform(df[col].astype(str))
+                if isinstance(df[col].dtype, pd.CategoricalDtype):
+                    # Encode each category once and gather by code
+                    categories = np.asarray(df[col].cat.categories.astype(str))
+                    df[f'{col}_encoded'] = le.fit(categories).transform(categories)[df[col].cat.codes.to_numpy()]
+                else:
+                    df[f'{col}_encoded'] = le.fit_transform(df[col].astype(str))
                 self.label_encoders[col] = le
+                self.vocabularies[col] = le.classes_
         
-        # Select features for training
-        feature_columns = [
-            'portion_size', 'food_name_encoded', 'food_category_encoded', 
-            'portion_unit_encoded'
-        ]
+        self._compile_encoders()
         
-        # Filter only available columns
-        available_features = [col for col in feature_columns if col in df.columns]
+        # Select features for training, filtering only available columns
+        available_features = [col for col in FEATURE_COLUMNS if col in df.columns]
         self.feature_names = available_features
         
         X = df[available_features]
@@ -71,14 +237,161 @@ class NutritionPredictor:
         
         return X, y
     
-    def train_models(self, csv_path: str) -> Dict[str, float]:
-        """Train separate models for each nutrition target"""
-        print("Loading and preprocessing dataset...")
+    @staticmethod
+    def _lookup_statistics(cells: np.ndarray, portion: np.ndarray, Y: np.ndarray,
+                           n_cells: int) -> Dict[str, np.ndarray]:
+        """Per-cell sufficient statistics for a least-squares line through the origin
+        
+        The statistics are plain sums, so tables built from separate chunks of
+        data can be merged by adding them.
+        """
+        shape = (n_cells, Y.shape[1])
+        stats = {key: np.zeros(shape) for key in ('sum_y', 'sum_yy', 'sum_yp', 'sum_pp')}
+        stats['n'] = np.zeros(shape, dtype=np.int64)
+        
+        for j in range(Y.shape[1]):
+            values = Y[:, j]
+            ok = np.isfinite(values) & (portion > 0)
+            c, v, p = cells[ok], values[ok], portion[ok]
+            stats['n'][:, j] = np.bincount(c, minlength=n_cells)
+            stats['sum_y'][:, j] = np.bincount(c, weights=v, minlength=n_cells)
+            stats['sum_yy'][:, j] = np.bincount(c, weights=v * v, minlength=n_cells)
+            stats['sum_yp'][:, j] = np.bincount(c, weights=v * p, minlength=n_cells)
+            stats['sum_pp'][:, j] = np.bincount(c, weights=p * p, minlength=n_cells)
+        
+        return stats
+    
+    def _lookup_chunk_statistics(self, X: np.ndarray, Y: np.ndarray) -> Optional[Dict[str, np.ndarray]]:
+        """Lookup-table statistics for one block of encoded features and targets"""
+        if 'food_name_encoded' not in self.feature_names:
+            return None
+        
+        def codes(feature):
+            return X[:, self.feature_names.index(feature)].astype(np.int64)
+        
+        n_foods = len(self.vocabularies['food_name'])
+        food_codes = codes('food_name_encoded')
+        if 'portion_unit_encoded' in self.feature_names:
+            n_units = len(self.vocabularies['portion_unit'])
+            unit_codes = codes('portion_unit_encoded')
+        else:
+            n_units, unit_codes = 1, np.zeros(len(X), dtype=np.int64)
+        
+        stats = self._lookup_statistics(
+            food_codes * n_units + unit_codes,
+            X[:, self.feature_names.index('portion_size')].astype(np.float64),
+            Y.astype(np.float64),
+            n_foods * n_units
+        )
+        stats = {key: value.reshape(n_foods, n_units, Y.shape[1]) for key, value in stats.items()}
+        
+        # Count categories per food for category-level fallbacks
+        if 'food_category_encoded' in self.feature_names:
+            n_categories = len(self.vocabularies['food_category'])
+            pairs = food_codes * n_categories + codes('food_category_encoded')
+            stats['category_counts'] = np.bincount(
+                pairs, minlength=n_foods * n_categories
+            ).reshape(n_foods, n_categories)
+        
+        return stats
+    
+    @staticmethod
+    def _merge_lookup_statistics(a: Dict[str, np.ndarray], b: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Combine lookup-table statistics from two blocks of the same vocabulary"""
+        return {key: a[key] + b[key] for key in a if key != 'targets'}
+    
+    def _set_lookup_statistics(self, stats: Optional[Dict[str, np.ndarray]], targets: List[str]):
+        """Install accumulated lookup statistics and compile the table"""
+        if stats is None:
+            self.lookup_stats, self.lookup = None, None
+            return
+        stats['targets'] = np.array(targets)
+        self.lookup_stats = stats
+        self._compile_lookup_table()
+    
+    def _build_lookup_table(self, X: pd.DataFrame, y: pd.DataFrame):
+        """Build the per-food, per-unit nutrient table used before the forests"""
+        targets = [target for target in self.nutrition_targets if target in y.columns]
+        stats = self._lookup_chunk_statistics(X[self.feature_names].to_numpy(), y[targets].to_numpy())
+        self._set_lookup_statistics(stats, targets)
+    
+    def _compile_lookup_table(self):
+        """Turn the accumulated statistics into per-100g values and a coverage mask"""
+        stats = self.lookup_stats
+        n = stats['n']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            per_100g = 100 * stats['sum_yp'] / stats['sum_pp']
+            residual = np.maximum(stats['sum_yy'] - stats['sum_yp'] ** 2 / stats['sum_pp'], 0)
+            rmse = np.sqrt(residual / n)
+            mean_y = stats['sum_y'] / n
+            tolerance = np.maximum(LOOKUP_REL_TOLERANCE * np.abs(mean_y), LOOKUP_ABS_TOLERANCE)
+            covered = (n >= LOOKUP_MIN_ROWS) & (rmse <= tolerance)
+        
+        self.lookup = {
+            'per_100g': np.where(covered, per_100g, 0.0),
+            'covered': covered,
+            'targets': [str(target) for target in stats['targets']]
+        }
+        
+        # Each food's most common category, and each category's average
+        # per-100g profile over its covered foods
+        if 'category_counts' in stats:
+            food_categories = stats['category_counts'].argmax(axis=1)
+            self.lookup['food_categories'] = food_categories
+            
+            membership = np.zeros((stats['category_counts'].shape[1], len(food_categories)))
+            membership[food_categories, np.arange(len(food_categories))] = 1
+            counts = np.einsum('cf,fut->cut', membership, covered.astype(np.float64))
+            sums = np.einsum('cf,fut->cut', membership, self.lookup['per_100g'])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self.lookup['category_per_100g'] = np.where(counts > 0, sums / counts, 0.0)
+            self.lookup['category_covered'] = counts > 0
+    
+    def _apply_lookup_table(self, X: np.ndarray, targets: List[str], values: np.ndarray):
+        """Fill values for rows/targets the lookup table covers, leaving NaN elsewhere"""
+        if 'food_name_encoded' not in self.feature_names:
+            return
+        
+        food = X[:, self.feature_names.index('food_name_encoded')].astype(np.int64)
+        if 'portion_unit_encoded' in self.feature_names:
+            unit = X[:, self.feature_names.index('portion_unit_encoded')].astype(np.int64)
+        else:
+            unit = np.zeros(len(X), dtype=np.int64)
+        portion = X[:, self.feature_names.index('portion_size')]
+        
+        per_100g = self.lookup['per_100g'][food, unit]
+        covered = self.lookup['covered'][food, unit]
+        for j, target in enumerate(targets):
+            if target in self.lookup['targets']:
+                k = self.lookup['targets'].index(target)
+                values[:, j] = np.where(covered[:, k], per_100g[:, k] * portion / 100, np.nan)
+    
+    def _apply_category_profile(self, categories: np.ndarray, units: np.ndarray,
+                                portion: np.ndarray, targets: List[str], values: np.ndarray):
+        """Fill values from each category's average per-100g profile, leaving NaN elsewhere"""
+        per_100g = self.lookup['category_per_100g'][categories, units]
+        covered = self.lookup['category_covered'][categories, units]
+        for j, target in enumerate(targets):
+            if target in self.lookup['targets']:
+                k = self.lookup['targets'].index(target)
+                values[:, j] = np.where(covered[:, k], per_100g[:, k] * portion / 100, np.nan)
+    
+    def _set_scaler_params(self):
+        """Copy the fitted scaler's parameters into plain arrays used for prediction"""
+        self.scaler_mean = np.asarray(self.scaler.mean_, dtype=np.float64)
+        self.scaler_scale = np.asarray(self.scaler.scale_, dtype=np.float64)
+    
+    def _prepare_training_data(self, csv_path: str):
+        """Load, encode, split and scale the dataset for training"""
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+        
         df = self.load_dataset(csv_path)
         if df is None:
-            return {}
+            return None
         
         X, y = self.preprocess_data(df)
+        self._build_lookup_table(X, y)
         
         # Split the data
         X_train, X_test, y_train, y_test = train_test_split(
@@ -86,164 +399,1241 @@ class NutritionPredictor:
         )
         
         # Scale features
+        self.scaler = StandardScaler()
         X_train_scaled = self.scaler.fit_transform(X_train)
         X_test_scaled = self.scaler.transform(X_test)
+        self._set_scaler_params()
         
+        return X_train_scaled, X_test_scaled, y_train, y_test
+    
+    @staticmethod
+    def _score(y_true, y_pred) -> Dict[str, float]:
+        """Regression metrics for one target"""
+        from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+        
+        return {
+            'mae': mean_absolute_error(y_true, y_pred),
+            'mse': mean_squared_error(y_true, y_pred),
+            'r2': r2_score(y_true, y_pred)
+        }
+    
+    def _forest_params(self, target: Optional[str] = None) -> Dict:
+        """RandomForestRegressor hyperparameters for a target (None = multi-output)
+        
+        Tuned values from model_dir/tuning.json replace the defaults when present.
+        """
+        params = dict(DEFAULT_PARAMS)
+        if self.use_tuning:
+            if self.tuning is None:
+                self.tuning = read_tuning(self.model_dir) or {}
+            tuned = self.tuning.get('targets', {}).get(target or 'multi_output')
+            if tuned:
+                params.update(n_estimators=tuned['n_estimators'], max_depth=tuned['max_depth'])
+        return {**params, 'random_state': 42}
+    
+    def _fit_per_target_models(self, X_train_scaled, X_test_scaled, y_train, y_test) -> Dict[str, Dict]:
+        """Fit one RandomForestRegressor per nutrition target
+        
+        With train_workers > 1 the targets are fitted concurrently in a process
+        pool that reads the training matrices from shared memory.
+        """
+        from sklearn.ensemble import RandomForestRegressor
+        
+        targets = [target for target in self.nutrition_targets if target in y_train.columns]
         results = {}
         
-        print("Training models for each nutrition target...")
-        for target in self.nutrition_targets:
-            if target in y.columns:
+        def record(target, model, y_pred, seconds):
+            # Calculate metrics and keep the model
+            results[target] = self._score(y_test[target], y_pred)
+            results[target]['fit_seconds'] = seconds
+            self.models[target] = model
+            print(f"  {target}: MAE={results[target]['mae']:.2f}, R²={results[target]['r2']:.3f} ({seconds:.2f}s)")
+        
+        start = time.perf_counter()
+        if self.train_workers > 1:
+            print(f"Training models for each nutrition target ({self.train_workers} workers, "
+                  f"{self.threads_per_model} threads per model)...")
+            blocks, specs = [], []
+            for array in (X_train_scaled, X_test_scaled, y_train[targets].to_numpy(dtype=np.float64)):
+                block, spec = _share_array(array)
+                blocks.append(block)
+                specs.append(spec)
+            try:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor, as_completed
+                
+                with ProcessPoolExecutor(max_workers=self.train_workers,
+                                         mp_context=multiprocessing.get_context('spawn')) as pool:
+                    futures = [
+                        pool.submit(_fit_target_in_worker, target, column, self._forest_params(target),
+                                    self.threads_per_model, *specs)
+                        for column, target in enumerate(targets)
+                    ]
+                    for future in as_completed(futures):
+                        record(*future.result())
+            finally:
+                for block in blocks:
+                    block.close()
+                    block.unlink()
+        else:
+            print("Training models for each nutrition target...")
+            for target in targets:
                 print(f"Training model for {target}...")
                 
                 # Train Random Forest model
-                model = RandomForestRegressor(
-                    n_estimators=100,
-                    max_depth=10,
-                    random_state=42,
-                    n_jobs=-1
-                )
-                
+                target_start = time.perf_counter()
+                model = RandomForestRegressor(**self._forest_params(target), n_jobs=self.threads_per_model)
                 model.fit(X_train_scaled, y_train[target])
                 
                 # Make predictions
                 y_pred = model.predict(X_test_scaled)
-                
-                # Calculate metrics
-                mae = mean_absolute_error(y_test[target], y_pred)
-                mse = mean_squared_error(y_test[target], y_pred)
-                r2 = r2_score(y_test[target], y_pred)
-                
-                results[target] = {
-                    'mae': mae,
-                    'mse': mse,
-                    'r2': r2
-                }
-                
-                # Save model
-                self.models[target] = model
-                
-                print(f"  {target}: MAE={mae:.2f}, R²={r2:.3f}")
+                record(target, model, y_pred, time.perf_counter() - target_start)
+        
+        print(f"Trained {len(targets)} models in {time.perf_counter() - start:.2f}s")
+        
+        # Keep the usual target order regardless of completion order
+        self.models = {target: self.models[target] for target in targets}
+        return {target: results[target] for target in targets}
+    
+    def _fit_multi_output_model(self, X_train_scaled, X_test_scaled, y_train, y_test) -> Dict[str, Dict]:
+        """Fit a single RandomForestRegressor predicting every nutrition target"""
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.preprocessing import StandardScaler
+        
+        targets = [target for target in self.nutrition_targets if target in y_train.columns]
+        
+        # Standardize targets so large-valued nutrients (potassium, vitamin A)
+        # do not dominate the shared split criterion
+        target_scaler = StandardScaler()
+        y_train_scaled = target_scaler.fit_transform(y_train[targets])
+        
+        print(f"Training multi-output model for {len(targets)} targets...")
+        model = RandomForestRegressor(**self._forest_params(), n_jobs=self.threads_per_model)
+        model.fit(X_train_scaled, y_train_scaled)
+        
+        self.multi_output = {
+            'model': model,
+            'targets': targets,
+            'target_scaler': target_scaler
+        }
+        
+        y_pred = self._predict_multi_output(X_test_scaled)
+        results = {}
+        for j, target in enumerate(targets):
+            results[target] = self._score(y_test[target], y_pred[:, j])
+            print(f"  {target}: MAE={results[target]['mae']:.2f}, R²={results[target]['r2']:.3f}")
+        
+        return results
+    
+    def _predict_multi_output(self, X_scaled: np.ndarray) -> np.ndarray:
+        """Predict every multi-output target in original units"""
+        y_scaled = self.multi_output['model'].predict(X_scaled).reshape(len(X_scaled), -1)
+        if self.multi_output['target_scaler'] is None:
+            # Exported forests already return original units
+            return y_scaled
+        return self.multi_output['target_scaler'].inverse_transform(y_scaled)
+    
+    def _fit_and_save(self, data, multi_output: bool) -> Dict[str, Dict]:
+        """Fit the chosen model layout on prepared data and save everything"""
+        if multi_output:
+            self.models = {}
+            results = self._fit_multi_output_model(*data)
+        else:
+            self.multi_output = None
+            results = self._fit_per_target_models(*data)
         
         # Save scaler and label encoders
-        self.save_models()
+        self.save_models(metrics=results)
         self.is_trained = True
         
         return results
     
-    def save_models(self):
-        """Save trained models and preprocessing objects"""
+    def train_models(self, csv_path: str, multi_output: bool = False) -> Dict[str, float]:
+        """Train separate models for each nutrition target, or one multi-output model"""
+        print("Loading and preprocessing dataset...")
+        data = self._prepare_training_data(csv_path)
+        if data is None:
+            return {}
+        
+        return self._fit_and_save(data, multi_output)
+    
+    @staticmethod
+    def _dataset_columns(csv_path: str) -> List[str]:
+        """Column names of a CSV or columnar dataset"""
+        columnar_path = find_columnar_dataset(csv_path)
+        if columnar_path:
+            return dataset_columns(columnar_path)
+        import pandas as pd
+        return list(pd.read_csv(csv_path, nrows=0).columns)
+    
+    def _iter_dataset_chunks(self, csv_path: str, chunk_size: int, columns: List[str]):
+        """Yield the dataset in chunks with category and float32 dtypes"""
+        columnar_path = find_columnar_dataset(csv_path)
+        if columnar_path:
+            chunks = iter_dataframe_chunks(columnar_path, chunk_size, columns)
+        else:
+            import pandas as pd
+            dtypes = {col: 'category' for col in CATEGORICAL_COLUMNS}
+            dtypes.update({target: np.float32 for target in self.nutrition_targets})
+            wanted = set(columns)
+            chunks = pd.read_csv(csv_path, chunksize=chunk_size,
+                                 usecols=lambda col: col in wanted, dtype=dtypes)
+        
+        for chunk in chunks:
+            # Match preprocess_data, which fills missing labels with 0
+            for col in CATEGORICAL_COLUMNS:
+                if col in chunk.columns:
+                    chunk[col] = _fill_missing_labels(chunk[col])
+            yield chunk
+    
+    def _encode_chunk(self, chunk: pd.DataFrame) -> np.ndarray:
+        """Encode a categorical-dtype chunk into a float32 feature matrix"""
+        import pandas as pd
+        
+        X = np.empty((len(chunk), len(self.feature_names)), dtype=np.float32)
+        for j, feature in enumerate(self.feature_names):
+            if feature == 'portion_size':
+                X[:, j] = pd.to_numeric(chunk['portion_size'], errors='coerce').fillna(100)
+            else:
+                column = chunk[feature[:-len('_encoded')]]
+                # Encode each distinct label once, then gather by category code
+                category_codes = self.label_encoders[column.name].transform(
+                    np.asarray(column.cat.categories.astype(str))
+                )
+                X[:, j] = category_codes[column.cat.codes.to_numpy()]
+        return X
+    
+    def train_models_streaming(self, csv_path: str, chunk_size: int = 1_000_000,
+                               sample_size: int = 500_000,
+                               multi_output: bool = False) -> Dict[str, float]:
+        """Train on a dataset larger than memory by reading it in chunks
+        
+        A first pass builds the label vocabularies. A second pass fits the
+        scaler and lookup table on every row and keeps a uniform random sample
+        of sample_size rows for the forests, so peak memory is bounded by
+        chunk_size + sample_size rows.
+        """
+        import pandas as pd
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import LabelEncoder, StandardScaler
+        
+        header = self._dataset_columns(csv_path)
+        categorical = [col for col in CATEGORICAL_COLUMNS if col in header]
+        targets = [target for target in self.nutrition_targets if target in header]
+        
+        print("Building label vocabularies...")
+        vocabularies = {col: set() for col in categorical}
+        for chunk in self._iter_dataset_chunks(csv_path, chunk_size, categorical):
+            for col in categorical:
+                vocabularies[col].update(chunk[col].cat.categories.astype(str))
+        
+        self.label_encoders = {}
+        for col, values in vocabularies.items():
+            self.label_encoders[col] = LabelEncoder().fit(sorted(values))
+            self.vocabularies[col] = self.label_encoders[col].classes_
+        self._compile_encoders()
+        self.feature_names = [
+            feature for feature in FEATURE_COLUMNS
+            if feature.replace('_encoded', '') in header
+        ]
+        
+        print("Streaming dataset...")
+        rng = np.random.default_rng(42)
+        self.scaler = StandardScaler()
+        lookup_stats = None
+        sample_keys = np.empty(0)
+        sample_X = np.empty((0, len(self.feature_names)), dtype=np.float32)
+        sample_Y = np.empty((0, len(targets)), dtype=np.float32)
+        total_rows = 0
+        
+        columns = categorical + ['portion_size'] + targets
+        for chunk in self._iter_dataset_chunks(csv_path, chunk_size, columns):
+            X = self._encode_chunk(chunk)
+            Y = chunk[targets].fillna(0).to_numpy(dtype=np.float32)
+            total_rows += len(X)
+            
+            # Scaler and lookup table see every row
+            self.scaler.partial_fit(X)
+            stats = self._lookup_chunk_statistics(X, Y)
+            if stats is not None:
+                lookup_stats = stats if lookup_stats is None else self._merge_lookup_statistics(lookup_stats, stats)
+            
+            # Reservoir sample: keep the rows with the smallest random keys
+            sample_keys = np.concatenate([sample_keys, rng.random(len(X))])
+            sample_X = np.concatenate([sample_X, X])
+            sample_Y = np.concatenate([sample_Y, Y])
+            if len(sample_keys) > sample_size:
+                keep = np.argpartition(sample_keys, sample_size - 1)[:sample_size]
+                sample_keys, sample_X, sample_Y = sample_keys[keep], sample_X[keep], sample_Y[keep]
+            
+            print(f"  {total_rows} rows processed, {len(sample_keys)} sampled")
+        
+        if total_rows == 0:
+            print("Error loading dataset: no rows found")
+            return {}
+        
+        self._set_lookup_statistics(lookup_stats, targets)
+        self._set_scaler_params()
+        
+        # Split the sample and scale with the full-data scaler
+        X_train, X_test, y_train, y_test = train_test_split(
+            sample_X, pd.DataFrame(sample_Y, columns=targets), test_size=0.2, random_state=42
+        )
+        data = (
+            self.scaler.transform(X_train).astype(np.float32),
+            self.scaler.transform(X_test).astype(np.float32),
+            y_train,
+            y_test
+        )
+        
+        return self._fit_and_save(data, multi_output)
+    
+    def compare_training_modes(self, csv_path: str, latency_runs: int = 50) -> Dict[str, Dict]:
+        """Train both model layouts on the same split and compare latency, size and accuracy
+        
+        Nothing is written to the model directory.
+        """
+        import joblib
+        
+        data = self._prepare_training_data(csv_path)
+        if data is None:
+            return {}
+        X_train_scaled, X_test_scaled, _, _ = data
+        
+        comparison = {}
+        for mode, fit in (("per_target", self._fit_per_target_models),
+                          ("multi_output", self._fit_multi_output_model)):
+            self.models, self.multi_output = {}, None
+            
+            start = time.perf_counter()
+            results = fit(*data)
+            fit_seconds = time.perf_counter() - start
+            
+            estimators = list(self.models.values()) or [self.multi_output['model']]
+            model_bytes = 0
+            for estimator in estimators:
+                buffer = io.BytesIO()
+                joblib.dump(estimator, buffer)
+                model_bytes += buffer.tell()
+            
+            def predict(X):
+                if self.multi_output:
+                    return self._predict_multi_output(X)
+                return np.column_stack([model.predict(X) for model in self.models.values()])
+            
+            single_row = X_test_scaled[:1]
+            timings = []
+            for _ in range(latency_runs):
+                start = time.perf_counter()
+                predict(single_row)
+                timings.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            predict(X_test_scaled)
+            batch_seconds = time.perf_counter() - start
+            
+            comparison[mode] = {
+                'fit_seconds': fit_seconds,
+                'predict_single_ms': float(np.median(timings) * 1000),
+                'predict_batch_ms': batch_seconds * 1000,
+                'batch_rows': len(X_test_scaled),
+                'model_files': len(estimators),
+                'model_bytes': model_bytes,
+                'tree_nodes': sum(tree.tree_.node_count for estimator in estimators
+                                  for tree in estimator.estimators_),
+                'mean_r2': float(np.mean([metrics['r2'] for metrics in results.values()])),
+                'targets': results
+            }
+        
+        self.models, self.multi_output = {}, None
+        self.lookup_stats, self.lookup = None, None
+        self.is_trained = False
+        return comparison
+    
+    def tune_models(self, csv_path: str, n_estimators: List[int] = DEFAULT_N_ESTIMATORS,
+                    max_depths: List[Optional[int]] = DEFAULT_MAX_DEPTHS, tolerance: float = 0.02,
+                    multi_output: bool = False, latency_runs: int = 20) -> Dict:
+        """Sweep forest size and depth per target and pick the cheapest accurate one
+        
+        Each candidate is scored on the held-out split (MAE, R²), timed on a
+        single-row predict and measured in pickled bytes. The chosen
+        configuration is the fastest (then smallest) whose MAE is within
+        tolerance of the best MAE. With multi_output the single shared forest
+        is tuned on standardized targets. Nothing is written to the model directory.
+        """
+        from sklearn.preprocessing import StandardScaler
+        
+        data = self._prepare_training_data(csv_path)
+        if data is None:
+            return {}
+        X_train_scaled, X_test_scaled, y_train, y_test = data
+        
+        targets = [target for target in self.nutrition_targets if target in y_train.columns]
+        if multi_output:
+            target_scaler = StandardScaler()
+            outputs = {'multi_output': (target_scaler.fit_transform(y_train[targets]),
+                                        target_scaler.transform(y_test[targets]))}
+        else:
+            outputs = {target: (y_train[target].to_numpy(), y_test[target].to_numpy()) for target in targets}
+        
+        print(f"Tuning {len(outputs)} forest(s) over n_estimators={list(n_estimators)}, "
+              f"max_depth={list(max_depths)} (tolerance {tolerance:.0%})...")
+        tuned = {}
+        for name, (train_y, test_y) in outputs.items():
+            start = time.perf_counter()
+            candidates = sweep_forest(X_train_scaled, train_y, X_test_scaled, test_y, n_estimators, max_depths,
+                                      n_jobs=self.threads_per_model, latency_runs=latency_runs)
+            chosen = select_candidate(candidates, tolerance)
+            baseline = next((candidate for candidate in candidates
+                             if candidate['n_estimators'] == DEFAULT_PARAMS['n_estimators']
+                             and candidate['max_depth'] == DEFAULT_PARAMS['max_depth']), None)
+            tuned[name] = {**chosen, 'baseline': baseline, 'candidates': candidates,
+                           'sweep_seconds': time.perf_counter() - start}
+            print(f"  {name}: {chosen['n_estimators']} trees, max_depth={chosen['max_depth']} "
+                  f"MAE={chosen['mae']:.3f} R²={chosen['r2']:.3f} "
+                  f"{chosen['predict_ms']:.2f}ms {chosen['bytes'] / 1e6:.2f}MB")
+        
+        self.lookup_stats, self.lookup = None, None
+        return {
+            'created_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'dataset': csv_path,
+            'tolerance': tolerance,
+            'grid': {'n_estimators': sorted(set(n_estimators)), 'max_depth': list(max_depths)},
+            'targets': tuned
+        }
+    
+    def evaluate_models(self, csv_path: str, folds: int = 5, group_by_food: bool = False,
+                        top_foods: Optional[int] = 20, sort_target: str = 'calories') -> Dict:
+        """K-fold cross-validation of the per-target forests train would fit
+        
+        The dataset is encoded and scaled once; every (fold, target) fit then
+        runs as its own task, in a process pool reading the matrices from
+        shared memory when train_workers > 1. Scaling before splitting leaks
+        nothing into the forests, whose splits only depend on the order of
+        each feature's values. With group_by_food every food's rows are held
+        out together, which scores foods the models have never seen. Nothing
+        is written to the model directory.
+        """
+        from sklearn.preprocessing import StandardScaler
+        
+        start = time.perf_counter()
+        df = self.load_dataset(csv_path)
+        if df is None:
+            return {}
+        X, y = self.preprocess_data(df)
+        targets = [target for target in self.nutrition_targets if target in y.columns]
+        if sort_target not in targets:
+            sort_target = targets[0]
+        food_codes = X['food_name_encoded'].to_numpy()
+        X_scaled = StandardScaler().fit_transform(X)
+        Y = y[targets].to_numpy(dtype=np.float64)
+        fold_ids = assign_folds(len(X_scaled), folds, groups=food_codes if group_by_food else None)
+        prepare_seconds = time.perf_counter() - start
+        
+        predictions = np.empty_like(Y)
+        fit_seconds = np.zeros((folds, len(targets)))
+        tasks = [(fold, column) for fold in range(folds) for column in range(len(targets))]
+        
+        def record(fold, column, y_pred, seconds):
+            predictions[fold_ids == fold, column] = y_pred
+            fit_seconds[fold, column] = seconds
+        
+        print(f"Evaluating {len(targets)} targets with {folds}-fold cross-validation "
+              f"({len(tasks)} fits, {self.train_workers} workers, {self.threads_per_model} threads per model)...")
+        fit_start = time.perf_counter()
+        if self.train_workers > 1:
+            blocks, specs = [], []
+            for array in (X_scaled, Y, fold_ids):
+                block, spec = _share_array(array)
+                blocks.append(block)
+                specs.append(spec)
+            try:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor, as_completed
+                
+                with ProcessPoolExecutor(max_workers=self.train_workers,
+                                         mp_context=multiprocessing.get_context('spawn')) as pool:
+                    futures = [
+                        pool.submit(_evaluate_fold_in_worker, fold, column, self._forest_params(targets[column]),
+                                    self.threads_per_model, *specs)
+                        for fold, column in tasks
+                    ]
+                    for done, future in enumerate(as_completed(futures), 1):
+                        record(*future.result())
+                        if done % len(targets) == 0:
+                            print(f"  {done}/{len(tasks)} fits done ({time.perf_counter() - fit_start:.1f}s)")
+            finally:
+                for block in blocks:
+                    block.close()
+                    block.unlink()
+        else:
+            for fold, column in tasks:
+                y_pred, seconds = _evaluate_fold(X_scaled, Y, fold_ids, fold, column,
+                                                 self._forest_params(targets[column]), self.threads_per_model)
+                record(fold, column, y_pred, seconds)
+                if column == len(targets) - 1:
+                    print(f"  fold {fold + 1}/{folds} done ({time.perf_counter() - fit_start:.1f}s)")
+        fit_wall_seconds = time.perf_counter() - fit_start
+        
+        summary = summarize_targets(Y, predictions, fold_ids, targets, fit_seconds)
+        foods = food_error_table(food_codes, self.vocabularies['food_name'], Y, predictions, targets,
+                                 sort_target, top=top_foods)
+        return {
+            'created_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'dataset': csv_path,
+            'rows': len(Y),
+            'folds': folds,
+            'group_by_food': group_by_food,
+            'workers': self.train_workers,
+            'threads_per_model': self.threads_per_model,
+            'forest_params': {target: self._forest_params(target) for target in targets},
+            'targets': summary,
+            'sort_target': sort_target,
+            'foods': foods,
+            'timings': {
+                'prepare_seconds': prepare_seconds,
+                'fit_wall_seconds': fit_wall_seconds,
+                'fit_task_seconds': float(fit_seconds.sum()),
+                'wall_seconds': time.perf_counter() - start
+            }
+        }
+    
+    def _resolve_update_labels(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Codes of the labels in new rows, appending unseen labels to the vocabularies
+        
+        Food names go through the same name resolution as predictions. New
+        labels get codes after the existing ones, so every code the forests
+        and the lookup table were built on keeps its meaning. Rows without a
+        category take their food's most common one; rows of new foods without
+        a category get code -1 in every column and must be left out, since
+        "unknown" is never added as a category (predictions rely on it staying
+        unseen to substitute a food's own category).
+        """
+        food_categories = self.lookup.get('food_categories') if self.lookup is not None else None
+        n_known_foods = len(self.vocabularies['food_name'])
+        vocabularies = {col: [str(label) for label in self.vocabularies[col]] for col in CATEGORICAL_COLUMNS}
+        index = {col: dict(self.encoding_index[col]) for col in CATEGORICAL_COLUMNS}
+        
+        def code(col, label):
+            if label not in index[col]:
+                index[col][label] = len(vocabularies[col])
+                vocabularies[col].append(label)
+            return index[col][label]
+        
+        codes = {col: np.empty(len(df), dtype=np.int64) for col in CATEGORICAL_COLUMNS}
+        for i, (name, category, unit) in enumerate(zip(df['food_name'], df['food_category'], df['portion_unit'])):
+            name = str(name).strip().lower()
+            if name not in index['food_name'] and self.name_index is not None:
+                name = self.name_index.resolve(name)[0] or name
+            
+            category = str(category).strip().lower()
+            if category in ('', 'nan', 'unknown') and category not in index['food_category']:
+                food = index['food_name'].get(name, n_known_foods)
+                if food_categories is None or food >= n_known_foods:
+                    for col in CATEGORICAL_COLUMNS:
+                        codes[col][i] = -1
+                    continue
+                codes['food_category'][i] = food_categories[food]
+            else:
+                codes['food_category'][i] = code('food_category', category)
+            codes['food_name'][i] = code('food_name', name)
+            codes['portion_unit'][i] = code('portion_unit', str(unit).strip().lower() or DEFAULT_PORTION_UNIT)
+        
+        for col in CATEGORICAL_COLUMNS:
+            added = vocabularies[col][len(self.vocabularies[col]):]
+            if added:
+                print(f"  {col}: {len(added)} new labels")
+                self.vocabularies[col] = np.array(vocabularies[col])
+                if col in self.label_encoders:
+                    # Object dtype makes LabelEncoder map labels by dict instead of a sorted search
+                    self.label_encoders[col].classes_ = np.array(vocabularies[col], dtype=object)
+        self._compile_encoders()
+        return codes
+    
+    def _lookup_replay_rows(self, X_new: np.ndarray) -> Optional[np.ndarray]:
+        """Encoded rows standing in for the training data, rebuilt from the lookup statistics
+        
+        Every food/unit cell seen in training and absent from the new rows
+        X_new gets UPDATE_REPLAY_PORTIONS portions spread around its
+        root-mean-square portion, with the food's most common category.
+        """
+        if self.lookup_stats is None or 'food_categories' not in self.lookup:
+            return None
+        stats = self.lookup_stats
+        column = stats['n'].argmax(axis=2)[..., None]
+        n = np.take_along_axis(stats['n'], column, axis=2)[..., 0]
+        sum_pp = np.take_along_axis(stats['sum_pp'], column, axis=2)[..., 0]
+        
+        seen = n > 0
+        new_foods = X_new[:, self.feature_names.index('food_name_encoded')].astype(np.int64)
+        if 'portion_unit_encoded' in self.feature_names:
+            new_units = X_new[:, self.feature_names.index('portion_unit_encoded')].astype(np.int64)
+        else:
+            new_units = np.zeros(len(X_new), dtype=np.int64)
+        old = (new_foods < seen.shape[0]) & (new_units < seen.shape[1])
+        seen[new_foods[old], new_units[old]] = False
+        foods, units = np.nonzero(seen)
+        rms_portion = np.sqrt(sum_pp[foods, units] / n[foods, units])
+        
+        spread = np.linspace(0.1, 1.75, UPDATE_REPLAY_PORTIONS)
+        portion = (rms_portion[:, None] * spread).ravel()
+        foods, units = np.repeat(foods, len(spread)), np.repeat(units, len(spread))
+        columns = {
+            'portion_size': portion,
+            'food_name_encoded': foods,
+            'food_category_encoded': self.lookup['food_categories'][foods],
+            'portion_unit_encoded': units
+        }
+        return np.column_stack([columns[feature] for feature in self.feature_names]).astype(np.float64)
+    
+    def _update_lookup_table(self, X: np.ndarray, Y: np.ndarray):
+        """Add the statistics of new rows to the lookup table, growing it for new labels"""
+        new_stats = self._lookup_chunk_statistics(X, Y)
+        if new_stats is None or self.lookup_stats is None:
+            return
+        merged = {}
+        for key, value in new_stats.items():
+            old = self.lookup_stats[key]
+            merged[key] = value.copy()
+            merged[key][tuple(slice(0, size) for size in old.shape)] += old
+        self._set_lookup_statistics(merged, [str(target) for target in self.lookup_stats['targets']])
+    
+    def update_models(self, csv_path: str, new_trees: int = 10, min_rows: int = 20,
+                      force: bool = False) -> Optional[Dict[str, Dict]]:
+        """Fold new rows into the current models and save them as a new version
+        
+        Instead of refitting everything, the lookup table statistics of the
+        new rows are added to the saved ones, and every per-target forest
+        with at least min_rows new values grows new_trees trees (warm start)
+        fitted on them. The other foods are replayed from the lookup
+        statistics with the forest's current predictions as labels, so the
+        new trees vote for them as the existing trees do. The cost is
+        proportional to the new rows and the lookup table size. Targets
+        missing from the CSV are left alone, and a multi-output model only
+        gets the lookup table update. Files already applied to the current
+        version are refused unless force is set.
+        
+        Returns per target the rows used, trees added and the MAE on the new
+        rows before and after the update, or None when nothing was saved.
+        """
+        import joblib
+        import pandas as pd
+        
+        self.prefer_export = False
+        if not self.load_models():
+            print("Error: No trained models found. Please train models first.")
+            return None
+        source_dir = self.loaded_dir
+        digest = file_sha256(csv_path)
+        if not force and any(update['sha256'] == digest for update in self.update_history):
+            print(f"{csv_path} was already applied to version {self.model_version}")
+            return None
+        
+        # The pickled preprocessing objects are saved again with the new version
+        self.scaler = joblib.load(os.path.join(source_dir, "scaler.pkl"))
+        self.label_encoders = joblib.load(os.path.join(source_dir, "label_encoders.pkl"))
+        for target in self._model_paths:
+            self._get_model(target)
+        
+        df = pd.read_csv(csv_path)
+        if 'food_name' not in df.columns or 'portion_size' not in df.columns:
+            print("Error: the update CSV needs food_name and portion_size columns")
+            return None
+        df['portion_size'] = pd.to_numeric(df['portion_size'], errors='coerce')
+        df = df[df['food_name'].notna() & (df['portion_size'] > 0)].reset_index(drop=True)
+        for col, default in (('food_category', 'unknown'), ('portion_unit', DEFAULT_PORTION_UNIT)):
+            if col not in df.columns:
+                df[col] = default
+            df[col] = df[col].fillna(default)
+        targets = [target for target in self.nutrition_targets if target in df.columns]
+        print(f"Updating version {self.model_version} with {len(df)} rows ({', '.join(targets)})")
+        if len(df) == 0:
+            return None
+        
+        start = time.perf_counter()
+        codes = self._resolve_update_labels(df)
+        held = codes['food_name'] < 0
+        if held.any():
+            print(f"  Skipping {int(held.sum())} rows of new foods without a food_category; "
+                  "export them again with a category to apply them")
+            df = df[~held].reset_index(drop=True)
+            codes = {col: col_codes[~held] for col, col_codes in codes.items()}
+            if len(df) == 0:
+                return None
+        X = np.zeros((len(df), len(self.feature_names)))
+        for j, feature in enumerate(self.feature_names):
+            if feature == 'portion_size':
+                X[:, j] = df['portion_size'].to_numpy(dtype=np.float64)
+            elif feature.endswith('_encoded'):
+                X[:, j] = codes[feature[:-len('_encoded')]]
+        
+        lookup_targets = [str(target) for target in self.lookup_stats['targets']] if self.lookup_stats else []
+        Y = np.full((len(df), len(lookup_targets)), np.nan)
+        for k, target in enumerate(lookup_targets):
+            if target in df.columns:
+                Y[:, k] = pd.to_numeric(df[target], errors='coerce').to_numpy(dtype=np.float64)
+        replay = self._lookup_replay_rows(X)
+        self._update_lookup_table(X, Y)
+        
+        results = {}
+        if self.multi_output:
+            print("Multi-output model: only the lookup table is updated")
+        else:
+            X_scaled = (X - self.scaler_mean) / self.scaler_scale
+            if replay is not None:
+                replay_scaled = (replay - self.scaler_mean) / self.scaler_scale
+            for target in targets:
+                model = self.models.get(target)
+                y = pd.to_numeric(df[target], errors='coerce').to_numpy(dtype=np.float64)
+                rows = np.isfinite(y)
+                if model is None or rows.sum() < min_rows:
+                    continue
+                mae_before = float(np.abs(model.predict(X_scaled[rows]) - y[rows]).mean())
+                X_fit, y_fit = X_scaled[rows], y[rows]
+                if replay is not None and len(replay):
+                    X_fit = np.vstack([X_fit, replay_scaled])
+                    y_fit = np.concatenate([y_fit, model.predict(replay_scaled)])
+                model.set_params(warm_start=True, n_estimators=model.n_estimators + new_trees,
+                                 n_jobs=self.threads_per_model)
+                model.fit(X_fit, y_fit)
+                model.set_params(warm_start=False)
+                results[target] = {
+                    'rows': int(rows.sum()),
+                    'replay_rows': len(y_fit) - int(rows.sum()),
+                    'trees_added': new_trees,
+                    'trees': len(model.estimators_),
+                    'mae_before': mae_before,
+                    'mae_after': float(np.abs(model.predict(X_scaled[rows]) - y[rows]).mean())
+                }
+                print(f"  {target}: +{new_trees} trees on {results[target]['rows']} rows, "
+                      f"MAE on new rows {mae_before:.2f} -> {results[target]['mae_after']:.2f}")
+        
+        self.update_history = self.update_history + [{
+            'file': os.path.basename(csv_path),
+            'sha256': digest,
+            'rows': len(df),
+            'skipped_rows': int(held.sum()),
+            'base_version': self.model_version,
+            'applied_at': time.strftime("%Y-%m-%dT%H:%M:%S")
+        }]
+        previous = (read_manifest(source_dir) or {}).get('metrics', {})
+        metrics = {target: {**previous.get(target, {}),
+                            **{f"update_{name}": value for name, value in results.get(target, {}).items()}}
+                   for target in self.nutrition_targets if target in previous or target in results}
+        self.save_models(metrics=metrics, export=is_exported(os.path.join(source_dir, EXPORT_DIR)))
+        print(f"Updated in {time.perf_counter() - start:.2f}s")
+        return results
+    
+    def save_models(self, metrics: Optional[Dict[str, Dict]] = None, export: bool = False):
+        """Save trained models and preprocessing objects as a new model version
+        
+        Everything is written into a staging directory with its manifest,
+        which is then renamed to model_dir/versions/<version> and made current
+        by atomically replacing model_dir/CURRENT. Running predictors never see
+        a partial model set, and all but the keep_versions newest versions are
+        removed. metrics (the training scores per target) go in the manifest.
+        With export the forests are also packed into the staged export/
+        directory, whose files the manifest covers too.
+        """
+        import joblib
+        
+        save_dir = create_staging_dir(self.model_dir)
+        
         # Save models
-        for target, model in self.models.items():
-            model_path = os.path.join(self.model_dir, f"{target}_model.pkl")
-            joblib.dump(model, model_path)
+        if self.multi_output:
+            joblib.dump(self.multi_output, os.path.join(save_dir, "multi_output_model.pkl"))
+        else:
+            for target, model in self.models.items():
+                model_path = os.path.join(save_dir, f"{target}_model.pkl")
+                joblib.dump(model, model_path)
         
         # Save scaler
-        scaler_path = os.path.join(self.model_dir, "scaler.pkl")
+        scaler_path = os.path.join(save_dir, "scaler.pkl")
         joblib.dump(self.scaler, scaler_path)
         
         # Save label encoders
-        encoders_path = os.path.join(self.model_dir, "label_encoders.pkl")
+        encoders_path = os.path.join(save_dir, "label_encoders.pkl")
         joblib.dump(self.label_encoders, encoders_path)
         
+        # Save scaler parameters and vocabularies as plain JSON, which prediction
+        # can load without importing scikit-learn
+        preprocessing_path = os.path.join(save_dir, "preprocessing.json")
+        with open(preprocessing_path, 'w') as f:
+            json.dump({
+                'scaler_mean': self.scaler_mean.tolist(),
+                'scaler_scale': self.scaler_scale.tolist(),
+                'vocabularies': {col: [str(v) for v in values] for col, values in self.vocabularies.items()}
+            }, f)
+        
         # Save feature names
-        features_path = os.path.join(self.model_dir, "feature_names.json")
+        features_path = os.path.join(save_dir, "feature_names.json")
         with open(features_path, 'w') as f:
             json.dump(self.feature_names, f)
         
-        print(f"Models saved to {self.model_dir}")
+        # Save lookup table
+        if self.lookup_stats is not None:
+            np.savez(os.path.join(save_dir, "lookup_table.npz"), **self.lookup_stats)
+        
+        # Save the incremental updates folded into these models
+        if self.update_history:
+            with open(os.path.join(save_dir, "updates.json"), 'w') as f:
+                json.dump(self.update_history, f, indent=2)
+        
+        if export:
+            self.export_models(save_dir)
+        manifest = self.write_manifest(save_dir, metrics)
+        self.loaded_dir = publish_version(self.model_dir, save_dir, manifest['model_version'],
+                                          keep=self.keep_versions)
+        self.model_version = manifest['model_version']
+        print(f"Models saved to {self.loaded_dir}")
+    
+    def _model_files(self, directory: str) -> List[str]:
+        """Model and preprocessing files of the loaded set present in directory"""
+        if self.multi_output:
+            files = ["multi_output_model.pkl"]
+        else:
+            files = [f"{target}_model.pkl" for target in self.available_targets()]
+        return files + [name for name in ("scaler.pkl", "label_encoders.pkl", "preprocessing.json",
+                                          "feature_names.json", "lookup_table.npz", "updates.json")
+                        if os.path.exists(os.path.join(directory, name))]
     
-    def load_models(self) -> bool:
-        """Load trained models and preprocessing objects"""
+    def write_manifest(self, directory: str, metrics: Optional[Dict[str, Dict]] = None) -> Dict:
+        """Hash the model files saved in directory (and its export/) and write its manifest.json atomically"""
+        layout = 'multi_output' if self.multi_output else 'per_target'
+        files = self._model_files(directory)
+        export_path = os.path.join(directory, EXPORT_DIR)
+        if os.path.isdir(export_path):
+            files += [os.path.join(EXPORT_DIR, name) for name in sorted(os.listdir(export_path))]
+        manifest = build_manifest(directory, files, self.available_targets(), layout,
+                                  self.feature_names, metrics)
+        write_manifest(directory, manifest)
+        return manifest
+    
+    def load_models(self, targets: Optional[List[str]] = None, lazy: bool = False,
+                    mmap_mode: Optional[str] = None) -> bool:
+        """Load trained models and preprocessing objects
+        
+        targets restricts loading and prediction to a subset of nutrients.
+        With lazy=True each per-target forest is unpickled on first use, so
+        targets answered by the lookup table never load a forest. mmap_mode is
+        passed to joblib.load for the model files. The version named by
+        model_dir/CURRENT is loaded, or model_dir itself when unversioned.
+        A lazy load pins the version so that pruning does not delete it.
+        """
+        start = time.perf_counter()
         try:
+            load_dir = resolve_model_dir(self.model_dir)
+            manifest = read_manifest(load_dir)
+            if manifest is not None:
+                problems = verify_manifest(load_dir, manifest)
+                if problems:
+                    print(f"Model files do not match manifest.json: {'; '.join(problems)}")
+                    return False
+            
             # Load feature names
-            features_path = os.path.join(self.model_dir, "feature_names.json")
+            features_path = os.path.join(load_dir, "feature_names.json")
             if os.path.exists(features_path):
                 with open(features_path, 'r') as f:
                     self.feature_names = json.load(f)
             
-            # Load scaler
-            scaler_path = os.path.join(self.model_dir, "scaler.pkl")
-            if os.path.exists(scaler_path):
-                self.scaler = joblib.load(scaler_path)
+            # Load scaler parameters and vocabularies, from JSON when available
+            preprocessing_path = os.path.join(load_dir, "preprocessing.json")
+            if os.path.exists(preprocessing_path):
+                with open(preprocessing_path, 'r') as f:
+                    preprocessing = json.load(f)
+                self.scaler_mean = np.array(preprocessing['scaler_mean'])
+                self.scaler_scale = np.array(preprocessing['scaler_scale'])
+                self.vocabularies = {col: np.array(values) for col, values in preprocessing['vocabularies'].items()}
+            else:
+                import joblib
+                
+                # Load scaler
+                scaler_path = os.path.join(load_dir, "scaler.pkl")
+                if os.path.exists(scaler_path):
+                    self.scaler = joblib.load(scaler_path)
+                    self._set_scaler_params()
+                
+                # Load label encoders
+                encoders_path = os.path.join(load_dir, "label_encoders.pkl")
+                if os.path.exists(encoders_path):
+                    self.label_encoders = joblib.load(encoders_path)
+                    self.vocabularies = {col: le.classes_ for col, le in self.label_encoders.items()}
+            self._compile_encoders()
+            
+            # Load lookup table
+            lookup_path = os.path.join(load_dir, "lookup_table.npz")
+            if os.path.exists(lookup_path):
+                with np.load(lookup_path) as data:
+                    self.lookup_stats = {key: data[key] for key in data.files}
+                self._compile_lookup_table()
             
-            # Load label encoders
-            encoders_path = os.path.join(self.model_dir, "label_encoders.pkl")
-            if os.path.exists(encoders_path):
-                self.label_encoders = joblib.load(encoders_path)
+            # Load the history of incremental updates
+            updates_path = os.path.join(load_dir, "updates.json")
+            self.update_history = []
+            if os.path.exists(updates_path):
+                with open(updates_path, 'r') as f:
+                    self.update_history = json.load(f)
             
-            # Load models
-            for target in self.nutrition_targets:
-                model_path = os.path.join(self.model_dir, f"{target}_model.pkl")
-                if os.path.exists(model_path):
-                    self.models[target] = joblib.load(model_path)
+            self.selected_targets = list(targets) if targets is not None else None
+            self._mmap_mode = mmap_mode
             
-            self.is_trained = len(self.models) > 0
-            print(f"Loaded {len(self.models)} models")
-            return self.is_trained
+            # Load models, preferring exported NumPy forests, then a multi-output
+            # artifact, then per-target pickles
+            export_path = os.path.join(load_dir, EXPORT_DIR)
+            multi_output_path = os.path.join(load_dir, "multi_output_model.pkl")
+            if self.prefer_export and is_exported(export_path):
+                packed = PackedForest(export_path, mmap_mode='r')
+                if packed.layout == 'multi_output':
+                    self.multi_output = {
+                        'model': packed.estimator('multi_output'),
+                        'targets': packed.groups['multi_output']['outputs'],
+                        'target_scaler': None
+                    }
+                else:
+                    self.models = {name: packed.estimator(name) for name in packed.groups
+                                   if targets is None or name in targets}
+                print(f"Loaded exported forests ({packed.meta['nodes']} nodes, {packed.layout})")
+            elif os.path.exists(multi_output_path):
+                import joblib
+                self.multi_output = joblib.load(multi_output_path, mmap_mode=mmap_mode)
+                print(f"Loaded multi-output model ({len(self.multi_output['targets'])} targets)")
+            else:
+                self._model_paths = {}
+                for target in self.nutrition_targets:
+                    model_path = os.path.join(load_dir, f"{target}_model.pkl")
+                    if os.path.exists(model_path) and (targets is None or target in targets):
+                        self._model_paths[target] = model_path
+                if lazy:
+                    print(f"Found {len(self._model_paths)} models (loading on first use)")
+                else:
+                    for target in self._model_paths:
+                        self._get_model(target)
+                    print(f"Loaded {len(self.models)} models")
             
+            self.is_trained = len(self.available_targets()) > 0
+            self.loaded_dir = load_dir
+            self.model_version = manifest['model_version'] if manifest else model_version(self.model_dir)
+            if lazy and load_dir != self.model_dir:
+                pin_version(self.model_dir, os.path.basename(load_dir))
+            self.metrics.record('load_models', (time.perf_counter() - start) * 1000)
+            return self.is_trained
+        
         except Exception as e:
+            self.metrics.error(e)
             print(f"Error loading models: {e}")
             return False
     
+    def export_models(self, directory: str) -> Dict:
+        """Pack the loaded forests into NumPy arrays under directory/export
+        
+        directory must be a staging directory: published versions are never
+        modified (see publish_export).
+        """
+        export_path = os.path.join(directory, EXPORT_DIR)
+        if self.multi_output:
+            target_scaler = self.multi_output['target_scaler']
+            return export_forests(
+                export_path,
+                [{'name': 'multi_output', 'forest': self.multi_output['model'],
+                  'outputs': self.multi_output['targets']}],
+                layout='multi_output',
+                target_mean=target_scaler.mean_, target_scale=target_scaler.scale_
+            )
+        groups = [{'name': target, 'forest': self._get_model(target), 'outputs': [target]}
+                  for target in self.available_targets()]
+        return export_forests(export_path, groups, layout='per_target')
+    
+    def publish_export(self) -> Dict:
+        """Publish the loaded version again with its forests exported
+        
+        The version's files are hard-linked (or copied) into a staging
+        directory, the export is written next to them and the manifest is
+        rebuilt over both, so the export becomes a new version and the
+        published one stays as its manifest describes it.
+        """
+        import shutil
+        
+        source_dir = self.loaded_dir
+        save_dir = create_staging_dir(self.model_dir)
+        for name in self._model_files(source_dir):
+            try:
+                os.link(os.path.join(source_dir, name), os.path.join(save_dir, name))
+            except OSError:
+                shutil.copy2(os.path.join(source_dir, name), os.path.join(save_dir, name))
+        summary = self.export_models(save_dir)
+        manifest = self.write_manifest(save_dir, (read_manifest(source_dir) or {}).get('metrics'))
+        self.loaded_dir = publish_version(self.model_dir, save_dir, manifest['model_version'],
+                                          keep=self.keep_versions)
+        self.model_version = manifest['model_version']
+        print(f"Models saved to {self.loaded_dir}")
+        return summary
+    
+    def available_targets(self) -> List[str]:
+        """Nutrition targets the loaded (or lazily loadable) models can predict"""
+        if self.multi_output:
+            targets = list(self.multi_output['targets'])
+        else:
+            targets = [target for target in self.nutrition_targets
+                       if target in self.models or target in self._model_paths]
+        if self.selected_targets is not None:
+            targets = [target for target in targets if target in self.selected_targets]
+        return targets
+    
+    def _get_model(self, target: str):
+        """Return a target's forest, unpickling it on first use"""
+        if target not in self.models:
+            import joblib
+            with self.metrics.stage(f'load_model.{target}'):
+                self.models[target] = joblib.load(self._model_paths[target], mmap_mode=self._mmap_mode)
+        return self.models[target]
+    
+    def set_predict_threads(self, n_jobs: int):
+        """Threads the loaded scikit-learn forests use to predict
+        
+        Exported forests are single-threaded already.
+        """
+        forests = list(self.models.values()) + ([self.multi_output['model']] if self.multi_output else [])
+        for forest in forests:
+            if hasattr(forest, 'n_jobs'):
+                forest.n_jobs = n_jobs
+    
+    def _compile_encoders(self):
+        """Build a label -> code dict per categorical column for O(1) encoding,
+        and the fuzzy index used to resolve raw food names"""
+        self.encoding_index = {
+            col: {str(label): code for code, label in enumerate(vocabulary)}
+            for col, vocabulary in self.vocabularies.items()
+        }
+        if 'food_name' in self.vocabularies:
+            self.name_index = FoodNameIndex(self.vocabularies['food_name'],
+                                            min_confidence=self.min_name_confidence)
+    
+    def _encode_batch(self, items: List[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[Dict]]:
+        """Encode items into a feature matrix, resolving unseen labels
+        
+        Returns the features, a mask of rows that could be encoded, a mask of
+        rows whose food is unseen (answered from their category profile) and
+        the labels substituted in each row. Food names missing from the
+        vocabulary are first resolved through the name index.
+        """
+        defaults = {'food_category': 'unknown', 'portion_unit': DEFAULT_PORTION_UNIT}
+        n = len(items)
+        valid = np.ones(n, dtype=bool)
+        unseen_food = np.zeros(n, dtype=bool)
+        substitutions = [{} for _ in items]
+        
+        codes = {}
+        for column, index in self.encoding_index.items():
+            codes[column] = np.array([
+                index.get(str(item.get(column, defaults.get(column, ''))), -1) for item in items
+            ], dtype=np.int64)
+            self.metrics.count(f'encoder_miss.{column}', int((codes[column] < 0).sum()))
+        
+        # Map spelling variants, plurals and Somali names onto known foods
+        foods = codes.get('food_name')
+        if foods is not None and self.name_index is not None:
+            for i in np.flatnonzero(foods < 0):
+                food, confidence, method = self.name_index.resolve(str(items[i]['food_name']))
+                if food is not None:
+                    foods[i] = self.encoding_index['food_name'][food]
+                    substitutions[i]['food_name'] = food
+                    substitutions[i]['name_match'] = {'method': method, 'confidence': round(confidence, 3)}
+                    self.metrics.count(f'name_match.{method}')
+        
+        if self.unknown_strategy == 'category':
+            food_categories = self.lookup.get('food_categories') if self.lookup is not None else None
+            units = codes.get('portion_unit')
+            default_unit = self.encoding_index.get('portion_unit', {}).get(DEFAULT_PORTION_UNIT)
+            if units is not None and default_unit is not None:
+                for i in np.flatnonzero(units < 0):
+                    units[i] = default_unit
+                    substitutions[i]['portion_unit'] = DEFAULT_PORTION_UNIT
+            
+            foods, categories = codes.get('food_name'), codes.get('food_category')
+            if foods is not None and categories is not None and food_categories is not None:
+                for i in np.flatnonzero((categories < 0) & (foods >= 0)):
+                    categories[i] = food_categories[foods[i]]
+                    substitutions[i]['food_category'] = str(self.vocabularies['food_category'][categories[i]])
+                if 'category_per_100g' in self.lookup:
+                    unseen_food = (foods < 0) & (categories >= 0)
+                    foods[unseen_food] = 0
+        
+        X = np.zeros((n, len(self.feature_names)), dtype=np.float64)
+        for j, feature in enumerate(self.feature_names):
+            if feature == 'portion_size':
+                X[:, j] = [float(item['portion_size']) for item in items]
+            elif feature.endswith('_encoded') and feature[:-len('_encoded')] in codes:
+                X[:, j] = codes[feature[:-len('_encoded')]]
+        for column_codes in codes.values():
+            valid &= column_codes >= 0
+        self.metrics.count('category_profile', int((valid & unseen_food).sum()))
+        self.metrics.count('unresolved', int((~valid).sum()))
+        
+        return X, valid, unseen_food, substitutions
+    
+    def predict_nutrition_batch(self, items: List[Dict], targets: Optional[List[str]] = None,
+                                with_details: bool = False):
+        """Predict nutrition values for many items at once
+        
+        Each item is a dict with food_name and portion_size, plus optional
+        food_category and portion_unit. Unseen labels are resolved according
+        to unknown_strategy; items that cannot be resolved get {}. targets
+        limits the prediction to a subset of nutrients. With with_details=True
+        a (predictions, details) pair is returned, where each detail records
+        how the item was resolved ('exact', 'substituted', 'category_profile'
+        or 'unseen'), which labels were substituted and whether the values
+        came from the lookup table ('table') or the forests ('model').
+        """
+        if not self.is_trained:
+            print("Models not trained. Please train models first.")
+            results = [{} for _ in items]
+            details = [{'resolution': 'unseen', 'substitutions': {}} for _ in items]
+            return (results, details) if with_details else results
+        
+        if self.cache is None:
+            results, details = self._predict_batch(items, targets)
+            return (results, details) if with_details else results
+        
+        # Serve what the cache holds and predict the rest in one batch
+        results, details, misses = [None] * len(items), [None] * len(items), []
+        if targets is None:
+            targets_key = tuple(self.selected_targets) if self.selected_targets is not None else None
+        else:
+            targets_key = tuple(targets)
+        keys = [(str(item['food_name']), str(item.get('food_category', 'unknown')),
+                 str(item.get('portion_unit', 'g')), float(item['portion_size'])) for item in items]
+        with self.metrics.stage('cache'):
+            for i, key in enumerate(keys):
+                cached = self.cache.get(*key, targets=targets_key)
+                if cached is None:
+                    misses.append(i)
+                else:
+                    results[i], details[i] = cached
+        
+        if misses:
+            predicted, predicted_details = self._predict_batch([items[i] for i in misses], targets)
+            for i, prediction, detail in zip(misses, predicted, predicted_details):
+                results[i], details[i] = prediction, detail
+                self.cache.put(*keys[i], prediction, detail, targets=targets_key)
+        
+        return (results, details) if with_details else results
+    
+    def _predict_batch(self, items: List[Dict], targets: Optional[List[str]] = None
+                       ) -> Tuple[List[Dict[str, float]], List[Dict]]:
+        """Predict items without the cache, returning predictions and details"""
+        results = [{} for _ in items]
+        details = [{'resolution': 'unseen', 'substitutions': {}} for _ in items]
+        if not items:
+            return results, details
+        
+        with self.metrics.stage('encode'):
+            X, valid, unseen_food, substitutions = self._encode_batch(items)
+        for i in np.flatnonzero(valid):
+            if unseen_food[i]:
+                resolution = 'category_profile'
+            else:
+                resolution = 'substituted' if substitutions[i] else 'exact'
+            details[i] = {'resolution': resolution, 'substitutions': substitutions[i]}
+        
+        rows = np.flatnonzero(valid)
+        if len(rows) == 0:
+            return results, details
+        
+        targets = [target for target in self.available_targets() if targets is None or target in targets]
+        values = np.full((len(rows), len(targets)), np.nan)
+        known = ~unseen_food[rows]
+        known_rows, profile_rows = np.flatnonzero(known), np.flatnonzero(~known)
+        
+        # Unseen foods get their category's average profile and never reach a forest
+        if len(profile_rows):
+            X_profile = X[rows[profile_rows]]
+            profile_values = values[profile_rows]
+            with self.metrics.stage('category_profile'):
+                self._apply_category_profile(
+                    X_profile[:, self.feature_names.index('food_category_encoded')].astype(np.int64),
+                    X_profile[:, self.feature_names.index('portion_unit_encoded')].astype(np.int64),
+                    X_profile[:, self.feature_names.index('portion_size')],
+                    targets, profile_values
+                )
+            values[profile_rows] = profile_values
+        
+        # Known foods are answered straight from the per-100g table
+        if self.use_lookup and self.lookup is not None and len(known_rows):
+            known_values = values[known_rows]
+            with self.metrics.stage('lookup'):
+                self._apply_lookup_table(X[rows[known_rows]], targets, known_values)
+            values[known_rows] = known_values
+        
+        # Everything the table does not cover goes through the forests
+        pending = np.isnan(values) & known[:, None]
+        from_forest = pending.any(axis=1)
+        if pending.any():
+            # Scale all rows in one vectorized step
+            with self.metrics.stage('scale'):
+                X_scaled = (X[rows] - self.scaler_mean) / self.scaler_scale
+            
+            # Run each forest once over the rows that need it
+            if self.multi_output:
+                forest_rows = np.flatnonzero(pending.any(axis=1))
+                output_columns = [self.multi_output['targets'].index(target) for target in targets]
+                with self.metrics.stage('predict.multi_output'):
+                    y_pred = self._predict_multi_output(X_scaled[forest_rows])[:, output_columns]
+                values[forest_rows] = np.where(pending[forest_rows], y_pred, values[forest_rows])
+            else:
+                for j, target in enumerate(targets):
+                    forest_rows = np.flatnonzero(pending[:, j])
+                    if len(forest_rows):
+                        model = self._get_model(target)
+                        with self.metrics.stage(f'predict.{target}'):
+                            values[forest_rows, j] = model.predict(X_scaled[forest_rows])
+        
+        values = np.maximum(values, 0)  # Ensure non-negative values
+        columns = {target: values[:, j] for j, target in enumerate(targets)}
+        
+        for i, row in enumerate(rows):
+            # Category profiles may not cover every target
+            results[row] = {target: float(values[i]) for target, values in columns.items()
+                            if not np.isnan(values[i])}
+            details[row]['source'] = 'model' if from_forest[i] else 'table'
+            if not results[row]:
+                details[row]['resolution'] = 'unseen'
+        
+        return results, details
+    
     def predict_nutrition(self, food_name: str, portion_size: float, 
                          food_category: str = "unknown", 
-                         portion_unit: str = "g") -> Dict[str, float]:
+                         portion_unit: str = "g",
+                         targets: Optional[List[str]] = None) -> Dict[str, float]:
         """Predict nutrition values for a given food and portion"""
         if not self.is_trained:
             print("Models not trained. Please train models first.")
             return {}
         
         try:
-            # Prepare input data
-            input_data = {
-                'portion_size': portion_size,
+            predictions, details = self.predict_nutrition_batch([{
                 'food_name': food_name,
+                'portion_size': portion_size,
                 'food_category': food_category,
                 'portion_unit': portion_unit
-            }
-            
-            # Encode categorical variables
-            encoded_data = []
-            for feature in self.feature_names:
-                if 'portion_size' in feature:
-                    encoded_data.append(portion_size)
-                elif 'food_name_encoded' in feature:
-                    le = self.label_encoders.get('food_name')
-                    if le:
-                        encoded_data.append(le.transform([food_name])[0])
-                    else:
-                        encoded_data.append(0)
-                elif 'food_category_encoded' in feature:
-                    le = self.label_encoders.get('food_category')
-                    if le:
-                        encoded_data.append(le.transform([food_category])[0])
-                    else:
-                        encoded_data.append(0)
-                elif 'portion_unit_encoded' in feature:
-                    le = self.label_encoders.get('portion_unit')
-                    if le:
-                        encoded_data.append(le.transform([portion_unit])[0])
-                    else:
-                        encoded_data.append(0)
-                else:
-                    encoded_data.append(0)
-            
-            # Scale features
-            input_scaled = self.scaler.transform([encoded_data])
-            
-            # Make predictions
-            predictions = {}
-            for target in self.nutrition_targets:
-                if target in self.models:
-                    pred = self.models[target].predict(input_scaled)[0]
-                    predictions[target] = max(0, pred)  # Ensure non-negative values
-            
-            return predictions
-            
+            }], targets=targets, with_details=True)
+            prediction, detail = predictions[0], details[0]
+            if not prediction:
+                print(f"Error making prediction: unseen input {food_name!r} ({food_category}, {portion_unit})")
+            elif detail['resolution'] == 'category_profile':
+                print(f"Unseen food {food_name!r}: using the average {food_category!r} profile")
+            elif 'name_match' in detail['substitutions']:
+                match = detail['substitutions']['name_match']
+                print(f"Matched {food_name!r} to {detail['substitutions']['food_name']!r} "
+                      f"({match['method']}, confidence {match['confidence']:.2f})")
+            return prediction
+        
         except Exception as e:
+            self.metrics.error(e)
             print(f"Error making prediction: {e}")
             return {}
+    
+    def metrics_snapshot(self) -> Dict:
+        """Stage timings, counters and cache statistics recorded so far"""
+        return {**self.metrics.snapshot(), 'cache': self.cache.info() if self.cache is not None else None}
 
 def main():
     """Main function to train the model"""
@@ -251,7 +1641,7 @@ def main():
     
     # Train models using existing dataset
     dataset_path = "nutrition_dataset.csv"
-    if not os.path.exists(dataset_path):
+    if not os.path.exists(dataset_path) and not find_columnar_dataset(dataset_path):
         print("❌ Dataset not found. Please run dataset_generator.py first to create the dataset.")
         return
     
@@ -0,0 +1,329 @@
+"""
+Prediction caches: an in-process LRU/TTL cache and a persistent SQLite cache
+shared by every process using the same model directory
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from model_manifest import read_manifest, resolve_model_dir
+
+DISK_CACHE_FILE = "prediction_cache.sqlite"
+
+def model_fingerprint(model_dir: str) -> Tuple:
+    """(name, size, mtime) of every model file, ignoring the disk cache itself"""
+    try:
+        entries = sorted(os.scandir(model_dir), key=lambda entry: entry.name)
+    except FileNotFoundError:
+        return ()
+    return tuple((entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+                 for entry in entries
+                 if entry.is_file() and not entry.name.startswith(DISK_CACHE_FILE))
+
+def model_version(model_dir: str) -> str:
+    """Version from the active manifest.json, or a short hash of the model files without one"""
+    manifest = read_manifest(resolve_model_dir(model_dir))
+    if manifest is not None:
+        return manifest['model_version']
+    return hashlib.sha1(repr(model_fingerprint(model_dir)).encode()).hexdigest()[:16]
+
+def _normalize_key(food_name: str, food_category: str, portion_unit: str) -> Tuple[str, str, str]:
+    return food_name.strip(), food_category.strip(), portion_unit.strip()
+
+class PredictionCache:
+    """Bounded LRU cache of predictions with per-entry TTL
+    
+    Entries are keyed on (food_name, food_category, portion_unit, targets) and
+    store per-100g values, so a hit is scaled to the requested portion.
+    Predictions answered entirely from the lookup table are linear in the
+    portion and are cached once for every portion; forest predictions are
+    cached per portion bucket of portion_step grams. The cache clears itself
+    when the files in model_dir change. Misses fall through to next_level
+    (for example a DiskPredictionCache) when one is given.
+    """
+    
+    def __init__(self, model_dir: str, max_entries: int = 10000, ttl_seconds: float = 3600.0,
+                 portion_step: float = 1.0, check_interval: float = 5.0, next_level=None):
+        self.model_dir = model_dir
+        self.next_level = next_level
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.portion_step = portion_step
+        self.check_interval = check_interval
+        self._entries = OrderedDict()
+        self._fingerprint = self.model_fingerprint()
+        self._checked_at = time.monotonic()
+        self.stats = {
+            'hits': 0, 'scaled_hits': 0, 'misses': 0,
+            'evictions': 0, 'expirations': 0, 'invalidations': 0
+        }
+    
+    def model_fingerprint(self) -> Tuple:
+        return model_fingerprint(self.model_dir)
+    
+    def _check_models(self):
+        """Drop every entry if the models on disk changed since the last check"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        fingerprint = self.model_fingerprint()
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            if self._entries:
+                self._entries.clear()
+                self.stats['invalidations'] += 1
+    
+    def _bucket(self, portion_size: float) -> float:
+        return round(portion_size / self.portion_step) * self.portion_step
+    
+    def _lookup(self, key) -> Optional[Tuple[Dict[str, float], Dict]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, per_100g, detail = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.stats['expirations'] += 1
+            return None
+        self._entries.move_to_end(key)
+        return per_100g, detail
+    
+    def get(self, food_name: str, food_category: str, portion_unit: str, portion_size: float,
+            targets: Optional[Tuple[str, ...]] = None) -> Optional[Tuple[Dict[str, float], Dict]]:
+        """Return (prediction, detail) for the portion, or None on a miss"""
+        self._check_models()
+        base = (*_normalize_key(food_name, food_category, portion_unit), targets)
+        
+        found = self._lookup(base + (None,))
+        if found is not None:
+            self.stats['scaled_hits'] += 1
+        else:
+            found = self._lookup(base + (self._bucket(portion_size),))
+            if found is not None:
+                self.stats['hits'] += 1
+        if found is None:
+            self.stats['misses'] += 1
+            if self.next_level is None:
+                return None
+            cached = self.next_level.get(food_name, food_category, portion_unit, portion_size, targets)
+            if cached is not None:
+                self._store(base, portion_size, *cached)
+            return cached
+        
+        per_100g, detail = found
+        return {target: value * portion_size / 100 for target, value in per_100g.items()}, dict(detail)
+    
+    def put(self, food_name: str, food_category: str, portion_unit: str, portion_size: float,
+            prediction: Dict[str, float], detail: Dict, targets: Optional[Tuple[str, ...]] = None):
+        """Cache a prediction; detail['source'] == 'table' marks it linear in the portion"""
+        self._store((*_normalize_key(food_name, food_category, portion_unit), targets),
+                    portion_size, prediction, detail)
+        if self.next_level is not None:
+            self.next_level.put(food_name, food_category, portion_unit, portion_size,
+                                prediction, detail, targets)
+    
+    def _store(self, base: Tuple, portion_size: float, prediction: Dict[str, float], detail: Dict):
+        if not prediction or portion_size <= 0 or self.max_entries <= 0:
+            return
+        bucket = None if detail.get('source') == 'table' else self._bucket(portion_size)
+        key = base + (bucket,)
+        per_100g = {target: value * 100 / portion_size for target, value in prediction.items()}
+        
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, per_100g, detail)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def invalidate(self):
+        """Drop every entry now, e.g. after the predictor switched model versions"""
+        self._fingerprint = self.model_fingerprint()
+        self._checked_at = time.monotonic()
+        if self._entries:
+            self._entries.clear()
+            self.stats['invalidations'] += 1
+        if self.next_level is not None:
+            self.next_level.invalidate()
+    
+    def info(self) -> Dict:
+        """Counters plus current size and hit rate"""
+        lookups = self.stats['hits'] + self.stats['scaled_hits'] + self.stats['misses']
+        hit_rate = (lookups - self.stats['misses']) / lookups if lookups else 0.0
+        info = {**self.stats, 'entries': len(self._entries), 'max_entries': self.max_entries,
+                'hit_rate': hit_rate}
+        if self.next_level is not None:
+            info['disk'] = self.next_level.info()
+        return info
+
+class DiskPredictionCache:
+    """Persistent prediction cache in a SQLite database (WAL mode)
+    
+    Shared by every process using model_dir, so repeated CLI predictions and
+    separate serve workers can answer without loading any model. Rows are
+    keyed by the model version plus the prediction options (the predictor
+    settings that change results, e.g. unknown_strategy) and the normalized
+    input, so processes run with different options never share rows. They
+    store per-100g
+    values, with the same portion handling as PredictionCache. Rows of other
+    model versions are dropped, and the least recently used rows are evicted
+    beyond max_entries, at most once per PRUNE_INTERVAL across all processes
+    (the last prune time is kept in the meta table). SQLite errors are
+    reported and treated as misses.
+    """
+    
+    PRUNE_EVERY = 64
+    PRUNE_INTERVAL = 300.0
+    
+    def __init__(self, model_dir: str, max_entries: int = 100000, portion_step: float = 1.0,
+                 check_interval: float = 5.0, options: Optional[Dict] = None):
+        self.model_dir = model_dir
+        self.path = os.path.join(model_dir, DISK_CACHE_FILE)
+        self.options = dict(sorted((options or {}).items()))
+        self.max_entries = max_entries
+        self.portion_step = portion_step
+        self.check_interval = check_interval
+        self.version = None
+        self._checked_at = None
+        self._puts = 0
+        self._connection = None
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(self.model_dir, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                " model_version TEXT NOT NULL, key TEXT NOT NULL, per_100g TEXT NOT NULL,"
+                " detail TEXT NOT NULL, hits INTEGER NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (model_version, key))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS predictions_accessed ON predictions (accessed_at)")
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value REAL NOT NULL)")
+            connection.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('pruned_at', 0)")
+            self._connection = connection
+        return self._connection
+    
+    def _current_version(self) -> str:
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self.version = model_version(self.model_dir)
+        return self.version
+    
+    def _key(self, food_name: str, food_category: str, portion_unit: str,
+             targets: Optional[Tuple[str, ...]], bucket: Optional[float]) -> str:
+        return json.dumps([self.options, *_normalize_key(food_name, food_category, portion_unit),
+                           list(targets) if targets is not None else None, bucket])
+    
+    def _bucket(self, portion_size: float) -> float:
+        return round(portion_size / self.portion_step) * self.portion_step
+    
+    def get(self, food_name: str, food_category: str, portion_unit: str, portion_size: float,
+            targets: Optional[Tuple[str, ...]] = None) -> Optional[Tuple[Dict[str, float], Dict]]:
+        """Return (prediction, detail) for the portion, or None on a miss"""
+        try:
+            connection = self._connect()
+            version = self._current_version()
+            for bucket in (None, self._bucket(portion_size)):
+                key = self._key(food_name, food_category, portion_unit, targets, bucket)
+                row = connection.execute(
+                    "SELECT per_100g, detail FROM predictions WHERE model_version = ? AND key = ?",
+                    (version, key)
+                ).fetchone()
+                if row is not None:
+                    connection.execute(
+                        "UPDATE predictions SET hits = hits + 1, accessed_at = ? "
+                        "WHERE model_version = ? AND key = ?", (time.time(), version, key)
+                    )
+                    per_100g = json.loads(row[0])
+                    return ({target: value * portion_size / 100 for target, value in per_100g.items()},
+                            json.loads(row[1]))
+        except sqlite3.Error as e:
+            print(f"Prediction cache unavailable: {e}")
+        return None
+    
+    def put(self, food_name: str, food_category: str, portion_unit: str, portion_size: float,
+            prediction: Dict[str, float], detail: Dict, targets: Optional[Tuple[str, ...]] = None):
+        """Store a prediction; detail['source'] == 'table' marks it linear in the portion"""
+        if not prediction or portion_size <= 0 or self.max_entries <= 0:
+            return
+        bucket = None if detail.get('source') == 'table' else self._bucket(portion_size)
+        per_100g = {target: value * 100 / portion_size for target, value in prediction.items()}
+        now = time.time()
+        try:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO predictions "
+                "(model_version, key, per_100g, detail, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (self._current_version(), self._key(food_name, food_category, portion_unit, targets, bucket),
+                 json.dumps(per_100g), json.dumps(detail), now, now)
+            )
+            # Check on the first write of each process and periodically after that
+            if self._puts % self.PRUNE_EVERY == 0:
+                self.prune_if_due(now)
+            self._puts += 1
+        except sqlite3.Error as e:
+            print(f"Prediction cache unavailable: {e}")
+    
+    def prune_if_due(self, now: float) -> bool:
+        """Prune when no process has for PRUNE_INTERVAL seconds
+        
+        The claim is a single conditional UPDATE, so of several processes
+        writing at once only one prunes.
+        """
+        claimed = self._connect().execute(
+            "UPDATE meta SET value = ? WHERE name = 'pruned_at' AND value <= ?",
+            (now, now - self.PRUNE_INTERVAL)
+        ).rowcount
+        if claimed:
+            self.prune()
+        return bool(claimed)
+    
+    def prune(self):
+        """Drop rows of other model versions and evict least recently used rows"""
+        connection = self._connect()
+        connection.execute("DELETE FROM predictions WHERE model_version != ?", (self._current_version(),))
+        connection.execute(
+            "DELETE FROM predictions WHERE rowid IN ("
+            " SELECT rowid FROM predictions ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+    
+    def invalidate(self):
+        """Re-read the model version on the next access"""
+        self._checked_at = None
+    
+    def clear(self):
+        self._connect().execute("DELETE FROM predictions")
+        self._connection.execute("VACUUM")
+    
+    def info(self) -> Dict:
+        """Entry counts, hits and file size"""
+        connection = self._connect()
+        version = self._current_version()
+        entries, hits = connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM predictions WHERE model_version = ?", (version,)
+        ).fetchone()
+        stale = connection.execute(
+            "SELECT COUNT(*) FROM predictions WHERE model_version != ?", (version,)
+        ).fetchone()[0]
+        size = sum(os.path.getsize(self.path + suffix) for suffix in ("", "-wal", "-shm")
+                   if os.path.exists(self.path + suffix))
+        return {'path': self.path, 'model_version': version, 'entries': entries, 'hits': hits,
+                'stale_entries': stale, 'max_entries': self.max_entries, 'bytes': size}
+    
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
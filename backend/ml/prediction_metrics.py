@@ -0,0 +1,76 @@
+"""
+Opt-in timing and counter instrumentation for NutritionPredictor
+"""
+
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict
+
+class PredictionMetrics:
+    """Per-stage timings and event counters
+    
+    Disabled by default, in which case stage() is a no-op context manager.
+    last_timings holds the stage timings of the most recent request (reset
+    with start_request()), stages aggregates them over the process lifetime.
+    """
+    
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.reset()
+    
+    def reset(self):
+        self.started_at = time.time()
+        self.stages = {}
+        self.counters = {}
+        self.last_timings = {}
+        self.last_error = None
+    
+    def start_request(self):
+        self.last_timings = {}
+    
+    def stage(self, name: str):
+        """Time the enclosed block as stage name"""
+        return self._timed(name) if self.enabled else nullcontext()
+    
+    @contextmanager
+    def _timed(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+    
+    def record(self, name: str, elapsed_ms: float):
+        if not self.enabled:
+            return
+        self.last_timings[name] = self.last_timings.get(name, 0.0) + elapsed_ms
+        stats = self.stages.setdefault(name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        stats['count'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+    
+    def count(self, name: str, amount: int = 1):
+        if self.enabled and amount:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def error(self, error: Exception):
+        """Count an exception that was handled instead of raised"""
+        if self.enabled:
+            self.count('exceptions')
+            self.last_error = f"{type(error).__name__}: {error}"
+    
+    def request_timings(self) -> Dict[str, float]:
+        return {name: round(value, 3) for name, value in self.last_timings.items()}
+    
+    def snapshot(self) -> Dict:
+        """JSON-serializable view of everything recorded so far"""
+        return {
+            'uptime_s': round(time.time() - self.started_at, 1),
+            'stages': {
+                name: {**stats, 'total_ms': round(stats['total_ms'], 3), 'max_ms': round(stats['max_ms'], 3),
+                       'mean_ms': round(stats['total_ms'] / stats['count'], 3)}
+                for name, stats in self.stages.items()
+            },
+            'counters': dict(self.counters),
+            'last_error': self.last_error
+        }
@@ -0,0 +1,226 @@
+"""
+Pre-fork serving of line-delimited JSON over a Unix socket
+
+The parent process loads the models once and forks the workers, which
+inherit them copy-on-write: the forests' arrays are never written to, so
+every worker reads the parent's pages and only its own interpreter state
+and request buffers add memory. gc.freeze() before forking keeps the
+cyclic garbage collector from touching (and so copying) the inherited
+objects.
+
+All workers accept on the same listening socket. Only a worker with no
+open connection waits on it, so each new connection goes to an idle
+worker and no balancing is needed in the parent. A connection is served
+by one worker until the client closes it; clients that open one
+connection per request (or hold at most one per worker) spread evenly.
+
+The parent only supervises: it replaces workers that die, and when
+changed(state) reports a new model version it loads it, forks a new
+generation of workers and retires the old one, which finishes its current
+requests first.
+"""
+
+import gc
+import os
+import sys
+import time
+import select
+import signal
+import socket
+from typing import Callable, Dict, Optional, Tuple
+
+class PreforkServer:
+    """Supervisor for workers forked from a parent holding the loaded models
+    
+    load() returns the shared state (or None on failure), handle(state, line)
+    returns the response line for a request line and whether to close the
+    connection, and changed(state), polled every check_interval seconds,
+    tells whether load() should be called again.
+    """
+    
+    RESPAWN_DELAY = 1.0
+    STOP_TIMEOUT = 10.0
+    
+    def __init__(self, socket_path: str, workers: int,
+                 load: Callable[[], object],
+                 handle: Callable[[object, bytes], Tuple[bytes, bool]],
+                 changed: Optional[Callable[[object], bool]] = None,
+                 check_interval: float = 1.0, backlog: int = 128):
+        self.socket_path = socket_path
+        self.workers = max(1, workers)
+        self.load = load
+        self.handle = handle
+        self.changed = changed
+        self.check_interval = check_interval
+        self.backlog = backlog
+        self.listener = None
+        self.state = None
+        self.generation = 0
+        self.children: Dict[int, int] = {}
+        self.stopping = False
+        self._wakeup = None
+    
+    def start(self) -> bool:
+        """Bind the socket, load the state and fork the first generation"""
+        self.state = self.load()
+        if self.state is None:
+            return False
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.socket_path)
+        self.listener.listen(self.backlog)
+        # Workers that lose the race for a connection get EAGAIN instead of blocking
+        self.listener.setblocking(False)
+        self._spawn_generation()
+        return True
+    
+    def worker_pids(self):
+        return sorted(pid for pid, generation in self.children.items() if generation == self.generation)
+    
+    def serve_forever(self):
+        """Supervise the workers until SIGTERM or SIGINT, then stop them"""
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        checked_at = time.monotonic()
+        try:
+            while not self.stopping:
+                self._reap()
+                now = time.monotonic()
+                if self.changed and self.check_interval > 0 and now - checked_at >= self.check_interval:
+                    checked_at = now
+                    if self.changed(self.state):
+                        self._reload()
+                time.sleep(0.1)
+        finally:
+            self._stop_children(self.children)
+            self.listener.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+    
+    def _request_stop(self, signum, frame):
+        self.stopping = True
+    
+    def _spawn_generation(self):
+        # Objects alive now are shared with the workers and never collected
+        gc.collect()
+        gc.freeze()
+        for _ in range(self.workers):
+            self._fork()
+    
+    def _fork(self) -> int:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = self._worker_main()
+            finally:
+                os._exit(code)
+        self.children[pid] = self.generation
+        return pid
+    
+    def _reap(self):
+        """Collect exited workers and replace those of the current generation"""
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            generation = self.children.pop(pid, None)
+            if generation == self.generation and not self.stopping:
+                print(f"⚠️ Worker {pid} exited with status {status}, starting a replacement")
+                time.sleep(self.RESPAWN_DELAY)
+                self._fork()
+    
+    def _reload(self):
+        """Load the new state and replace every worker with one forked from it"""
+        gc.unfreeze()
+        state = self.load()
+        if state is None:
+            gc.freeze()
+            return
+        previous = {pid: generation for pid, generation in self.children.items()}
+        self.state = state
+        self.generation += 1
+        self._spawn_generation()
+        self._stop_children(previous)
+    
+    def _stop_children(self, children):
+        """SIGTERM children, then SIGKILL those still running after STOP_TIMEOUT"""
+        pids = list(children)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.STOP_TIMEOUT
+        while pids and time.monotonic() < deadline:
+            for pid in list(pids):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    pids.remove(pid)
+                    self.children.pop(pid, None)
+            time.sleep(0.05)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            self.children.pop(pid, None)
+    
+    def _wait_readable(self, sock) -> bool:
+        """Wait for sock to be readable; False once SIGTERM was received"""
+        while not self.stopping:
+            readable, _, _ = select.select([sock, self._wakeup], [], [])
+            if sock in readable and not self.stopping:
+                return True
+        return False
+    
+    def _worker_main(self) -> int:
+        """Accept and serve connections until SIGTERM
+        
+        SIGTERM only sets a flag (and wakes select() through the wakeup
+        pipe), so a request that was read is always answered.
+        """
+        self.children = {}
+        self._wakeup, wakeup_write = os.pipe()
+        os.set_blocking(wakeup_write, False)
+        signal.set_wakeup_fd(wakeup_write)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        while self._wait_readable(self.listener):
+            try:
+                connection, _ = self.listener.accept()
+            except BlockingIOError:
+                continue
+            connection.setblocking(True)
+            try:
+                self._serve_connection(connection)
+            except OSError:
+                pass
+            finally:
+                connection.close()
+        return 0
+    
+    def _serve_connection(self, connection):
+        pending = b""
+        while self._wait_readable(connection):
+            chunk = connection.recv(1 << 16)
+            if not chunk:
+                return
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                if not line.strip():
+                    continue
+                response, close = self.handle(self.state, line)
+                connection.sendall(response)
+                if close:
+                    return
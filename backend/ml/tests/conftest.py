@@ -0,0 +1,47 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nutrition_model import NutritionPredictor
+from model_tuning import write_tuning
+
+# Per-100g calories, protein and fat of a few foods; the other targets are derived from them
+FOODS = {
+    'salmon': ('protein', 208, 20.4, 13.4),
+    'chicken_breast': ('protein', 165, 31.0, 3.6),
+    'rice': ('grain', 130, 2.7, 0.3),
+    'bread': ('grain', 265, 9.0, 3.2),
+    'apple': ('fruit', 52, 0.3, 0.2),
+    'banana': ('fruit', 89, 1.1, 0.3),
+    'broccoli': ('vegetable', 34, 2.8, 0.4),
+    'carrot': ('vegetable', 41, 0.9, 0.2),
+}
+
+def make_rows(foods, rows_per_food, seed=0, category=None):
+    """Training-format rows with nutrients proportional to the portion"""
+    rng = np.random.default_rng(seed)
+    targets = NutritionPredictor().nutrition_targets
+    rows = []
+    for food, (food_category, calories, protein, fat) in foods.items():
+        per_100g = np.array([calories, protein, fat] + [(calories + k) / (k + 4) for k in range(len(targets) - 3)])
+        for portion in rng.uniform(30, 400, rows_per_food).round(1):
+            rows.append({'food_name': food, 'food_category': category or food_category,
+                         'portion_size': portion, 'portion_unit': 'g',
+                         **dict(zip(targets, (per_100g * portion / 100).round(2)))})
+    return pd.DataFrame(rows)
+
+@pytest.fixture
+def trained_model_dir(tmp_path, monkeypatch):
+    """A small per-target model trained in a temporary models directory"""
+    monkeypatch.chdir(tmp_path)
+    make_rows(FOODS, 40).to_csv(tmp_path / "train.csv", index=False)
+    model_dir = str(tmp_path / "models")
+    predictor = NutritionPredictor(model_dir=model_dir)
+    write_tuning(model_dir, {'targets': {target: {'n_estimators': 10, 'max_depth': 8}
+                                         for target in predictor.nutrition_targets}})
+    predictor.train_models(str(tmp_path / "train.csv"))
+    return model_dir
@@ -0,0 +1,32 @@
+import pytest
+
+from food_name_index import FoodNameIndex
+
+FOODS = ['apple', 'banana', 'broccoli', 'cheese', 'chicken_breast', 'egg', 'milk',
+         'orange', 'pasta', 'peanut', 'butter', 'rice', 'spinach', 'strawberry']
+
+@pytest.fixture
+def index():
+    return FoodNameIndex(FOODS)
+
+@pytest.mark.parametrize("name", [
+    "pasta sauce", "orange juice", "chicken soup", "milk tea", "cheeseburger", "peanut butter",
+])
+def test_dishes_containing_a_known_food_are_not_matched(index, name):
+    food, confidence, method = index.resolve(name)
+    assert food is None, (name, food, confidence, method)
+    assert confidence < index.min_confidence
+
+@pytest.mark.parametrize("name, expected, method", [
+    ("Chicken Breast", "chicken_breast", "normalized"),
+    ("bariis", "rice", "alias"),
+    ("apples", "apple", "normalized"),
+    ("grilled chicken breast", "chicken_breast", "partial"),
+    ("boiled eggs", "egg", "partial"),
+    ("bananna", "banana", "fuzzy"),
+    ("brocoli", "broccoli", "fuzzy"),
+])
+def test_variants_of_known_foods_are_matched(index, name, expected, method):
+    food, confidence, matched_by = index.resolve(name)
+    assert (food, matched_by) == (expected, method)
+    assert confidence >= index.min_confidence
@@ -0,0 +1,48 @@
+import os
+import json
+import subprocess
+import sys
+
+from model_manifest import (MANIFEST_FILE, PINS_DIR, VERSIONS_DIR, activate_version, list_versions,
+                            pin_version, pinned_versions, prune_versions)
+
+def make_versions(model_dir, names):
+    """Versions holding only a manifest, newest and current first"""
+    for age, name in enumerate(names):
+        path = os.path.join(model_dir, VERSIONS_DIR, name)
+        os.makedirs(path)
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        with open(manifest_path, 'w') as f:
+            json.dump({'model_version': name, 'created_at': None, 'layout': 'per_target'}, f)
+        os.utime(manifest_path, (1000 - age, 1000 - age))
+    activate_version(str(model_dir), names[0])
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+def test_prune_keeps_current_and_versions_pinned_by_live_processes(tmp_path):
+    make_versions(tmp_path, ['v4', 'v3', 'v2', 'v1'])
+    pin_version(str(tmp_path), 'v2')
+    pins_path = os.path.join(tmp_path, VERSIONS_DIR, PINS_DIR)
+    with open(os.path.join(pins_path, str(dead_pid())), 'w') as f:
+        f.write('v1')
+    
+    assert pinned_versions(str(tmp_path)) == {'v2'}
+    assert prune_versions(str(tmp_path), keep=1) == ['v3', 'v1']
+    assert [entry['version'] for entry in list_versions(str(tmp_path))] == ['v4', 'v2']
+    assert os.listdir(pins_path) == [str(os.getpid())]
+
+def test_a_new_pin_releases_the_previous_version(tmp_path):
+    make_versions(tmp_path, ['v2', 'v1'])
+    pin_version(str(tmp_path), 'v1')
+    pin_version(str(tmp_path), 'v2')
+    assert prune_versions(str(tmp_path), keep=1) == ['v1']
+
+def test_a_pin_is_removed_when_its_process_exits(tmp_path):
+    make_versions(tmp_path, ['v1'])
+    code = f"from model_manifest import pin_version; pin_version({str(tmp_path)!r}, 'v1')"
+    subprocess.run([sys.executable, '-c', code], check=True,
+                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert os.listdir(os.path.join(tmp_path, VERSIONS_DIR, PINS_DIR)) == []
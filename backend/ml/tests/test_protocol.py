@@ -0,0 +1,50 @@
+import contextlib
+import io
+import json
+
+import pytest
+
+from nutrition_cli import INVALID_REQUEST, _serve_line
+from nutrition_model import NutritionPredictor
+
+@pytest.fixture
+def predictor(trained_model_dir):
+    predictor = NutritionPredictor(model_dir=trained_model_dir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert predictor.load_models()
+    return predictor
+
+def serve(predictor, request):
+    response, _ = _serve_line(predictor, json.dumps(request))
+    return response
+
+@pytest.mark.parametrize("portion_size", [-10, 0, "nan", "inf"])
+def test_non_positive_or_non_finite_portions_are_rejected(predictor, portion_size):
+    response = serve(predictor, {"id": 1, "food_name": "rice", "portion_size": portion_size})
+    assert not response["ok"]
+    assert response["error"]["code"] == INVALID_REQUEST
+    assert response["id"] == 1
+
+def test_invalid_items_fail_alone_in_a_batch(predictor):
+    response = serve(predictor, {"op": "predict_batch", "items": [
+        {"id": "a", "food_name": "rice", "portion_size": 100},
+        {"id": "b", "food_name": "rice", "portion_size": -10},
+    ]})
+    assert response["ok"]
+    assert response["ids"] == ["a", "b"]
+    assert response["errors"][0] is None and response["predictions"][0]["calories"] > 0
+    assert response["errors"][1]["code"] == INVALID_REQUEST and response["predictions"][1] == {}
+
+@pytest.mark.parametrize("targets", ["calories", ["calories", "cal"], [1], {"calories": 1}])
+def test_targets_must_be_a_list_of_known_nutrients(predictor, targets):
+    for request in ({"food_name": "rice", "portion_size": 100, "targets": targets},
+                    {"op": "predict_batch", "items": [{"food_name": "rice", "portion_size": 100}],
+                     "targets": targets}):
+        response = serve(predictor, request)
+        assert not response["ok"]
+        assert response["error"]["code"] == INVALID_REQUEST
+
+def test_targets_restrict_the_prediction(predictor):
+    response = serve(predictor, {"food_name": "rice", "portion_size": 100, "targets": ["calories", "fat"]})
+    assert response["ok"]
+    assert sorted(response["prediction"]) == ["calories", "fat"]
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from conftest import FOODS, make_rows
+from nutrition_model import NutritionPredictor
+
+def forest_predictions(model_dir, foods):
+    """Forest predictions (lookup table off) for 100 g of each food, category left to default"""
+    predictor = NutritionPredictor(model_dir=model_dir)
+    predictor.use_lookup = False
+    assert predictor.load_models()
+    return {food: predictor.predict_nutrition(food, 100)['calories'] for food in foods}
+
+def test_update_keeps_default_category_predictions(trained_model_dir, tmp_path):
+    before = forest_predictions(trained_model_dir, FOODS)
+    
+    # Typed entries are exported with category "unknown"; a new food among them
+    # has no category to give it, and the known foods take their own
+    new_rows = make_rows({'injera': ('grain', 166, 6.0, 1.0)}, 30, seed=1, category='unknown')
+    known_rows = make_rows({food: FOODS[food] for food in ('salmon', 'rice')}, 5, seed=2, category='unknown')
+    path = tmp_path / "entries.csv"
+    pd.concat([new_rows, known_rows]).to_csv(path, index=False)
+    
+    # The 10 known rows are below min_rows, so only the lookup table changes
+    predictor = NutritionPredictor(model_dir=trained_model_dir)
+    assert predictor.update_models(str(path), min_rows=20) == {}
+    assert 'unknown' not in predictor.vocabularies['food_category']
+    assert 'injera' not in predictor.vocabularies['food_name']
+    assert predictor.update_history[-1]['skipped_rows'] == 30
+    
+    after = forest_predictions(trained_model_dir, FOODS)
+    for food in FOODS:
+        assert np.isclose(after[food], before[food]), food
+
+def test_update_trees_leave_other_foods_alone(trained_model_dir, tmp_path):
+    before = forest_predictions(trained_model_dir, FOODS)
+    
+    # Salmon measured 20% richer; only the forests' salmon predictions should follow
+    richer = {'salmon': ('protein', 250, 24.5, 16.1)}
+    path = tmp_path / "salmon.csv"
+    make_rows(richer, 40, seed=3).to_csv(path, index=False)
+    
+    predictor = NutritionPredictor(model_dir=trained_model_dir)
+    results = predictor.update_models(str(path), new_trees=10, min_rows=20)
+    assert results['calories']['trees_added'] == 10
+    
+    assert results['calories']['replay_rows'] > 0
+    
+    # New trees fitted on the salmon rows alone moved apple from 52 to 123 kcal;
+    # the 10-tree fixture's own bootstrap noise is about 10%
+    after = forest_predictions(trained_model_dir, FOODS)
+    for food in FOODS:
+        if food != 'salmon':
+            assert abs(after[food] - before[food]) <= 0.15 * before[food], (food, before[food], after[food])
+    assert after['salmon'] > 1.1 * before['salmon']
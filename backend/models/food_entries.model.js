@@ -91,6 +91,19 @@ const FoodEntry = sequelize.define(
       allowNull: true,
       defaultValue: null,
     },
+    // Category reported by image analysis (null for typed entries)
+    foodCategory: {
+      type: DataTypes.STRING(100),
+      allowNull: true,
+      defaultValue: null,
+    },
+    // Where the nutrient values came from: "ml", "openai" or "usda"
+    // (null for entries logged before sources were recorded)
+    nutritionSource: {
+      type: DataTypes.STRING(20),
+      allowNull: true,
+      defaultValue: null,
+    },
   },
   {
     tableName: "food_entries",
@@ -116,9 +116,8 @@ class ImageAnalysisService {
    * Get nutrition data for food items using ML models with OpenAI fallback
    */
   async getNutritionDataForFoodItems(foodItems) {
-    const enhancedFoodItems = [];
-
-    for (const foodItem of foodItems) {
+    // Look up every item concurrently; the ML service batches them into one call
+    return Promise.all(foodItems.map(async (foodItem) => {
       try {
         // Extract portion size and unit
         const portionMatch = foodItem.portionsize.match(/(\d+(?:\.\d+)?)(\w+)/);
@@ -136,20 +135,19 @@ class ImageAnalysisService {
           this // Pass this service as fallback
         );
 
+        console.log(`✅ Nutrition data obtained for ${foodItem.name}`);
+
         // Create enhanced food item with nutrition data
-        const enhancedItem = {
+        return {
           ...foodItem,
           nutrients: nutritionData
         };
 
-        enhancedFoodItems.push(enhancedItem);
-        console.log(`✅ Nutrition data obtained for ${foodItem.name}`);
-
       } catch (error) {
         console.error(`❌ Failed to get nutrition data for ${foodItem.name}:`, error.message);
         
         // Add food item with default nutrition data
-        enhancedFoodItems.push({
+        return {
           ...foodItem,
           nutrients: {
             calories: 0,
@@ -160,11 +158,9 @@ class ImageAnalysisService {
             vitamins: { A: 0, C: 0, D: 0, E: 0 },
             minerals: { calcium: 0, iron: 0, potassium: 0, sodium: 0 }
           }
-        });
+        };
       }
-    }
-
-    return enhancedFoodItems;
+    }));
   }
 
   /**
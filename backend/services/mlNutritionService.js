@@ -1,59 +1,166 @@
 import { spawn } from 'child_process';
 import path from 'path';
 import fs from 'fs';
+import readline from 'readline';
+import { MLWorkerPool } from './mlWorkerPool.js';
+import { MLSocketClient } from './mlSocketClient.js';
+import { MLPredictionScheduler } from './mlPredictionScheduler.js';
+import { acceptPrediction, checkResponse, parseMessage } from './mlProtocol.js';
+import {
+    ML_WORKERS,
+    ML_SOCKET_PATH,
+    ML_REQUEST_TIMEOUT_MS,
+    ML_METRICS,
+    ML_MAX_CONCURRENCY,
+    ML_MAX_QUEUE,
+    ML_MAX_BATCH_SIZE,
+    ML_MIN_NAME_CONFIDENCE
+} from '../config/env.js';
+
+// Every nutrient the models must predict before ML predictions are used
+const ML_TARGETS = [
+    'calories', 'protein', 'fat', 'carbohydrates', 'fiber',
+    'vitamin_a', 'vitamin_c', 'vitamin_d', 'vitamin_e',
+    'calcium', 'iron', 'potassium', 'sodium'
+];
 
 class MLNutritionService {
     constructor() {
         this.mlPath = path.join(process.cwd(), 'ml');
         this.modelsDir = path.join(this.mlPath, 'models');
         this.datasetPath = path.join(this.mlPath, 'nutrition_dataset.csv');
+        this.manifest = null;
+        this.manifestError = 'Model manifest not loaded';
+        this.manifestWatcher = null;
+        this.preparing = null;
+        this.metricsEnabled = ML_METRICS === 'true';
+        this.minNameConfidence = Number(ML_MIN_NAME_CONFIDENCE);
+        // A shared pre-forked server takes precedence over per-instance workers
+        if (ML_SOCKET_PATH) {
+            this.workerPool = new MLSocketClient(ML_SOCKET_PATH, {
+                requestTimeoutMs: Number(ML_REQUEST_TIMEOUT_MS),
+                metrics: this.metricsEnabled,
+                minNameConfidence: this.minNameConfidence
+            });
+        } else {
+            this.workerPool = Number(ML_WORKERS) > 0
+                ? new MLWorkerPool(this.mlPath, {
+                    size: Number(ML_WORKERS),
+                    requestTimeoutMs: Number(ML_REQUEST_TIMEOUT_MS),
+                    metrics: this.metricsEnabled,
+                    minNameConfidence: this.minNameConfidence
+                })
+                : null;
+        }
+        // Identical requests share one prediction, waiting requests are batched
+        this.scheduler = new MLPredictionScheduler({
+            execute: (item) => this.runPrediction(item),
+            executeBatch: (items) => this.runPredictionBatch(items),
+            maxConcurrency: Number(ML_MAX_CONCURRENCY),
+            maxQueue: Number(ML_MAX_QUEUE),
+            maxBatchSize: Number(ML_MAX_BATCH_SIZE)
+        });
     }
 
     /**
-     * Check if ML models are trained and available
+     * Path of the active manifest: models/versions/<CURRENT>/manifest.json,
+     * or models/manifest.json for an unversioned models directory
      */
-    async checkModelsStatus() {
+    resolveManifestPath() {
         try {
-            // Check if models directory exists and has model files
-            if (!fs.existsSync(this.modelsDir)) {
-                return { available: false, reason: 'Models directory not found' };
+            const version = fs.readFileSync(path.join(this.modelsDir, 'CURRENT'), 'utf8').trim();
+            if (version) {
+                return path.join(this.modelsDir, 'versions', version, 'manifest.json');
             }
+        } catch (error) {
+            if (error.code !== 'ENOENT') {
+                throw error;
+            }
+        }
+        return path.join(this.modelsDir, 'manifest.json');
+    }
 
-            const modelFiles = fs.readdirSync(this.modelsDir);
-            const requiredModels = [
-                'calories_model.pkl',
-                'protein_model.pkl',
-                'fat_model.pkl',
-                'carbohydrates_model.pkl',
-                'fiber_model.pkl',
-                'vitamin_a_model.pkl',
-                'vitamin_c_model.pkl',
-                'vitamin_d_model.pkl',
-                'vitamin_e_model.pkl',
-                'calcium_model.pkl',
-                'iron_model.pkl',
-                'potassium_model.pkl',
-                'sodium_model.pkl',
-                'scaler.pkl',
-                'label_encoders.pkl',
-                'feature_names.json'
-            ];
-
-            const missingModels = requiredModels.filter(model => !modelFiles.includes(model));
-            
-            if (missingModels.length > 0) {
-                return { 
-                    available: false, 
-                    reason: `Missing model files: ${missingModels.join(', ')}` 
-                };
+    /**
+     * Read the active manifest into memory. A version is published by
+     * atomically replacing models/CURRENT, so a manifest found this way
+     * describes files that are all in place; it is only used when it covers
+     * every target in ML_TARGETS.
+     */
+    loadManifest() {
+        const previousVersion = this.manifest?.model_version;
+        try {
+            const manifest = JSON.parse(fs.readFileSync(this.resolveManifestPath(), 'utf8'));
+            if (!manifest.model_version || !Array.isArray(manifest.targets)) {
+                throw new Error('missing model_version or targets');
+            }
+            const missingTargets = ML_TARGETS.filter(target => !manifest.targets.includes(target));
+            if (missingTargets.length > 0) {
+                throw new Error(`missing targets: ${missingTargets.join(', ')}`);
             }
+            this.manifest = manifest;
+            this.manifestError = null;
+        } catch (error) {
+            this.manifest = null;
+            this.manifestError = error.code === 'ENOENT'
+                ? 'Model manifest not found'
+                : `Invalid model manifest: ${error.message}`;
+        }
+
+        // Serve workers notice the new version themselves and hot-swap to it
+        const version = this.manifest?.model_version;
+        if (version && previousVersion && version !== previousVersion) {
+            console.log(`🔄 ML models updated to version ${version}`);
+        }
+        return this.manifest;
+    }
 
-            return { available: true };
+    /**
+     * Load the manifest once and reload it whenever CURRENT (or an
+     * unversioned manifest) is replaced
+     */
+    watchManifest() {
+        if (this.manifestWatcher) {
+            return;
+        }
+        this.loadManifest();
+        try {
+            fs.mkdirSync(this.modelsDir, { recursive: true });
+            this.manifestWatcher = fs.watch(this.modelsDir, (eventType, filename) => {
+                if (!filename || filename === 'CURRENT' || filename === 'manifest.json') {
+                    this.loadManifest();
+                }
+            });
+            this.manifestWatcher.on('error', () => {
+                // e.g. the models directory was removed; watch again on the next check
+                this.manifestWatcher.close();
+                this.manifestWatcher = null;
+                this.loadManifest();
+            });
+            this.manifestWatcher.unref();
         } catch (error) {
-            return { available: false, reason: `Error checking models: ${error.message}` };
+            // fs.watch is not supported on every filesystem; poll the file instead
+            console.warn(`⚠️ Cannot watch ${this.modelsDir} (${error.message}), polling the model manifest`);
+            const currentPath = path.join(this.modelsDir, 'CURRENT');
+            fs.watchFile(currentPath, { interval: 5000, persistent: false }, () => this.loadManifest());
+            this.manifestWatcher = { close: () => fs.unwatchFile(currentPath) };
         }
     }
 
+    /**
+     * Check if ML models are trained and available, from the cached manifest
+     */
+    async checkModelsStatus() {
+        this.watchManifest();
+        if (!this.manifest) {
+            return { available: false, reason: this.manifestError };
+        }
+        return {
+            available: true,
+            version: this.manifest.model_version,
+            targets: this.manifest.targets
+        };
+    }
+
     /**
      * Train ML models if not already trained
      */
@@ -95,27 +202,75 @@ class MLNutritionService {
      * Predict nutrition using ML models
      */
     async predictNutrition(foodName, portionSize, foodCategory = 'unknown', portionUnit = 'g') {
+        return this.scheduler.predict({ foodName, portionSize, foodCategory, portionUnit });
+    }
+
+    /**
+     * One prediction, on a warm worker or a one-off process
+     */
+    async runPrediction({ foodName, portionSize, foodCategory, portionUnit }) {
+        if (!this.workerPool) {
+            return this.predictNutritionOnce(foodName, portionSize, foodCategory, portionUnit);
+        }
+
+        console.log(`🤖 ML Prediction: ${portionSize}${portionUnit} of ${foodName} (${foodCategory})`);
+        const nutritionData = await this.workerPool.predict(foodName, portionSize, foodCategory, portionUnit);
+        console.log('✅ ML prediction successful');
+        return nutritionData;
+    }
+
+    /**
+     * Several predictions in one Python call, as { prediction } or { error } per item
+     */
+    async runPredictionBatch(items) {
+        console.log(`🤖 ML Batch Prediction: ${items.length} items`);
+        if (this.workerPool) {
+            return this.workerPool.predictBatch(items);
+        }
+
+        const results = items.map(() => ({ error: new Error('No ML prediction returned') }));
+        for await (const { index, prediction, error } of this.predictNutritionBatch(items)) {
+            if (index in results) {
+                results[index] = error ? { error } : { prediction };
+            }
+        }
+        return results;
+    }
+
+    /**
+     * Predict nutrition by spawning a one-off Python process
+     */
+    async predictNutritionOnce(foodName, portionSize, foodCategory = 'unknown', portionUnit = 'g') {
         return new Promise((resolve, reject) => {
             console.log(`🤖 ML Prediction: ${portionSize}${portionUnit} of ${foodName} (${foodCategory})`);
             
-            const predictProcess = spawn('python', [
+            // --strict writes exactly one protocol line on stdout and all logs on stderr;
+            // --lazy unpickles only the forests this prediction needs. Keep these flags
+            // in sync with NODE_PREDICT_FLAGS in ml/nutrition_benchmark.py
+            const args = [
                 'nutrition_cli.py', 
                 'predict',
                 '--food-name', foodName,
                 '--portion-size', portionSize.toString(),
                 '--food-category', foodCategory,
                 '--portion-unit', portionUnit,
-                '--json-output'
-            ], {
+                '--strict',
+                '--disk-cache',
+                '--lazy'
+            ];
+            if (this.metricsEnabled) {
+                args.push('--metrics');
+            }
+            const predictProcess = spawn('python', args, {
                 cwd: this.mlPath,
                 stdio: 'pipe'
             });
 
-            let output = '';
+            let response = null;
             let errorOutput = '';
 
-            predictProcess.stdout.on('data', (data) => {
-                output += data.toString();
+            readline.createInterface({ input: predictProcess.stdout }).on('line', (line) => {
+                response = response || parseMessage(line);
             });
 
             predictProcess.stderr.on('data', (data) => {
@@ -123,28 +278,86 @@ class MLNutritionService {
                 console.error('ML Prediction Error:', data.toString().trim());
             });
 
+            predictProcess.on('error', reject);
             predictProcess.on('close', (code) => {
-                if (code === 0) {
-                    try {
-                        // Extract JSON from output
-                        const jsonMatch = output.match(/\{[\s\S]*\}/);
-                        if (jsonMatch) {
-                            const nutritionData = JSON.parse(jsonMatch[0]);
-                            console.log('✅ ML prediction successful');
-                            resolve(nutritionData);
-                        } else {
-                            reject(new Error('No JSON output found in ML prediction'));
-                        }
-                    } catch (parseError) {
-                        reject(new Error(`Failed to parse ML prediction output: ${parseError.message}`));
-                    }
-                } else {
+                if (!response) {
                     reject(new Error(`ML prediction failed with code ${code}: ${errorOutput}`));
+                    return;
+                }
+                try {
+                    const { prediction, resolution, timings_ms: timings, metrics } = checkResponse(response);
+                    if (this.metricsEnabled) {
+                        console.log('⏱️ ML metrics:', JSON.stringify({ timings_ms: timings, ...metrics }));
+                    }
+                    resolve(acceptPrediction(prediction, resolution, this.minNameConfidence));
+                    console.log('✅ ML prediction successful');
+                } catch (error) {
+                    reject(error);
                 }
             });
         });
     }
 
+    /**
+     * Predict many items with one `predict-batch` process, yielding
+     * { index, prediction } or { index, error } as each result line arrives
+     */
+    async *predictNutritionBatch(items) {
+        const batchProcess = spawn('python', ['nutrition_cli.py', 'predict-batch', '--disk-cache'], {
+            cwd: this.mlPath,
+            stdio: 'pipe'
+        });
+        const exited = new Promise((resolve, reject) => {
+            batchProcess.on('error', reject);
+            batchProcess.on('close', resolve);
+        });
+        batchProcess.stderr.on('data', (data) => {
+            console.error('ML Batch:', data.toString().trim());
+        });
+
+        // The process may exit early (e.g. without models); its stdout still says why
+        batchProcess.stdin.on('error', () => {});
+        items.forEach((item, index) => {
+            batchProcess.stdin.write(JSON.stringify({
+                id: index,
+                food_name: item.foodName,
+                portion_size: item.portionSize,
+                food_category: item.foodCategory || 'unknown',
+                portion_unit: item.portionUnit || 'g'
+            }) + '\n');
+        });
+        batchProcess.stdin.end();
+
+        for await (const line of readline.createInterface({ input: batchProcess.stdout })) {
+            const message = parseMessage(line);
+            if (!message) {
+                continue;
+            }
+            try {
+                const { prediction, resolution } = checkResponse(message);
+                yield { index: message.id, prediction: acceptPrediction(prediction, resolution, this.minNameConfidence) };
+            } catch (error) {
+                yield { index: message.id, error };
+            }
+        }
+
+        const code = await exited;
+        if (code !== 0) {
+            throw new Error(`ML batch prediction failed with code ${code}`);
+        }
+    }
+
+    /**
+     * Scheduler statistics (queue time, deduplication, batching) and the
+     * metrics snapshots of the ML workers (empty without a worker pool)
+     */
+    async getMetrics() {
+        return {
+            scheduler: this.scheduler.getStats(),
+            workers: this.workerPool ? await this.workerPool.getMetrics() : []
+        };
+    }
+
     /**
      * Get nutrition prediction with ML models as primary, ChatGPT as fallback
      */
@@ -197,6 +410,7 @@ class MLNutritionService {
      */
     formatMLPrediction(mlPrediction) {
         return {
+            source: 'ml',
             calories: mlPrediction.calories || 0,
             protein: mlPrediction.protein || 0,
             fat: mlPrediction.fat || 0,
@@ -222,6 +436,7 @@ class MLNutritionService {
      */
     formatOpenAIPrediction(openaiNutrition) {
         return {
+            source: 'openai',
             calories: openaiNutrition.calories || 0,
             protein: openaiNutrition.protein || 0,
             fat: openaiNutrition.fats || 0,
@@ -243,18 +458,24 @@ class MLNutritionService {
     }
 
     /**
-     * Initialize ML models (train if needed)
+     * Initialize ML models. Missing models are prepared in the background,
+     * so callers never wait on a training run; predictions fall back to
+     * OpenAI until the new manifest appears.
      */
     async initializeModels() {
         try {
             const modelStatus = await this.checkModelsStatus();
             
             if (!modelStatus.available) {
-                console.log('🚀 Initializing ML models...');
-                await this.trainModels();
-                console.log('✅ ML models initialized successfully');
-            } else {
-                console.log('✅ ML models already available');
+                console.log(`🚀 Preparing ML models in the background (${modelStatus.reason})...`);
+                this.prepareModels();
+                return false;
+            }
+            console.log(`✅ ML models already available (version ${modelStatus.version})`);
+
+            if (this.workerPool) {
+                await this.workerPool.warmUp();
+                console.log('✅ ML prediction workers ready');
             }
             
             return true;
@@ -263,6 +484,50 @@ class MLNutritionService {
             return false;
         }
     }
+
+    /**
+     * Write a manifest for models saved before manifests existed, or train
+     * new models. Only one preparation runs at a time.
+     */
+    prepareModels() {
+        if (!this.preparing) {
+            this.preparing = this.writeManifest()
+                .catch(() => this.trainModels())
+                .then(() => {
+                    this.loadManifest();
+                    if (this.manifest && this.workerPool) {
+                        return this.workerPool.warmUp();
+                    }
+                })
+                .catch((error) => {
+                    console.error('❌ Failed to prepare ML models:', error.message);
+                })
+                .finally(() => {
+                    this.preparing = null;
+                });
+        }
+        return this.preparing;
+    }
+
+    /**
+     * Run `nutrition_cli.py manifest --write` for the models currently saved
+     */
+    async writeManifest() {
+        return new Promise((resolve, reject) => {
+            const manifestProcess = spawn('python', ['nutrition_cli.py', 'manifest', '--write'], {
+                cwd: this.mlPath,
+                stdio: 'ignore'
+            });
+            manifestProcess.on('error', reject);
+            manifestProcess.on('close', (code) => {
+                if (code === 0) {
+                    resolve();
+                } else {
+                    reject(new Error(`No complete model set to describe (code ${code})`));
+                }
+            });
+        });
+    }
 }
 
 export default new MLNutritionService(); 
\ No newline at end of file
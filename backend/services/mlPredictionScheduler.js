@@ -0,0 +1,147 @@
+/**
+ * Admission control in front of the Python predictor:
+ * - identical in-flight requests share one prediction (single-flight);
+ * - at most `maxConcurrency` Python calls run at once;
+ * - requests waiting for a free slot are grouped into one batched call;
+ * - beyond `maxQueue` waiting requests, new ones are rejected right away
+ *   (code 'queue_full') so callers can fall back instead of piling up.
+ */
+export class MLPredictionScheduler {
+    constructor({ execute, executeBatch, maxConcurrency = 2, maxQueue = 100, maxBatchSize = 32 }) {
+        this.execute = execute;
+        this.executeBatch = executeBatch;
+        this.maxConcurrency = Math.max(1, maxConcurrency);
+        this.maxQueue = Math.max(0, maxQueue);
+        this.maxBatchSize = Math.max(1, maxBatchSize);
+
+        this.inFlight = new Map();
+        this.queue = [];
+        this.active = 0;
+        this.dispatchScheduled = false;
+        this.stats = {
+            requests: 0,
+            deduplicated: 0,
+            rejected: 0,
+            started: 0,
+            calls: 0,
+            batches: 0,
+            batchedItems: 0,
+            failures: 0,
+            queueWaitTotalMs: 0,
+            queueWaitMaxMs: 0
+        };
+    }
+
+    static key({ foodName, portionSize, foodCategory, portionUnit }) {
+        return JSON.stringify([
+            String(foodName).trim().toLowerCase(),
+            Number(portionSize),
+            String(foodCategory).trim().toLowerCase(),
+            String(portionUnit).trim().toLowerCase()
+        ]);
+    }
+
+    /**
+     * Resolve with the prediction for item ({ foodName, portionSize, foodCategory, portionUnit })
+     */
+    predict(item) {
+        this.stats.requests++;
+        const key = MLPredictionScheduler.key(item);
+        const existing = this.inFlight.get(key);
+        if (existing) {
+            this.stats.deduplicated++;
+            return existing;
+        }
+
+        // Free slots take requests without waiting, so only the excess counts as queued
+        if (this.queue.length >= this.maxQueue + this.maxConcurrency - this.active) {
+            this.stats.rejected++;
+            const error = new Error(`ML prediction queue is full (${this.queue.length} waiting)`);
+            error.code = 'queue_full';
+            return Promise.reject(error);
+        }
+
+        const promise = new Promise((resolve, reject) => {
+            this.queue.push({ item, resolve, reject, enqueuedAt: performance.now() });
+        }).finally(() => {
+            this.inFlight.delete(key);
+        });
+        this.inFlight.set(key, promise);
+        this.scheduleDispatch();
+        return promise;
+    }
+
+    /**
+     * Dispatch after the current burst of callers has enqueued, so requests
+     * arriving together (e.g. from Promise.all) can share one batch
+     */
+    scheduleDispatch() {
+        if (!this.dispatchScheduled) {
+            this.dispatchScheduled = true;
+            setImmediate(() => {
+                this.dispatchScheduled = false;
+                this.dispatch();
+            });
+        }
+    }
+
+    dispatch() {
+        while (this.active < this.maxConcurrency && this.queue.length > 0) {
+            const entries = this.queue.splice(0, this.maxBatchSize);
+            const startedAt = performance.now();
+            this.stats.started += entries.length;
+            for (const entry of entries) {
+                const waitMs = startedAt - entry.enqueuedAt;
+                this.stats.queueWaitTotalMs += waitMs;
+                this.stats.queueWaitMaxMs = Math.max(this.stats.queueWaitMaxMs, waitMs);
+            }
+            this.active++;
+            this.run(entries).finally(() => {
+                this.active--;
+                this.dispatch();
+            });
+        }
+    }
+
+    async run(entries) {
+        this.stats.calls++;
+        if (entries.length === 1 || !this.executeBatch) {
+            await Promise.all(entries.map(async (entry) => {
+                try {
+                    entry.resolve(await this.execute(entry.item));
+                } catch (error) {
+                    this.stats.failures++;
+                    entry.reject(error);
+                }
+            }));
+            return;
+        }
+
+        this.stats.batches++;
+        this.stats.batchedItems += entries.length;
+        let results;
+        try {
+            results = await this.executeBatch(entries.map(entry => entry.item));
+        } catch (error) {
+            results = entries.map(() => ({ error }));
+        }
+        entries.forEach((entry, index) => {
+            const result = results[index] || { error: new Error('No ML prediction returned') };
+            if (result.error) {
+                this.stats.failures++;
+                entry.reject(result.error);
+            } else {
+                entry.resolve(result.prediction);
+            }
+        });
+    }
+
+    getStats() {
+        return {
+            ...this.stats,
+            active: this.active,
+            queued: this.queue.length,
+            queueWaitMeanMs: this.stats.started > 0 ? this.stats.queueWaitTotalMs / this.stats.started : 0
+        };
+    }
+}
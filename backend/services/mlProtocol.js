@@ -0,0 +1,91 @@
+/**
+ * Responses of `nutrition_cli.py` (predict --strict, predict-batch, serve)
+ * are single JSON lines in a versioned envelope:
+ * { protocol, ok, prediction, resolution, model_version, timings_ms, error: { code, message } }
+ */
+export const ML_PROTOCOL_VERSION = 1;
+
+export class MLProtocolError extends Error {
+    constructor(message, code = 'internal_error') {
+        super(message);
+        this.name = 'MLProtocolError';
+        this.code = code;
+    }
+}
+
+/**
+ * Parse one protocol line, returning null for anything that is not a JSON object
+ */
+export function parseMessage(line) {
+    try {
+        const message = JSON.parse(line);
+        return message && typeof message === 'object' ? message : null;
+    } catch {
+        return null;
+    }
+}
+
+/**
+ * Return a successful response, or throw an MLProtocolError carrying its error code
+ */
+export function checkResponse(message) {
+    if (message.protocol !== ML_PROTOCOL_VERSION) {
+        throw new MLProtocolError(`Unsupported ML protocol version: ${message.protocol}`, 'protocol_mismatch');
+    }
+    if (!message.ok) {
+        throw new MLProtocolError(message.error?.message || 'ML prediction failed', message.error?.code);
+    }
+    return message;
+}
+
+/**
+ * The prediction of an item, or an MLProtocolError (code 'weak_name_match')
+ * when its food name was only matched to a known food with a confidence
+ * below minNameConfidence, so the caller can use another source instead
+ */
+export function acceptPrediction(prediction, resolution, minNameConfidence = 0) {
+    const match = resolution?.substitutions?.name_match;
+    if (match && match.confidence < minNameConfidence) {
+        throw new MLProtocolError(
+            `Food name only matched ${resolution.substitutions.food_name} (${match.method}, confidence ${match.confidence})`,
+            'weak_name_match'
+        );
+    }
+    return prediction;
+}
+
+/**
+ * A predict_batch request for items of { foodName, portionSize, foodCategory, portionUnit }
+ */
+export function batchRequest(items) {
+    return {
+        op: 'predict_batch',
+        items: items.map(item => ({
+            food_name: item.foodName,
+            portion_size: item.portionSize,
+            food_category: item.foodCategory,
+            portion_unit: item.portionUnit
+        }))
+    };
+}
+
+/**
+ * { prediction } or { error } per item of a predict_batch response, in input
+ * order; an item fails alone with its own error code
+ */
+export function acceptBatchResponse(response, minNameConfidence = 0) {
+    return response.predictions.map((prediction, index) => {
+        const error = response.errors?.[index];
+        if (error) {
+            return { error: new MLProtocolError(error.message, error.code) };
+        }
+        if (Object.keys(prediction).length === 0) {
+            return { error: new MLProtocolError('No prediction available', 'no_prediction') };
+        }
+        try {
+            return { prediction: acceptPrediction(prediction, response.resolutions?.[index], minNameConfidence) };
+        } catch (error) {
+            return { error };
+        }
+    });
+}
@@ -0,0 +1,121 @@
+import net from 'net';
+import {
+    acceptBatchResponse, acceptPrediction, batchRequest, checkResponse, MLProtocolError, parseMessage
+} from './mlProtocol.js';
+
+/**
+ * Client for `nutrition_cli.py serve --socket PATH --workers N`, a pre-forked
+ * Python server shared by every backend instance on the host.
+ *
+ * Each request opens its own connection, so the server hands it to an idle
+ * worker and concurrent requests (from this or other instances) spread over
+ * all cores. Same interface as MLWorkerPool.
+ */
+export class MLSocketClient {
+    constructor(socketPath, { requestTimeoutMs = 10000, metrics = false, minNameConfidence = 0 } = {}) {
+        this.socketPath = socketPath;
+        this.requestTimeoutMs = requestTimeoutMs;
+        this.metrics = metrics;
+        this.minNameConfidence = minNameConfidence;
+        this.nextId = 1;
+        this.modelVersion = null;
+    }
+
+    /**
+     * Send a request; with raw the whole response message is returned
+     */
+    send(payload, { raw = false } = {}) {
+        return new Promise((resolve, reject) => {
+            const id = this.nextId++;
+            const connection = net.createConnection({ path: this.socketPath });
+            let buffer = '';
+            let settled = false;
+
+            const finish = (error, message) => {
+                if (settled) {
+                    return;
+                }
+                settled = true;
+                connection.destroy();
+                if (error) {
+                    reject(error);
+                    return;
+                }
+                if (this.metrics && message.timings_ms) {
+                    console.log('⏱️ ML timings (ms):', JSON.stringify(message.timings_ms));
+                }
+                try {
+                    const response = checkResponse(message);
+                    if (response.model_version) {
+                        this.modelVersion = response.model_version;
+                    }
+                    resolve(raw ? response : response.prediction);
+                } catch (protocolError) {
+                    reject(protocolError);
+                }
+            };
+
+            connection.setTimeout(this.requestTimeoutMs, () => {
+                finish(new Error(`ML server timed out after ${this.requestTimeoutMs}ms`));
+            });
+            connection.on('error', (error) => {
+                finish(new Error(`ML server unavailable at ${this.socketPath}: ${error.message}`));
+            });
+            connection.on('close', () => {
+                finish(new Error('ML server closed the connection without a response'));
+            });
+            connection.on('data', (data) => {
+                buffer += data.toString();
+                const end = buffer.indexOf('\n');
+                if (end === -1) {
+                    return;
+                }
+                const message = parseMessage(buffer.slice(0, end));
+                if (!message) {
+                    finish(new MLProtocolError('Invalid response from ML server'));
+                } else {
+                    finish(null, message);
+                }
+            });
+
+            connection.write(JSON.stringify({ id, ...payload }) + '\n');
+        });
+    }
+
+    /**
+     * Check that the server is up and learn its model version
+     */
+    async warmUp() {
+        await this.send({ op: 'ping' }, { raw: true });
+    }
+
+    async predict(foodName, portionSize, foodCategory, portionUnit) {
+        const response = await this.send({
+            op: 'predict',
+            food_name: foodName,
+            portion_size: portionSize,
+            food_category: foodCategory,
+            portion_unit: portionUnit
+        }, { raw: true });
+        return acceptPrediction(response.prediction, response.resolution, this.minNameConfidence);
+    }
+
+    /**
+     * Predict several items in one request, returning { prediction } or
+     * { error } per item in input order
+     */
+    async predictBatch(items) {
+        const response = await this.send(batchRequest(items), { raw: true });
+        return acceptBatchResponse(response, this.minNameConfidence);
+    }
+
+    /**
+     * Metrics snapshot of the worker that answered
+     */
+    async getMetrics() {
+        const response = await this.send({ op: 'metrics' }, { raw: true });
+        return [response.metrics];
+    }
+
+    close() {}
+}
@@ -0,0 +1,204 @@
+import { spawn } from 'child_process';
+import readline from 'readline';
+import { acceptBatchResponse, acceptPrediction, batchRequest, checkResponse, parseMessage } from './mlProtocol.js';
+
+/**
+ * A long-lived `nutrition_cli.py serve` process that keeps the models loaded
+ * and answers line-delimited JSON requests.
+ */
+class MLWorker {
+    constructor(mlPath, { requestTimeoutMs, metrics = false }) {
+        this.mlPath = mlPath;
+        this.requestTimeoutMs = requestTimeoutMs;
+        this.metrics = metrics;
+        this.nextId = 1;
+        this.pending = new Map();
+        this.alive = true;
+        this.modelVersion = null;
+
+        // Workers share the persistent prediction cache, so one worker's
+        // predictions are reused by the others and by later restarts
+        const args = ['nutrition_cli.py', 'serve', '--disk-cache'];
+        if (metrics) {
+            args.push('--metrics');
+        }
+        this.process = spawn('python', args, {
+            cwd: this.mlPath,
+            stdio: 'pipe'
+        });
+
+        this.ready = new Promise((resolve, reject) => {
+            this.resolveReady = resolve;
+            this.rejectReady = reject;
+        });
+        // Avoid unhandled rejections when nobody is waiting on startup
+        this.ready.catch(() => {});
+
+        readline.createInterface({ input: this.process.stdout }).on('line', (line) => this.handleLine(line));
+
+        this.process.stderr.on('data', (data) => {
+            console.error('ML Worker:', data.toString().trim());
+        });
+
+        this.process.on('error', (error) => this.handleExit(error));
+        this.process.on('close', (code) => {
+            this.handleExit(new Error(`ML worker exited with code ${code}`));
+        });
+    }
+
+    get busy() {
+        return this.pending.size;
+    }
+
+    handleLine(line) {
+        const message = parseMessage(line);
+        if (!message) {
+            console.error('ML Worker: ignoring non-JSON output:', line);
+            return;
+        }
+
+        if (message.event) {
+            try {
+                checkResponse(message);
+                this.modelVersion = message.model_version;
+                this.resolveReady();
+            } catch (error) {
+                this.rejectReady(error);
+            }
+            return;
+        }
+
+        const request = this.pending.get(message.id);
+        if (!request) {
+            return;
+        }
+        this.pending.delete(message.id);
+        clearTimeout(request.timer);
+
+        if (this.metrics && message.timings_ms) {
+            console.log('⏱️ ML timings (ms):', JSON.stringify(message.timings_ms));
+        }
+
+        try {
+            const response = checkResponse(message);
+            request.resolve(request.raw ? response : response.prediction);
+        } catch (error) {
+            request.reject(error);
+        }
+    }
+
+    handleExit(error) {
+        if (!this.alive) {
+            return;
+        }
+        this.alive = false;
+        this.rejectReady(error);
+        for (const request of this.pending.values()) {
+            clearTimeout(request.timer);
+            request.reject(error);
+        }
+        this.pending.clear();
+    }
+
+    /**
+     * Send a request; with raw the whole response message is returned
+     */
+    async send(payload, { raw = false } = {}) {
+        await this.ready;
+        if (!this.alive) {
+            throw new Error('ML worker is not running');
+        }
+
+        return new Promise((resolve, reject) => {
+            const id = this.nextId++;
+            const timer = setTimeout(() => {
+                this.pending.delete(id);
+                reject(new Error(`ML worker timed out after ${this.requestTimeoutMs}ms`));
+            }, this.requestTimeoutMs);
+
+            this.pending.set(id, { resolve, reject, timer, raw });
+            this.process.stdin.write(JSON.stringify({ id, ...payload }) + '\n');
+        });
+    }
+
+    close() {
+        if (this.alive) {
+            this.process.stdin.end();
+            this.process.kill();
+        }
+    }
+}
+
+/**
+ * Keeps `size` warm ML workers and routes each request to the least busy one.
+ * Dead workers are replaced on the next request.
+ */
+export class MLWorkerPool {
+    constructor(mlPath, { size = 1, requestTimeoutMs = 10000, metrics = false, minNameConfidence = 0 } = {}) {
+        this.mlPath = mlPath;
+        this.size = Math.max(1, size);
+        this.requestTimeoutMs = requestTimeoutMs;
+        this.metrics = metrics;
+        this.minNameConfidence = minNameConfidence;
+        this.workers = [];
+
+        process.once('exit', () => this.close());
+    }
+
+    getWorker() {
+        this.workers = this.workers.filter(worker => worker.alive);
+        while (this.workers.length < this.size) {
+            this.workers.push(new MLWorker(this.mlPath, {
+                requestTimeoutMs: this.requestTimeoutMs,
+                metrics: this.metrics
+            }));
+        }
+        return this.workers.reduce((best, worker) => (worker.busy < best.busy ? worker : best));
+    }
+
+    /**
+     * Start the workers ahead of the first request
+     */
+    async warmUp() {
+        this.getWorker();
+        await Promise.all(this.workers.map(worker => worker.ready));
+    }
+
+    async predict(foodName, portionSize, foodCategory, portionUnit) {
+        const response = await this.getWorker().send({
+            op: 'predict',
+            food_name: foodName,
+            portion_size: portionSize,
+            food_category: foodCategory,
+            portion_unit: portionUnit
+        }, { raw: true });
+        return acceptPrediction(response.prediction, response.resolution, this.minNameConfidence);
+    }
+
+    /**
+     * Predict several items in one request, returning { prediction } or
+     * { error } per item in input order
+     */
+    async predictBatch(items) {
+        const response = await this.getWorker().send(batchRequest(items), { raw: true });
+        return acceptBatchResponse(response, this.minNameConfidence);
+    }
+
+    /**
+     * Metrics snapshot (stage timings, counters, cache stats) from every worker
+     */
+    async getMetrics() {
+        this.getWorker();
+        const responses = await Promise.all(
+            this.workers.map(worker => worker.send({ op: 'metrics' }, { raw: true }))
+        );
+        return responses.map(response => response.metrics);
+    }
+
+    close() {
+        for (const worker of this.workers) {
+            worker.close();
+        }
+        this.workers = [];
+    }
+}